@@ -1,4 +1,6 @@
 import os
+import tempfile
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -23,15 +25,19 @@ INSTALLED_APPS = [
     'data_service',
     'reporting_service',
     'schedule_service',
+    'monitoring_service',
 ]
 
 MIDDLEWARE = [
+    # Первым, чтобы замер времени охватывал все остальные middleware
+    'monitoring_service.middleware.RequestMetricsMiddleware',
 	'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'monitoring_service.profiling.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -96,11 +102,104 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'auth_service.User'
 
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'amqp://rabbitmq')
-CELERY_RESULT_BACKEND = 'redis://redis:6379/0'
+CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://redis:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
+CELERY_TASK_TRACK_STARTED = True
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+CELERY_TASK_STORE_EAGER_RESULT = True
+CELERY_RESULT_EXPIRES = 60 * 60 * 24
+CELERY_BEAT_SCHEDULE = {
+    'evict-reports': {
+        'task': 'reporting_service.tasks.evict_reports_task',
+        'schedule': 60 * 60,
+    },
+    'compact-schedule-changes': {
+        'task': 'schedule_service.tasks.compact_schedule_changes_task',
+        'schedule': 24 * 60 * 60,
+    },
+}
+
+# Генерация расписания
+SCHEDULE_BULK_BATCH_SIZE = int(os.getenv('SCHEDULE_BULK_BATCH_SIZE', '1000'))
+SCHEDULE_BULK_USE_COPY = os.getenv('SCHEDULE_BULK_USE_COPY', 'False') == 'True'
+SCHEDULE_COPY_MIN_ROWS = int(os.getenv('SCHEDULE_COPY_MIN_ROWS', '5000'))
+SCHEDULE_HOURS_PER_LESSON = int(os.getenv('SCHEDULE_HOURS_PER_LESSON', '2'))
+SCHEDULE_SOLVER = os.getenv('SCHEDULE_SOLVER', 'heuristic')
+SCHEDULE_SOLVER_TIME_LIMIT = float(os.getenv('SCHEDULE_SOLVER_TIME_LIMIT', '30'))
+SCHEDULE_SOLVER_ITERATIONS = int(os.getenv('SCHEDULE_SOLVER_ITERATIONS', '100000'))
+SCHEDULE_SOLVER_SEED = int(os.getenv('SCHEDULE_SOLVER_SEED', '0'))
+SCHEDULE_GENERATION_MODE = os.getenv('SCHEDULE_GENERATION_MODE', 'daily')
+SCHEDULE_PAGE_SIZE = int(os.getenv('SCHEDULE_PAGE_SIZE', '200'))
+SCHEDULE_MAX_PAGE_SIZE = int(os.getenv('SCHEDULE_MAX_PAGE_SIZE', '1000'))
+SCHEDULE_CONFLICTS_PAGE_SIZE = int(os.getenv('SCHEDULE_CONFLICTS_PAGE_SIZE', '100'))
+SCHEDULE_CONFLICTS_MAX_PAGE_SIZE = int(os.getenv('SCHEDULE_CONFLICTS_MAX_PAGE_SIZE', '1000'))
+# Наибольший период поиска свободных аудиторий и пар, дней
+SCHEDULE_AVAILABILITY_MAX_DAYS = int(os.getenv('SCHEDULE_AVAILABILITY_MAX_DAYS', '366'))
+# Журнал изменений для синхронизации клиентов: срок хранения записей, дней,
+# и наибольшее число записей в одном ответе
+SCHEDULE_CHANGES_RETENTION_DAYS = int(os.getenv('SCHEDULE_CHANGES_RETENTION_DAYS', '30'))
+SCHEDULE_CHANGES_PAGE_SIZE = int(os.getenv('SCHEDULE_CHANGES_PAGE_SIZE', '1000'))
+# Нерабочие даты через запятую в формате YYYY-MM-DD
+SCHEDULE_HOLIDAYS = [
+    datetime.strptime(date_str.strip(), '%Y-%m-%d').date()
+    for date_str in os.getenv('SCHEDULE_HOLIDAYS', '').split(',')
+    if date_str.strip()
+]
+
+# Импорт нагрузки: строк в одном пакете (одна транзакция и один upsert)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '1000'))
+# Предел объектов в одном запросе массовых операций справочников
+DATA_BULK_MAX_ITEMS = int(os.getenv('DATA_BULK_MAX_ITEMS', '1000'))
+# Размер страницы справочников при ?limit= или ?cursor= и его предел
+DATA_PAGE_SIZE = int(os.getenv('DATA_PAGE_SIZE', '100'))
+DATA_MAX_PAGE_SIZE = int(os.getenv('DATA_MAX_PAGE_SIZE', '1000'))
+
+# Отчеты
+REPORT_ITERATOR_CHUNK_SIZE = int(os.getenv('REPORT_ITERATOR_CHUNK_SIZE', '2000'))
+# TTF-шрифт с кириллицей для PDF (в Docker ставится пакет fonts-dejavu-core)
+REPORT_PDF_FONT_PATH = os.getenv('REPORT_PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+REPORT_PDF_FONT_BOLD_PATH = os.getenv('REPORT_PDF_FONT_BOLD_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf')
+# Длительность академического часа: фактические часы нагрузки считаются по
+# длительности пар в расписании
+REPORT_ACADEMIC_HOUR_MINUTES = int(os.getenv('REPORT_ACADEMIC_HOUR_MINUTES', '45'))
+# Готовые файлы отчетов: каталог внутри MEDIA_ROOT, срок хранения с последнего
+# обращения (секунды) и общий лимит размера (байты)
+REPORT_CACHE_DIR = os.getenv('REPORT_CACHE_DIR', os.path.join(BASE_DIR, 'media', 'reports'))
+REPORT_CACHE_MAX_AGE = int(os.getenv('REPORT_CACHE_MAX_AGE', str(60 * 60 * 24 * 7)))
+REPORT_CACHE_MAX_SIZE = int(os.getenv('REPORT_CACHE_MAX_SIZE', str(512 * 1024 * 1024)))
+# Внутренний location nginx для X-Accel-Redirect; если пусто, файл отдает Django
+REPORT_X_ACCEL_REDIRECT_PREFIX = os.getenv('REPORT_X_ACCEL_REDIRECT_PREFIX', '')
+
+# Кэш (Redis, если задан REDIS_CACHE_URL, иначе память процесса)
+REDIS_CACHE_URL = os.getenv('REDIS_CACHE_URL')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django_redis.cache.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+            'OPTIONS': {
+                'CLIENT_CLASS': 'django_redis.client.DefaultClient',
+                'PARSER_CLASS': 'redis.connection.HiredisParser',
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+SCHEDULE_CACHE_TIMEOUT = int(os.getenv('SCHEDULE_CACHE_TIMEOUT', '3600'))
+
+# Календари iCalendar: часовой пояс колледжа (время пар задано в нем),
+# глубина прошедших занятий, домен UID событий и подсказка частоты обновления
+SCHEDULE_TIMEZONE = os.getenv('SCHEDULE_TIMEZONE', 'Europe/Moscow')
+SCHEDULE_ICS_PAST_DAYS = int(os.getenv('SCHEDULE_ICS_PAST_DAYS', '30'))
+SCHEDULE_ICS_UID_DOMAIN = os.getenv('SCHEDULE_ICS_UID_DOMAIN', 'college-schedule.ru')
+SCHEDULE_ICS_REFRESH_HOURS = int(os.getenv('SCHEDULE_ICS_REFRESH_HOURS', '6'))
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
@@ -135,6 +234,40 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Метрики запросов: доля замеряемых запросов (0 — выключено), каталог файлов
+# воркеров, период их записи и порог журнала медленных запросов
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', '1.0'))
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'college-schedule-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '5'))
+METRICS_SLOW_REQUEST_SECONDS = float(os.getenv('METRICS_SLOW_REQUEST_SECONDS', '1.0'))
+METRICS_SLOW_REQUEST_TOP_SQL = int(os.getenv('METRICS_SLOW_REQUEST_TOP_SQL', '5'))
+
+# Профилирование cProfile: администратор включает его заголовком X-Profile: 1
+# или параметром ?profile=1, кроме того профилируется случайная доля запросов
+# к перечисленным путям. Профили хранятся в MEDIA_ROOT/profiles
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_SAMPLE_PATHS = [
+    prefix.strip()
+    for prefix in os.getenv('PROFILING_SAMPLE_PATHS', '/api/schedules/generate/,/api/reports/').split(',')
+    if prefix.strip()
+]
+PROFILING_MAX_FILES = int(os.getenv('PROFILING_MAX_FILES', '200'))
+PROFILING_TOP_FUNCTIONS = int(os.getenv('PROFILING_TOP_FUNCTIONS', '30'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'default': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'default'},
+    },
+    'loggers': {
+        'monitoring_service': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
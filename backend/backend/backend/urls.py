@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
+from monitoring_service.views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('api/', include([
         path('auth/', include('auth_service.urls')), 
         path('schedules/', include('schedule_service.urls')),
         path('reports/', include('reporting_service.urls')),
+        path('monitoring/', include('monitoring_service.urls')),
         path('', include('data_service.urls')), 
     ])),
 ]
\ No newline at end of file
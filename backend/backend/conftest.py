@@ -0,0 +1,68 @@
+from datetime import time
+from types import SimpleNamespace
+import pytest
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from data_service.models import (
+    Classroom, Course, Discipline, Specialty, StudentGroup, Teacher, TeachingLoad, TimeSlot,
+)
+
+# Пары дня: начало и конец
+PAIRS = [(time(8, 0), time(9, 30)), (time(9, 40), time(11, 10)), (time(11, 20), time(12, 50))]
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    # Версии областей кэша не переходят между тестами
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def api_client():
+    return APIClient()
+
+
+@pytest.fixture
+def college(db, settings):
+    """
+    Небольшой колледж: две группы одной специальности, три преподавателя
+    (Иванов ведет в обеих группах), три аудитории и по три пары с понедельника
+    по субботу. Решатель ограничен, чтобы генерация шла доли секунды
+    """
+    settings.SCHEDULE_SOLVER_TIME_LIMIT = 2
+    settings.SCHEDULE_SOLVER_ITERATIONS = 2000
+    specialty = Specialty.objects.create(name='Информационные системы', code='09.02.07')
+    course = Course.objects.create(number=1)
+    groups = [
+        StudentGroup.objects.create(name=name, specialty=specialty, course=course, study_form='б')
+        for name in ('ИС-11', 'ИС-12')
+    ]
+    teachers = [
+        Teacher.objects.create(last_name=last_name, first_name='Иван', middle_name='Петрович')
+        for last_name in ('Иванов', 'Петров', 'Сидоров')
+    ]
+    disciplines = [
+        Discipline.objects.create(name=name, specialty=specialty)
+        for name in ('Базы данных', 'Сети', 'Программирование')
+    ]
+    loads = [
+        TeachingLoad.objects.create(
+            discipline=disciplines[discipline], group=groups[group], teacher=teachers[teacher],
+            semester1_hours=32, semester2_hours=32, total_hours=64,
+        )
+        for discipline, group, teacher in ((0, 0, 0), (1, 0, 1), (0, 1, 0), (2, 1, 2))
+    ]
+    classrooms = [
+        Classroom.objects.create(number=number, capacity=30, type='lecture')
+        for number in ('101', '102', '103')
+    ]
+    time_slots = [
+        TimeSlot.objects.create(day_of_week=day, start_time=start, end_time=end)
+        for day in range(1, 7) for start, end in PAIRS
+    ]
+    return SimpleNamespace(
+        specialty=specialty, course=course, groups=groups, teachers=teachers, disciplines=disciplines,
+        loads=loads, classrooms=classrooms, time_slots=time_slots,
+    )
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DataServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'data_service'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,91 @@
+import datetime
+import factory
+from factory.django import DjangoModelFactory
+from .models import Classroom, Course, Discipline, Specialty, StudentGroup, Teacher, TeachingLoad, TimeSlot
+
+# Имена и названия генерируются на русском, как в реальных данных колледжа
+LOCALE = 'ru_RU'
+
+
+class SpecialtyFactory(DjangoModelFactory):
+    class Meta:
+        model = Specialty
+
+    name = factory.Faker('job', locale=LOCALE)
+    code = factory.Sequence(lambda n: f'09.02.{n % 100:02d}')
+
+
+class CourseFactory(DjangoModelFactory):
+    class Meta:
+        model = Course
+        django_get_or_create = ('number',)
+
+    number = factory.Iterator([1, 2, 3, 4])
+
+
+class StudentGroupFactory(DjangoModelFactory):
+    class Meta:
+        model = StudentGroup
+
+    name = factory.Sequence(lambda n: f'ГР-{n + 1}')
+    specialty = factory.SubFactory(SpecialtyFactory)
+    course = factory.SubFactory(CourseFactory)
+    study_form = factory.Iterator([code for code, _ in StudentGroup.STUDY_FORMS])
+    subgroup = None
+
+
+class DisciplineFactory(DjangoModelFactory):
+    class Meta:
+        model = Discipline
+
+    name = factory.Sequence(lambda n: f'Дисциплина {n + 1}')
+    specialty = factory.SubFactory(SpecialtyFactory)
+
+
+class TeacherFactory(DjangoModelFactory):
+    class Meta:
+        model = Teacher
+
+    last_name = factory.Faker('last_name_male', locale=LOCALE)
+    first_name = factory.Faker('first_name_male', locale=LOCALE)
+    middle_name = factory.Faker('middle_name_male', locale=LOCALE)
+
+
+class TeachingLoadFactory(DjangoModelFactory):
+    class Meta:
+        model = TeachingLoad
+
+    discipline = factory.SubFactory(DisciplineFactory)
+    group = factory.SubFactory(StudentGroupFactory, specialty=factory.SelfAttribute('..discipline.specialty'))
+    teacher = factory.SubFactory(TeacherFactory)
+    semester1_hours = factory.Faker('random_int', min=16, max=72, step=2)
+    semester2_hours = factory.Faker('random_int', min=16, max=72, step=2)
+    current_year_hours = factory.LazyAttribute(lambda load: load.semester1_hours + load.semester2_hours)
+    total_hours = factory.SelfAttribute('current_year_hours')
+
+
+class ClassroomFactory(DjangoModelFactory):
+    class Meta:
+        model = Classroom
+
+    number = factory.Sequence(lambda n: str(100 + n))
+    capacity = factory.Faker('random_int', min=15, max=120, step=5)
+    type = factory.Iterator([code for code, _ in Classroom.CLASSROOM_TYPES])
+
+
+class TimeSlotFactory(DjangoModelFactory):
+    """Пары по 90 минут с 8:00 и переменой 10 минут, по порядку внутри дня"""
+
+    class Meta:
+        model = TimeSlot
+
+    class Params:
+        number = factory.Sequence(lambda n: n % 6)
+
+    day_of_week = factory.Sequence(lambda n: n // 6 % 6 + 1)
+    start_time = factory.LazyAttribute(lambda slot: (
+        datetime.datetime.combine(datetime.date.min, datetime.time(8)) + datetime.timedelta(minutes=100 * slot.number)
+    ).time())
+    end_time = factory.LazyAttribute(lambda slot: (
+        datetime.datetime.combine(datetime.date.min, slot.start_time) + datetime.timedelta(minutes=90)
+    ).time())
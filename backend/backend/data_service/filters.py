@@ -0,0 +1,32 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+def _target_field(model, lookup):
+    field = None
+    for part in lookup.split('__'):
+        field = model._meta.get_field(part)
+        model = field.related_model
+    return field
+
+
+class FieldFilterBackend(BaseFilterBackend):
+    """
+    Фильтры по полям из filter_fields представления ({параметр: путь поля}):
+    ?group_id=1 или списком ?group_id=1,2,3.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        for param, lookup in getattr(view, 'filter_fields', {}).items():
+            value = request.query_params.get(param)
+            if not value:
+                continue
+
+            field = _target_field(queryset.model, lookup)
+            try:
+                values = [field.to_python(item.strip()) for item in value.split(',') if item.strip()]
+            except DjangoValidationError:
+                raise ValidationError({param: [f'Неверное значение: {value}']})
+            queryset = queryset.filter(**{f'{lookup}__in': values})
+        return queryset
@@ -0,0 +1,404 @@
+import csv
+import io
+import os
+import re
+import zipfile
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import transaction
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from .models import Course, Discipline, Specialty, StudentGroup, Teacher, TeachingLoad
+from .signals import post_bulk_save
+
+# Часовые столбцы нагрузки: все целочисленные поля модели
+HOUR_FIELDS = [
+    field.name for field in TeachingLoad._meta.concrete_fields
+    if field.get_internal_type() == 'IntegerField'
+]
+
+# Заголовок столбца (в нижнем регистре) -> поле строки импорта. Имена полей
+# модели принимаются всегда, русские подписи — для основных столбцов
+COLUMN_ALIASES = {
+    'преподаватель': 'teacher',
+    'группа': 'group',
+    'дисциплина': 'discipline',
+    'специальность': 'specialty',
+    'курс': 'course',
+    'форма обучения': 'study_form',
+    'всего часов': 'total_hours',
+    'самостоятельная работа': 'self_study_hours',
+    'часов на год': 'current_year_hours',
+    '1 семестр': 'semester1_hours',
+    '2 семестр': 'semester2_hours',
+}
+KNOWN_COLUMNS = {'teacher', 'group', 'discipline', 'specialty', 'course', 'study_form', *HOUR_FIELDS}
+
+STUDY_FORMS = {code for code, _ in StudentGroup.STUDY_FORMS}
+
+SHORT_NAME_RE = re.compile(r'^(\S+)\s+(\S)\.\s*(?:(\S)\.)?$')
+
+FORMAT_XLSX = 'xlsx'
+FORMAT_CSV = 'csv'
+
+
+class ImportFileError(Exception):
+    """Файл импорта не читается или не содержит обязательных столбцов"""
+
+
+def _key(value):
+    return ' '.join(str(value).split()).lower()
+
+
+def _split_name(value):
+    parts = str(value).split()
+    if len(parts) < 2:
+        return None
+    return parts[0], parts[1], ' '.join(parts[2:]) or None
+
+
+def detect_format(filename):
+    extension = os.path.splitext(filename or '')[1].lower().lstrip('.')
+    if extension in (FORMAT_XLSX, FORMAT_CSV):
+        return extension
+    raise ImportFileError('Поддерживаются файлы .xlsx и .csv')
+
+
+def _xlsx_rows(file):
+    # Режим read_only читает лист потоково, не загружая книгу в память
+    try:
+        wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError):
+        raise ImportFileError('Не удалось прочитать файл XLSX')
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _csv_rows(file):
+    text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        sample = text.read(4096)
+        text.seek(0)
+        try:
+            # Excel с русской локалью сохраняет CSV через точку с запятой
+            dialect = csv.Sniffer().sniff(sample, delimiters=';,\t')
+        except csv.Error:
+            dialect = csv.excel
+        yield from csv.reader(text, dialect)
+    except UnicodeDecodeError:
+        raise ImportFileError('CSV должен быть в кодировке UTF-8')
+
+
+def read_rows(file, file_format):
+    """
+    Читает заголовок файла. Возвращает поля найденных столбцов и генератор
+    строк словарями {поле: значение} с номером строки в файле
+    """
+    rows = _xlsx_rows(file) if file_format == FORMAT_XLSX else _csv_rows(file)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFileError('Файл пуст')
+
+    columns = []
+    for title in header:
+        name = _key(title) if title is not None else ''
+        name = COLUMN_ALIASES.get(name, name)
+        columns.append(name if name in KNOWN_COLUMNS else None)
+
+    missing = {'teacher', 'group', 'discipline'} - set(columns)
+    if missing:
+        raise ImportFileError(f"Нет обязательных столбцов: {', '.join(sorted(missing))}")
+    return {column for column in columns if column}, _dict_rows(rows, columns)
+
+
+def _dict_rows(rows, columns):
+    for number, values in enumerate(rows, start=2):
+        row = {
+            column: value for column, value in zip(columns, values)
+            if column and value not in (None, '')
+        }
+        if row:
+            yield number, row
+
+
+class TeachingLoadImporter:
+    """
+    Массовый импорт нагрузки из таблицы.
+
+    Строки обрабатываются пакетами по IMPORT_BATCH_SIZE: преподаватели,
+    группы, дисциплины и специальности ищутся по естественным ключам в
+    словарях, загруженных один раз, недостающие справочники создаются
+    bulk_create, а нагрузки записываются одним upsert на пакет
+    (bulk_create с update_conflicts по unique_teaching_load). Каждый пакет
+    фиксируется отдельной транзакцией; ошибочные строки пропускаются и
+    попадают в отчет. После импорта записанные объекты передаются сигналу
+    post_bulk_save, как при массовых операциях API.
+    """
+
+    def __init__(self, batch_size=None, dry_run=False):
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.dry_run = dry_run
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.created_references = {'specialties': 0, 'courses': 0, 'groups': 0, 'disciplines': 0, 'teachers': 0}
+        self.errors = []
+        # Часовые столбцы, которые есть в файле: остальные часы нагрузок не
+        # меняются при повторном импорте
+        self.hour_fields = []
+        # (модель, created) -> объекты зафиксированных пакетов для post_bulk_save
+        self._saved = {}
+        self._batch_saved = {}
+        self._load_maps()
+
+    def _load_maps(self):
+        self.specialties = {_key(name): pk for pk, name in Specialty.objects.values_list('id', 'name')}
+        self.courses = dict(Course.objects.values_list('number', 'id'))
+        self.groups = {}
+        self.group_specialties = {}
+        for pk, name, specialty_id in StudentGroup.objects.values_list('id', 'name', 'specialty_id'):
+            self.groups[_key(name)] = pk
+            self.group_specialties[pk] = specialty_id
+        self.disciplines = {
+            (_key(name), specialty_id): pk
+            for pk, name, specialty_id in Discipline.objects.values_list('id', 'name', 'specialty_id')
+        }
+        self.teachers = {}
+        # Короткое имя («Иванов И.И.») допускается, если оно однозначно
+        self.teacher_short_names = {}
+        for pk, last_name, first_name, middle_name in Teacher.objects.values_list(
+            'id', 'last_name', 'first_name', 'middle_name'
+        ):
+            self._remember_teacher(pk, last_name, first_name, middle_name)
+        self.loads = set(TeachingLoad.objects.values_list('discipline_id', 'group_id', 'teacher_id'))
+
+    def _remember_teacher(self, pk, last_name, first_name, middle_name):
+        self.teachers[(_key(last_name), _key(first_name), _key(middle_name or ''))] = pk
+        short_key = (_key(last_name), _key(first_name)[:1], _key(middle_name or '')[:1])
+        self.teacher_short_names[short_key] = None if short_key in self.teacher_short_names else pk
+
+    def run(self, file, file_format):
+        # Пробный запуск выполняется в одной транзакции и откатывается
+        # целиком, обычный фиксирует каждый пакет отдельно
+        try:
+            with transaction.atomic() if self.dry_run else nullcontext():
+                fields, rows = read_rows(file, file_format)
+                self.hour_fields = [name for name in HOUR_FIELDS if name in fields]
+                batch = []
+                for number, row in rows:
+                    self.rows += 1
+                    batch.append((number, row))
+                    if len(batch) >= self.batch_size:
+                        self._import_batch(batch)
+                        batch = []
+                if batch:
+                    self._import_batch(batch)
+
+                if self.dry_run:
+                    transaction.set_rollback(True)
+        finally:
+            # Пакеты, зафиксированные до ошибки в файле, тоже сохранены
+            if not self.dry_run:
+                self._send_saved()
+        return self.report()
+
+    def _send_saved(self):
+        """
+        Один сигнал на модель за весь импорт: версия справочников и кэш
+        расписаний сбрасываются один раз, а не после каждого пакета
+        """
+        saved, self._saved = self._saved, {}
+        for (model, created), instances in saved.items():
+            post_bulk_save.send(sender=model, instances=instances, created=created)
+
+    def report(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': len(self.errors),
+            'created_references': self.created_references,
+            'dry_run': self.dry_run,
+            'errors': sorted(self.errors, key=lambda error: error['row']),
+        }
+
+    def _import_batch(self, batch):
+        self._batch_saved = {}
+        with transaction.atomic():
+            rows = []
+            for number, row in batch:
+                errors = self._validate(row)
+                if errors:
+                    self.errors.append({'row': number, 'errors': errors})
+                else:
+                    rows.append((number, row))
+
+            self._create_references(rows)
+            self._upsert_loads(rows)
+        # Объекты пакета учитываются только после его фиксации
+        for key, instances in self._batch_saved.items():
+            self._saved.setdefault(key, []).extend(instances)
+
+    def _validate(self, row):
+        errors = {}
+        for name in ('teacher', 'group', 'discipline'):
+            if name not in row:
+                errors[name] = 'Обязательное поле'
+
+        for name in HOUR_FIELDS:
+            value = row.get(name)
+            if value is None:
+                continue
+            try:
+                number = float(str(value).replace(',', '.'))
+            except ValueError:
+                errors[name] = f'Ожидается число: {value}'
+                continue
+            if not number.is_integer() or number < 0:
+                errors[name] = f'Ожидается целое неотрицательное число: {value}'
+            else:
+                row[name] = int(number)
+
+        if 'course' in row:
+            try:
+                row['course'] = int(float(str(row['course'])))
+            except ValueError:
+                errors['course'] = f"Ожидается номер курса: {row['course']}"
+        if 'study_form' in row and _key(row['study_form']) not in STUDY_FORMS:
+            errors['study_form'] = f"Неизвестная форма обучения: {row['study_form']}"
+        if 'teacher' in row and self._teacher_key(row['teacher']) is None:
+            errors['teacher'] = f"Укажите фамилию, имя и отчество: {row['teacher']}"
+        return errors
+
+    def _teacher_key(self, value):
+        match = SHORT_NAME_RE.match(str(value).strip())
+        if match:
+            # Короткое имя: создать преподавателя по нему нельзя, только найти
+            return ('short',) + tuple(_key(part or '') for part in match.groups())
+        name = _split_name(value)
+        if name is None:
+            return None
+        last_name, first_name, middle_name = name
+        return (_key(last_name), _key(first_name), _key(middle_name or ''))
+
+    def _create_references(self, rows):
+        """Создает недостающие справочники пакета: по одному INSERT на модель"""
+        specialties = {}
+        for _, row in rows:
+            if 'specialty' in row and _key(row['specialty']) not in self.specialties:
+                specialties.setdefault(_key(row['specialty']), Specialty(name=str(row['specialty']).strip()))
+        self._bulk_create(Specialty, specialties, self.specialties, 'specialties')
+
+        courses = {}
+        for _, row in rows:
+            if 'course' in row and row['course'] not in self.courses:
+                courses.setdefault(row['course'], Course(number=row['course']))
+        self._bulk_create(Course, courses, self.courses, 'courses')
+
+        groups = {}
+        for number, row in rows:
+            key = _key(row['group'])
+            if key in self.groups or key in groups:
+                continue
+            if 'specialty' not in row or 'course' not in row:
+                continue
+            groups[key] = StudentGroup(
+                name=str(row['group']).strip(),
+                specialty_id=self.specialties[_key(row['specialty'])],
+                course_id=self.courses[row['course']],
+                study_form=_key(row.get('study_form', 'б')),
+            )
+        self._bulk_create(StudentGroup, groups, self.groups, 'groups')
+        for group in groups.values():
+            self.group_specialties[group.pk] = group.specialty_id
+
+        disciplines = {}
+        for _, row in rows:
+            specialty_id = self._discipline_specialty(row)
+            key = (_key(row['discipline']), specialty_id)
+            if specialty_id is not None and key not in self.disciplines:
+                disciplines.setdefault(key, Discipline(name=str(row['discipline']).strip(), specialty_id=specialty_id))
+        self._bulk_create(Discipline, disciplines, self.disciplines, 'disciplines')
+
+        teachers = {}
+        for _, row in rows:
+            key = self._teacher_key(row['teacher'])
+            if key[0] != 'short' and key not in self.teachers:
+                last_name, first_name, middle_name = _split_name(row['teacher'])
+                teachers.setdefault(key, Teacher(last_name=last_name, first_name=first_name, middle_name=middle_name))
+        self._bulk_create(Teacher, teachers, self.teachers, 'teachers')
+        for teacher in teachers.values():
+            self._remember_teacher(teacher.pk, teacher.last_name, teacher.first_name, teacher.middle_name)
+
+    def _bulk_create(self, model, objects, lookup, counter):
+        if not objects:
+            return
+        # PostgreSQL и SQLite возвращают первичные ключи созданных строк
+        model.objects.bulk_create(objects.values(), batch_size=self.batch_size)
+        for key, obj in objects.items():
+            lookup[key] = obj.pk
+        self.created_references[counter] += len(objects)
+        self._batch_saved.setdefault((model, True), []).extend(objects.values())
+
+    def _discipline_specialty(self, row):
+        # Дисциплина без специальности относится к специальности группы
+        if 'specialty' in row:
+            return self.specialties.get(_key(row['specialty']))
+        return self.group_specialties.get(self.groups.get(_key(row['group'])))
+
+    def _resolve(self, row):
+        errors = {}
+        group_id = self.groups.get(_key(row['group']))
+        if group_id is None:
+            errors['group'] = f"Группа не найдена, для создания укажите специальность и курс: {row['group']}"
+
+        discipline_id = self.disciplines.get((_key(row['discipline']), self._discipline_specialty(row)))
+        if discipline_id is None and group_id is not None:
+            errors['discipline'] = f"Дисциплина не найдена: {row['discipline']}"
+
+        key = self._teacher_key(row['teacher'])
+        if key[0] == 'short':
+            teacher_id = self.teacher_short_names.get(key[1:])
+        else:
+            teacher_id = self.teachers.get(key)
+        if teacher_id is None:
+            errors['teacher'] = f"Преподаватель не найден или не определяется однозначно: {row['teacher']}"
+        return (discipline_id, group_id, teacher_id), errors
+
+    def _upsert_loads(self, rows):
+        loads = {}
+        for number, row in rows:
+            key, errors = self._resolve(row)
+            if errors:
+                self.errors.append({'row': number, 'errors': errors})
+                continue
+            # Повтор ключа в пакете: побеждает последняя строка, иначе
+            # PostgreSQL отклонит upsert, затрагивающий строку дважды
+            discipline_id, group_id, teacher_id = key
+            loads[key] = TeachingLoad(
+                discipline_id=discipline_id,
+                group_id=group_id,
+                teacher_id=teacher_id,
+                **{name: row.get(name) for name in self.hour_fields},
+            )
+
+        if not loads:
+            return
+        if self.hour_fields:
+            conflicts = {
+                'update_conflicts': True,
+                'unique_fields': ['discipline', 'group', 'teacher'],
+                'update_fields': self.hour_fields,
+            }
+        else:
+            # Без часовых столбцов существующие нагрузки остаются как есть
+            conflicts = {'ignore_conflicts': True}
+        TeachingLoad.objects.bulk_create(loads.values(), batch_size=self.batch_size, **conflicts)
+        created = set(loads) - self.loads
+        for key, load in loads.items():
+            self._batch_saved.setdefault((TeachingLoad, key in created), []).append(load)
+        self.created += len(created)
+        self.updated += len(loads) - len(created)
+        self.loads.update(created)
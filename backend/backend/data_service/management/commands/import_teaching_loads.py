@@ -0,0 +1,36 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from data_service.importers import ImportFileError, TeachingLoadImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = 'Импортирует учебную нагрузку из XLSX/CSV пакетами с upsert по естественному ключу'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл .xlsx или .csv')
+        parser.add_argument('--batch-size', type=int, default=None, help='Строк в пакете')
+        parser.add_argument('--dry-run', action='store_true', help='Проверить файл и откатить изменения')
+        parser.add_argument('--report', help='Сохранить отчет об ошибках в JSON')
+
+    def handle(self, *args, **options):
+        importer = TeachingLoadImporter(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        try:
+            with open(options['path'], 'rb') as file:
+                report = importer.run(file, detect_format(options['path']))
+        except (ImportFileError, OSError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            with open(options['report'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+        for error in report['errors'][:20]:
+            details = '; '.join(f'{field}: {message}' for field, message in error['errors'].items())
+            self.stderr.write(f"Строка {error['row']}: {details}")
+        if len(report['errors']) > 20:
+            self.stderr.write(f"... и еще {len(report['errors']) - 20} строк с ошибками")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Строк: {report['rows']}, создано: {report['created']}, обновлено: {report['updated']}, "
+            f"пропущено: {report['skipped']}" + (' (пробный запуск)' if report['dry_run'] else '')
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from data_service.synthesis import COLLEGE_SIZES, flush_college, synthesize_college
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическим колледжем: специальности, группы, преподаватели, аудитории и нагрузка'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=COLLEGE_SIZES, default='small', help='Типовой размер колледжа')
+        for name in COLLEGE_SIZES['small']:
+            parser.add_argument(f"--{name.replace('_', '-')}", type=int, help='Переопределяет значение размера')
+        parser.add_argument('--slots-per-day', type=int, default=6)
+        parser.add_argument('--days', type=int, default=6, help='Учебных дней в неделе')
+        parser.add_argument('--seed', type=int, default=None)
+        parser.add_argument('--flush', action='store_true', help='Удалить существующие данные перед синтезом')
+
+    def handle(self, *args, **options):
+        params = {
+            name: options[name] if options[name] is not None else value
+            for name, value in COLLEGE_SIZES[options['size']].items()
+        }
+        if options['flush']:
+            flush_college()
+
+        created = synthesize_college(
+            slots_per_day=options['slots_per_day'], days=options['days'], seed=options['seed'], **params
+        )
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{name}: {count}' for name, count in created.items())
+        ))
@@ -0,0 +1,131 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Classroom',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=50)),
+                ('capacity', models.IntegerField(blank=True, null=True)),
+                ('type', models.CharField(choices=[('lecture', 'Лекционная'), ('lab', 'Лаборатория'), ('practice', 'Практическая')], default='lecture', max_length=20)),
+            ],
+            options={
+                'db_table': 'classrooms',
+            },
+        ),
+        migrations.CreateModel(
+            name='Course',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.IntegerField()),
+            ],
+            options={
+                'db_table': 'courses',
+            },
+        ),
+        migrations.CreateModel(
+            name='Discipline',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+            ],
+            options={
+                'db_table': 'disciplines',
+            },
+        ),
+        migrations.CreateModel(
+            name='Specialty',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('code', models.CharField(blank=True, max_length=50, null=True)),
+            ],
+            options={
+                'db_table': 'specialties',
+            },
+        ),
+        migrations.CreateModel(
+            name='StudentGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('study_form', models.CharField(choices=[('б', 'Бюджет'), ('п', 'Коммерция'), ('в', 'Вечернее')], max_length=1)),
+                ('subgroup', models.IntegerField(blank=True, null=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.course')),
+                ('specialty', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.specialty')),
+            ],
+            options={
+                'db_table': 'student_groups',
+            },
+        ),
+        migrations.CreateModel(
+            name='Teacher',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_name', models.CharField(max_length=100)),
+                ('first_name', models.CharField(max_length=100)),
+                ('middle_name', models.CharField(blank=True, max_length=100, null=True)),
+            ],
+            options={
+                'db_table': 'teachers',
+            },
+        ),
+        migrations.CreateModel(
+            name='TimeSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('day_of_week', models.IntegerField(choices=[(1, 'Понедельник'), (2, 'Вторник'), (3, 'Среда'), (4, 'Четверг'), (5, 'Пятница'), (6, 'Суббота'), (7, 'Воскресенье')])),
+            ],
+            options={
+                'db_table': 'time_slots',
+            },
+        ),
+        migrations.CreateModel(
+            name='TeachingLoad',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_hours', models.IntegerField(blank=True, null=True)),
+                ('self_study_hours', models.IntegerField(blank=True, null=True)),
+                ('current_year_hours', models.IntegerField(blank=True, null=True)),
+                ('semester1_hours', models.IntegerField(blank=True, null=True)),
+                ('semester2_hours', models.IntegerField(blank=True, null=True)),
+                ('hours_to_issue', models.IntegerField(blank=True, null=True)),
+                ('course_design_hours', models.IntegerField(blank=True, null=True)),
+                ('semester1_exams', models.IntegerField(blank=True, null=True)),
+                ('semester2_exams', models.IntegerField(blank=True, null=True)),
+                ('course_work_check_hours', models.IntegerField(blank=True, null=True)),
+                ('consultations_hours', models.IntegerField(blank=True, null=True)),
+                ('dp_review_hours', models.IntegerField(blank=True, null=True)),
+                ('dp_guidance_hours', models.IntegerField(blank=True, null=True)),
+                ('total_teaching_hours', models.IntegerField(blank=True, null=True)),
+                ('master_training_hours', models.IntegerField(blank=True, null=True)),
+                ('advanced_level_hours', models.IntegerField(blank=True, null=True)),
+                ('notebook_check_10_percent', models.IntegerField(blank=True, null=True)),
+                ('notebook_check_15_percent', models.IntegerField(blank=True, null=True)),
+                ('discipline', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.discipline')),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.studentgroup')),
+                ('teacher', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.teacher')),
+            ],
+            options={
+                'db_table': 'teaching_loads',
+            },
+        ),
+        migrations.AddField(
+            model_name='discipline',
+            name='specialty',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='data_service.specialty'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:39
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    """
+    Импорт обновляет нагрузку по ключу (дисциплина, группа, преподаватель),
+    поэтому повторы ключа нужно устранить до создания ограничения
+    """
+    TeachingLoad = apps.get_model('data_service', 'TeachingLoad')
+    duplicates = list(
+        TeachingLoad.objects.values('discipline', 'group', 'teacher')
+        .annotate(count=Count('id')).filter(count__gt=1)
+        .order_by('discipline', 'group', 'teacher')
+    )
+    if duplicates:
+        errors = [
+            f"дисциплина {row['discipline']}, группа {row['group']}, преподаватель {row['teacher']}: "
+            f"{row['count']} нагрузки"
+            for row in duplicates
+        ]
+        raise RuntimeError(
+            'Повторы учебной нагрузки, ограничение уникальности не создано:\n' + '\n'.join(errors)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='teachingload',
+            constraint=models.UniqueConstraint(fields=('discipline', 'group', 'teacher'), name='unique_teaching_load'),
+        ),
+    ]
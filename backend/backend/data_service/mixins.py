@@ -0,0 +1,173 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from .signals import post_bulk_save
+
+
+def _parse_ids(values):
+    try:
+        return [int(value) for value in values]
+    except (TypeError, ValueError):
+        raise ValidationError({'ids': ['Ожидается список целых идентификаторов']})
+
+
+def _unique_field_sets(model):
+    field_sets = [tuple(fields) for fields in model._meta.unique_together]
+    field_sets += [tuple(constraint.fields) for constraint in model._meta.total_unique_constraints]
+    return field_sets
+
+
+def _check_unique(model, instances):
+    """
+    Проверяет ограничения уникальности модели для пакета: повторы внутри
+    пакета и совпадения с уже сохраненными объектами вне пакета. Сериализатор
+    с many=True этого не делает, а bulk_create вернул бы IntegrityError.
+    """
+    errors = [{} for _ in instances]
+    batch_pks = {instance.pk for instance in instances if instance.pk is not None}
+    for fields in _unique_field_sets(model):
+        attnames = [model._meta.get_field(name).attname for name in fields]
+        keys = [tuple(getattr(instance, attname) for attname in attnames) for instance in instances]
+        message = f"Нарушена уникальность полей {', '.join(fields)}"
+
+        seen = {}
+        for index, key in enumerate(keys):
+            if None in key:
+                continue
+            if key in seen:
+                errors[index].setdefault('non_field_errors', []).append(
+                    f'{message}: совпадает с объектом {seen[key] + 1} пакета'
+                )
+            else:
+                seen[key] = index
+
+        if not seen:
+            continue
+        existing = model.objects.filter(**{f'{attnames[0]}__in': {key[0] for key in seen}})
+        existing = set(existing.exclude(pk__in=batch_pks).values_list(*attnames))
+        for key, index in seen.items():
+            if key in existing:
+                errors[index].setdefault('non_field_errors', []).append(f'{message}: такой объект уже есть')
+    if any(errors):
+        raise ValidationError(errors)
+
+
+class BulkModelMixin:
+    """
+    Массовые операции над списком объектов одним запросом:
+
+    POST   <список>/bulk/ — массив объектов, создание через bulk_create;
+    PATCH  <список>/bulk/ — массив объектов с id, bulk_update переданных полей;
+    DELETE <список>/bulk/ — {"ids": [...]} или ?ids=1,2,3.
+
+    Данные проверяются сериализатором с many=True, изменения выполняются в
+    одной транзакции: при ошибке в любом объекте не сохраняется ничего.
+    """
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        if request.method == 'DELETE':
+            return self._bulk_destroy(request)
+
+        items = request.data
+        if not isinstance(items, list):
+            return Response({'error': 'Ожидается массив объектов'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.DATA_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Не более {settings.DATA_BULK_MAX_ITEMS} объектов за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if request.method == 'POST':
+            return self._bulk_create(items)
+        return self._bulk_update(items)
+
+    def _bulk_create(self, items):
+        serializer = self.get_serializer(data=items, many=True)
+        serializer.is_valid(raise_exception=True)
+
+        model = self.get_queryset().model
+        instances = [model(**attrs) for attrs in serializer.validated_data]
+        _check_unique(model, instances)
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(instances)
+                post_bulk_save.send(sender=model, instances=instances, created=True)
+        except IntegrityError:
+            # Параллельный запрос успел сохранить такой же объект после проверки
+            raise ValidationError(['Объекты нарушают ограничение уникальности'])
+
+        return Response(self.get_serializer(instances, many=True).data, status=status.HTTP_201_CREATED)
+
+    def _bulk_update(self, items):
+        errors = [{} for _ in items]
+        ids = []
+        for item, item_errors in zip(items, errors):
+            try:
+                ids.append(int(item['id']))
+            except (KeyError, TypeError, ValueError):
+                ids.append(None)
+                item_errors['id'] = ['Обязательное поле']
+
+        instances = self.get_queryset().in_bulk([pk for pk in ids if pk is not None])
+        seen = set()
+        for pk, item_errors in zip(ids, errors):
+            if pk is None:
+                continue
+            if pk not in instances:
+                item_errors['id'] = [f'Объект {pk} не найден']
+            elif pk in seen:
+                item_errors['id'] = [f'Объект {pk} передан повторно']
+            seen.add(pk)
+        if any(errors):
+            raise ValidationError(errors)
+
+        ordered = [instances[pk] for pk in ids]
+        serializer = self.get_serializer(ordered, data=items, many=True, partial=True)
+        serializer.is_valid(raise_exception=True)
+
+        fields = set()
+        for instance, attrs in zip(ordered, serializer.validated_data):
+            for name, value in attrs.items():
+                setattr(instance, name, value)
+                fields.add(name)
+
+        if fields:
+            model = self.get_queryset().model
+            _check_unique(model, ordered)
+            try:
+                with transaction.atomic():
+                    model.objects.bulk_update(ordered, sorted(fields))
+                    post_bulk_save.send(sender=model, instances=ordered, created=False)
+            except IntegrityError:
+                raise ValidationError(['Объекты нарушают ограничение уникальности'])
+
+        return Response(self.get_serializer(ordered, many=True).data)
+
+    def _bulk_destroy(self, request):
+        if isinstance(request.data, dict) and 'ids' in request.data:
+            ids = request.data['ids']
+        else:
+            ids = [value for value in request.query_params.get('ids', '').split(',') if value]
+        if not isinstance(ids, list) or not ids:
+            raise ValidationError({'ids': ['Передайте список идентификаторов']})
+        ids = set(_parse_ids(ids))
+        if len(ids) > settings.DATA_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f'Не более {settings.DATA_BULK_MAX_ITEMS} объектов за запрос'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = self.get_queryset().filter(pk__in=ids)
+        missing = ids - set(queryset.values_list('pk', flat=True))
+        if missing:
+            raise ValidationError({'ids': [f"Объекты не найдены: {', '.join(map(str, sorted(missing)))}"]})
+
+        # Каскадное удаление отправляет post_delete по каждому объекту, поэтому
+        # кэш расписания сбрасывается обычными обработчиками
+        with transaction.atomic():
+            queryset.delete()
+        return Response({'deleted': len(ids)})
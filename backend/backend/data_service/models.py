@@ -55,7 +55,11 @@ class Teacher(models.Model):
     
     @property
     def short_name(self):
-        return f"{self.last_name} {self.first_name[0]}.{self.middle_name[0] + '.' if self.middle_name else ''}"
+        return self.format_short_name(self.last_name, self.first_name, self.middle_name)
+
+    @staticmethod
+    def format_short_name(last_name, first_name, middle_name=None):
+        return f"{last_name} {first_name[0]}.{middle_name[0] + '.' if middle_name else ''}"
 
     def __str__(self):
         return self.short_name
@@ -91,6 +95,13 @@ class TeachingLoad(models.Model):
     
     class Meta:
         db_table = 'teaching_loads'
+        constraints = [
+            # Естественный ключ нагрузки: по нему импорт обновляет строки
+            models.UniqueConstraint(
+                fields=['discipline', 'group', 'teacher'],
+                name='unique_teaching_load'
+            ),
+        ]
 
 class Classroom(models.Model):
     CLASSROOM_TYPES = [
@@ -0,0 +1,47 @@
+from django.conf import settings
+from rest_framework.pagination import BasePagination, CursorPagination, LimitOffsetPagination
+
+
+class DataLimitOffsetPagination(LimitOffsetPagination):
+    max_limit = None
+
+    def get_limit(self, request):
+        self.max_limit = settings.DATA_MAX_PAGE_SIZE
+        return super().get_limit(request) or settings.DATA_PAGE_SIZE
+
+
+class DataCursorPagination(CursorPagination):
+    # Сортировка по умолчанию берется из OrderingFilter представления
+    ordering = 'id'
+    page_size_query_param = 'page_size'
+
+    def get_page_size(self, request):
+        self.page_size = settings.DATA_PAGE_SIZE
+        self.max_page_size = settings.DATA_MAX_PAGE_SIZE
+        return super().get_page_size(request)
+
+
+class DataPagination(BasePagination):
+    """
+    Необязательная пагинация справочников.
+
+    ?limit=&offset= — страницы по смещению с общим числом записей;
+    ?cursor= или ?page_size= — курсор по ключу сортировки: следующая страница
+    выбирается условием «ключ больше последнего», поэтому время ответа не
+    зависит ни от размера таблицы, ни от номера страницы.
+    Без этих параметров список отдается целиком, как раньше.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if 'cursor' in params or 'page_size' in params:
+            self.paginator = DataCursorPagination()
+        elif 'limit' in params or 'offset' in params:
+            self.paginator = DataLimitOffsetPagination()
+        else:
+            self.paginator = None
+            return None
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
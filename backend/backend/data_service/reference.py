@@ -0,0 +1,82 @@
+import threading
+import time
+from types import MappingProxyType
+from django.core.cache import cache
+from django.db import transaction
+from .models import Classroom, Course, Specialty, TimeSlot
+
+# Версия справочников хранится в общем кэше (Redis), чтобы изменение в одном
+# процессе видели все воркеры; сами справочники держит каждый процесс
+VERSION_KEY = 'reference:version'
+
+_lock = threading.Lock()
+_snapshot = None
+
+
+def _group(records, key):
+    groups = {}
+    for record in records:
+        groups.setdefault(key(record), []).append(record)
+    return MappingProxyType({name: tuple(items) for name, items in groups.items()})
+
+
+class ReferenceData:
+    """
+    Снимок редко меняющихся справочников: пары, аудитории, специальности и
+    курсы. Контейнеры неизменяемые, а объекты моделей общие для всех
+    запросов процесса, поэтому изменять их нельзя.
+    """
+
+    def __init__(self, version, time_slots, classrooms, specialties, courses):
+        self.version = version
+        # Пары в порядке дня недели и начала
+        self.time_slot_list = tuple(sorted(time_slots, key=lambda slot: (slot.day_of_week, slot.start_time)))
+        self.time_slots = MappingProxyType({slot.id: slot for slot in self.time_slot_list})
+        self.slots_by_day = _group(self.time_slot_list, lambda slot: slot.day_of_week)
+
+        self.classroom_list = tuple(sorted(classrooms, key=lambda classroom: classroom.id))
+        self.classrooms = MappingProxyType({classroom.id: classroom for classroom in self.classroom_list})
+        self.classrooms_by_type = _group(self.classroom_list, lambda classroom: classroom.type)
+
+        self.specialties = MappingProxyType({specialty.id: specialty for specialty in specialties})
+        self.courses = MappingProxyType({course.id: course for course in courses})
+
+    @classmethod
+    def load(cls, version):
+        return cls(
+            version,
+            TimeSlot.objects.all(),
+            Classroom.objects.all(),
+            Specialty.objects.all(),
+            Course.objects.all(),
+        )
+
+
+def get_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, time.time(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def get_reference_data():
+    """
+    Текущий снимок справочников. Каждое обращение сверяет версию с общим
+    кэшем (один GET), а перечитывает таблицы, только если версия сменилась.
+    """
+    global _snapshot
+    version = get_version()
+    snapshot = _snapshot
+    if snapshot is None or snapshot.version != version:
+        with _lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = ReferenceData.load(version)
+            snapshot = _snapshot
+    return snapshot
+
+
+def bump_version():
+    # Версия сдвигается после фиксации транзакции, иначе другой процесс
+    # успеет перечитать старые данные под новой версией
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time(), None))
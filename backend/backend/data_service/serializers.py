@@ -1,44 +1,87 @@
 from rest_framework import serializers
 from .models import *
 
-class SpecialtySerializer(serializers.ModelSerializer):
+class DynamicFieldsMixin:
+    """
+    Частичный ответ и раскрытие связей: fields — выводимые поля (?fields=),
+    expand — связи из Meta.expandable, которые выводятся вложенными
+    объектами вместо id (?expand=).
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+        expandable = getattr(self.Meta, 'expandable', {})
+        for field_name in expand or ():
+            if field_name in expandable and field_name in self.fields:
+                self.fields[field_name] = expandable[field_name](read_only=True)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class SpecialtySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Specialty
         fields = '__all__'
 
-class CourseSerializer(serializers.ModelSerializer):
+class CourseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Course
         fields = '__all__'
 
-class StudentGroupSerializer(serializers.ModelSerializer):
+class StudentGroupSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = StudentGroup
         fields = '__all__'
+        expandable = {'specialty': SpecialtySerializer, 'course': CourseSerializer}
 
-class DisciplineSerializer(serializers.ModelSerializer):
+class DisciplineSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Discipline
         fields = '__all__'
+        expandable = {'specialty': SpecialtySerializer}
 
-class TeacherSerializer(serializers.ModelSerializer):
+class TeacherSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     short_name = serializers.CharField(read_only=True)
     
     class Meta:
         model = Teacher
         fields = '__all__'
 
-class TeachingLoadSerializer(serializers.ModelSerializer):
+class TeachingLoadSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TeachingLoad
         fields = '__all__'
+        expandable = {
+            'discipline': DisciplineSerializer,
+            'group': StudentGroupSerializer,
+            'teacher': TeacherSerializer,
+        }
+
+    def validate(self, attrs):
+        # Ограничение unique_teaching_load DRF сам не проверяет. Массовые
+        # операции проверяют его для всего пакета в BulkModelMixin
+        if self.parent is not None:
+            return attrs
+        instance = self.instance
+        key = {
+            name: attrs[name] if name in attrs else getattr(instance, name, None)
+            for name in ('discipline', 'group', 'teacher')
+        }
+        duplicates = TeachingLoad.objects.filter(**key)
+        if instance is not None:
+            duplicates = duplicates.exclude(pk=instance.pk)
+        if duplicates.exists():
+            raise serializers.ValidationError('Нагрузка с такими дисциплиной, группой и преподавателем уже есть')
+        return attrs
 
-class ClassroomSerializer(serializers.ModelSerializer):
+class ClassroomSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Classroom
         fields = '__all__'
 
-class TimeSlotSerializer(serializers.ModelSerializer):
+class TimeSlotSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TimeSlot
         fields = '__all__'
\ No newline at end of file
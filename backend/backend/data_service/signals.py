@@ -0,0 +1,27 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from .models import Classroom, Course, Specialty, TimeSlot
+from .reference import bump_version
+
+# bulk_create и bulk_update не отправляют post_save. Массовые операции API
+# отправляют этот сигнал с аргументами instances и created, чтобы зависимые
+# данные (кэш и денормализованные поля расписания) обновлялись так же, как
+# при сохранении по одному объекту
+post_bulk_save = Signal()
+
+
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+@receiver(post_bulk_save, sender=TimeSlot)
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+@receiver(post_bulk_save, sender=Classroom)
+@receiver(post_save, sender=Specialty)
+@receiver(post_delete, sender=Specialty)
+@receiver(post_bulk_save, sender=Specialty)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_bulk_save, sender=Course)
+def bump_reference_version(sender, **kwargs):
+    # Все процессы перечитают справочники при следующем обращении
+    bump_version()
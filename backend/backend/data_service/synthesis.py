@@ -0,0 +1,95 @@
+import random
+import factory.random
+from django.db import transaction
+from .factories import (
+    ClassroomFactory, CourseFactory, DisciplineFactory, SpecialtyFactory,
+    StudentGroupFactory, TeacherFactory, TeachingLoadFactory, TimeSlotFactory,
+)
+from .models import Classroom, Course, Discipline, Specialty, StudentGroup, Teacher, TeachingLoad, TimeSlot
+from .signals import post_bulk_save
+
+# Типовые размеры колледжа для синтеза данных и замеров производительности
+COLLEGE_SIZES = {
+    'small': {
+        'specialties': 2, 'groups': 6, 'teachers': 12, 'classrooms': 10,
+        'disciplines': 8, 'loads_per_group': 6,
+    },
+    'medium': {
+        'specialties': 5, 'groups': 25, 'teachers': 50, 'classrooms': 30,
+        'disciplines': 12, 'loads_per_group': 8,
+    },
+    'large': {
+        'specialties': 10, 'groups': 60, 'teachers': 120, 'classrooms': 70,
+        'disciplines': 16, 'loads_per_group': 10,
+    },
+}
+
+# Модели в порядке удаления: зависимые раньше справочников
+SYNTHESIZED_MODELS = [
+    TeachingLoad, Discipline, StudentGroup, Teacher, Classroom, TimeSlot, Specialty, Course,
+]
+
+
+def _bulk_create(model, instances):
+    model.objects.bulk_create(instances)
+    # Кэш расписания и снимок справочников обновляются как при массовом API
+    post_bulk_save.send(sender=model, instances=instances, created=True)
+    return instances
+
+
+@transaction.atomic
+def synthesize_college(specialties, groups, teachers, classrooms, disciplines, loads_per_group,
+                       slots_per_day=6, days=6, seed=None):
+    """
+    Создает синтетический колледж фабриками data_service и записывает его
+    пакетными INSERT. disciplines — дисциплин на специальность,
+    loads_per_group — нагрузок на группу (не больше числа дисциплин).
+    Пары создаются, только если таблица пар пуста.
+    """
+    rng = random.Random(seed)
+    if seed is not None:
+        factory.random.reseed_random(seed)
+
+    courses = [CourseFactory(number=number) for number in (1, 2, 3, 4)]
+    specialty_list = _bulk_create(Specialty, SpecialtyFactory.build_batch(specialties))
+    teacher_list = _bulk_create(Teacher, TeacherFactory.build_batch(teachers))
+    _bulk_create(Classroom, ClassroomFactory.build_batch(classrooms))
+    if not TimeSlot.objects.exists():
+        _bulk_create(TimeSlot, [
+            TimeSlotFactory.build(day_of_week=day, number=number)
+            for day in range(1, days + 1) for number in range(slots_per_day)
+        ])
+
+    disciplines_by_specialty = {
+        specialty.id: _bulk_create(Discipline, DisciplineFactory.build_batch(disciplines, specialty=specialty))
+        for specialty in specialty_list
+    }
+    group_list = _bulk_create(StudentGroup, [
+        StudentGroupFactory.build(specialty=specialty_list[index % len(specialty_list)], course=rng.choice(courses))
+        for index in range(groups)
+    ])
+
+    # Преподаватели назначаются по кругу, чтобы нагрузка распределялась равномерно
+    loads = []
+    for index, group in enumerate(group_list):
+        group_disciplines = disciplines_by_specialty[group.specialty_id]
+        for offset, discipline in enumerate(rng.sample(group_disciplines, min(loads_per_group, len(group_disciplines)))):
+            teacher = teacher_list[(index * loads_per_group + offset) % len(teacher_list)]
+            loads.append(TeachingLoadFactory.build(discipline=discipline, group=group, teacher=teacher))
+    _bulk_create(TeachingLoad, loads)
+
+    return {
+        'specialties': len(specialty_list),
+        'groups': len(group_list),
+        'teachers': len(teacher_list),
+        'classrooms': classrooms,
+        'disciplines': sum(len(items) for items in disciplines_by_specialty.values()),
+        'teaching_loads': len(loads),
+    }
+
+
+def flush_college():
+    """Удаляет справочники и нагрузку; занятия удаляются каскадно"""
+    with transaction.atomic():
+        for model in SYNTHESIZED_MODELS:
+            model.objects.all().delete()
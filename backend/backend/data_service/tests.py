@@ -1,3 +1,376 @@
-from django.test import TestCase
+import io
+import openpyxl
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db.models import F
+from schedule_service.cache import get_versions, group_scope
+from schedule_service.models import Schedule
+from .importers import FORMAT_CSV, TeachingLoadImporter
+from .models import Classroom, Discipline, StudentGroup, Teacher, TeachingLoad
+from .reference import get_reference_data, get_version
+from .signals import post_bulk_save
+from .synthesis import COLLEGE_SIZES, flush_college, synthesize_college
 
-# Create your tests here.
+IMPORT_URL = '/api/teaching-loads/import/'
+
+IMPORT_CSV = '\n'.join([
+    'Преподаватель;Группа;Дисциплина;Специальность;Курс;1 семестр',
+    'Орлов Павел Андреевич;ПК-21;Алгоритмы;Программирование;2;36',
+    'Орлов Павел Андреевич;ПК-22;Алгоритмы;Программирование;2;40',
+    'Иванов И.П.;ИС-11;Сети;;;18',
+])
+
+
+def _import(api_client, content, filename='loads.csv', **params):
+    upload = SimpleUploadedFile(filename, content.encode() if isinstance(content, str) else content)
+    query = '&'.join(f'{name}={value}' for name, value in params.items())
+    return api_client.post(f'{IMPORT_URL}?{query}', {'file': upload}, format='multipart')
+
+
+def test_import_creates_references_and_loads(college, api_client):
+    loads_before = TeachingLoad.objects.count()
+
+    response = _import(api_client, IMPORT_CSV)
+
+    assert response.status_code == 200, response.data
+    assert (response.data['created'], response.data['updated'], response.data['errors']) == (3, 0, [])
+    assert response.data['created_references'] == {
+        'specialties': 1, 'courses': 1, 'groups': 2, 'disciplines': 1, 'teachers': 1,
+    }
+    assert TeachingLoad.objects.count() == loads_before + 3
+    # Короткое имя находит существующего преподавателя, дисциплина берет специальность группы
+    load = TeachingLoad.objects.get(group__name='ИС-11', discipline__name='Сети', semester1_hours=18)
+    assert load.teacher == college.teachers[0]
+    assert load.discipline.specialty == college.specialty
+
+
+def test_reimport_updates_loads_by_natural_key(college, api_client):
+    _import(api_client, IMPORT_CSV)
+
+    response = _import(api_client, IMPORT_CSV.replace(';36', ';72'))
+
+    assert (response.data['created'], response.data['updated']) == (0, 3)
+    assert TeachingLoad.objects.get(group__name='ПК-21').semester1_hours == 72
+    assert Teacher.objects.filter(last_name='Орлов').count() == 1
+
+
+def test_reimport_keeps_hours_of_missing_columns(college, api_client):
+    _import(api_client, '\n'.join([
+        'Преподаватель;Группа;Дисциплина;Специальность;Курс;1 семестр;2 семестр',
+        'Орлов Павел Андреевич;ПК-21;Алгоритмы;Программирование;2;36;30',
+    ]))
+    load = TeachingLoad.objects.get(group__name='ПК-21')
+    assert (load.semester1_hours, load.semester2_hours) == (36, 30)
+
+    response = _import(api_client, '\n'.join([
+        'Преподаватель;Группа;Дисциплина;2 семестр',
+        'Орлов Павел Андреевич;ПК-21;Алгоритмы;34',
+    ]))
+    assert response.data['updated'] == 1
+    load.refresh_from_db()
+    assert (load.semester1_hours, load.semester2_hours) == (36, 34)
+
+    # Без часовых столбцов нагрузка не меняется вовсе
+    response = _import(api_client, 'Преподаватель;Группа;Дисциплина\nОрлов Павел Андреевич;ПК-21;Алгоритмы')
+    assert response.data['updated'] == 1
+    load.refresh_from_db()
+    assert (load.semester1_hours, load.semester2_hours) == (36, 34)
+
+
+def test_import_reports_row_errors(college, api_client):
+    content = '\n'.join([
+        'teacher;group;discipline;semester1_hours',
+        'Иванов И.П.;ИС-11;Сети;много',
+        'Кузнецов К.К.;ИС-11;Сети;10',
+        'Иванов И.П.;ИС-99;Сети;10',
+        'Иванов И.П.;ИС-12;Сети;10',
+    ])
+
+    response = _import(api_client, content)
+
+    assert response.data['created'] == 1
+    assert [(error['row'], sorted(error['errors'])) for error in response.data['errors']] == [
+        (2, ['semester1_hours']), (3, ['teacher']), (4, ['group']),
+    ]
+
+
+def test_import_dry_run_rolls_back(college, api_client):
+    response = _import(api_client, IMPORT_CSV, dry_run=1)
+
+    assert response.data['dry_run'] is True
+    assert response.data['created'] == 3
+    assert not StudentGroup.objects.filter(name='ПК-21').exists()
+    assert not Discipline.objects.filter(name='Алгоритмы').exists()
+
+
+def test_import_reads_xlsx(college, api_client):
+    wb = openpyxl.Workbook()
+    for line in IMPORT_CSV.splitlines():
+        wb.active.append(line.split(';'))
+    content = io.BytesIO()
+    wb.save(content)
+
+    response = _import(api_client, content.getvalue(), filename='loads.xlsx')
+
+    assert response.data['created'] == 3
+
+
+def test_import_rejects_file_without_required_columns(db, api_client):
+    response = _import(api_client, 'Преподаватель;Курс\nИванов И.П.;1')
+
+    assert response.status_code == 400
+    assert 'group' in response.data['error']
+
+
+def test_bulk_create_saves_all_objects(db, api_client):
+    response = api_client.post('/api/classrooms/bulk/', [
+        {'number': '201', 'capacity': 25}, {'number': '202', 'type': 'lab'},
+    ], format='json')
+
+    assert response.status_code == 201
+    assert [item['number'] for item in response.data] == ['201', '202']
+    assert all(item['id'] for item in response.data)
+    assert Classroom.objects.count() == 2
+
+
+def test_bulk_create_fails_as_a_whole(db, api_client):
+    response = api_client.post('/api/classrooms/bulk/', [
+        {'number': '201'}, {'number': '202', 'type': 'hall'},
+    ], format='json')
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert 'type' in response.data[1]
+    assert not Classroom.objects.exists()
+
+
+def test_bulk_update_changes_submitted_fields(college, api_client):
+    first, second = college.classrooms[:2]
+
+    response = api_client.patch('/api/classrooms/bulk/', [
+        {'id': first.id, 'capacity': 50}, {'id': second.id, 'number': '202'},
+    ], format='json')
+
+    assert response.status_code == 200
+    first.refresh_from_db()
+    second.refresh_from_db()
+    assert (first.number, first.capacity) == ('101', 50)
+    assert (second.number, second.capacity) == ('202', 30)
+
+
+def test_bulk_update_rejects_unknown_and_repeated_ids(college, api_client):
+    classroom = college.classrooms[0]
+
+    response = api_client.patch('/api/classrooms/bulk/', [
+        {'id': classroom.id, 'capacity': 1}, {'id': classroom.id}, {'id': 0}, {'capacity': 1},
+    ], format='json')
+
+    assert response.status_code == 400
+    assert [sorted(item) for item in response.data] == [[], ['id'], ['id'], ['id']]
+
+
+def test_bulk_update_of_loads_resyncs_lessons(college, api_client):
+    load = college.loads[0]
+    lesson = Schedule.objects.create(
+        teaching_load=load, time_slot=college.time_slots[0], classroom=college.classrooms[0],
+    )
+
+    response = api_client.patch('/api/teaching-loads/bulk/', [
+        {'id': load.id, 'teacher': college.teachers[1].id},
+    ], format='json')
+
+    assert response.status_code == 200
+    lesson.refresh_from_db()
+    assert lesson.teacher_id == college.teachers[1].id
+
+
+def test_bulk_delete_by_ids(college, api_client):
+    ids = [classroom.id for classroom in college.classrooms[:2]]
+
+    response = api_client.delete(f"/api/classrooms/bulk/?ids={','.join(map(str, ids))}")
+
+    assert response.data == {'deleted': 2}
+    assert list(Classroom.objects.values_list('id', flat=True)) == [college.classrooms[2].id]
+    assert api_client.delete('/api/classrooms/bulk/', {'ids': [ids[0]]}, format='json').status_code == 400
+
+
+def test_bulk_request_size_is_limited(db, api_client, settings):
+    settings.DATA_BULK_MAX_ITEMS = 1
+
+    response = api_client.post('/api/classrooms/bulk/', [{'number': '1'}, {'number': '2'}], format='json')
+
+    assert response.status_code == 400
+
+
+def test_listing_stays_a_plain_array_by_default(college, api_client):
+    response = api_client.get('/api/teachers/')
+
+    assert [item['id'] for item in response.data] == [teacher.id for teacher in college.teachers]
+
+
+def test_limit_offset_pagination(college, api_client):
+    response = api_client.get('/api/time-slots/', {'limit': 5, 'offset': 5})
+
+    assert response.data['count'] == len(college.time_slots)
+    assert [item['id'] for item in response.data['results']] == [slot.id for slot in college.time_slots[5:10]]
+
+
+def test_cursor_pagination_walks_all_rows(college, api_client):
+    seen, url, params = [], '/api/time-slots/', {'page_size': 4, 'ordering': '-start_time'}
+    while url:
+        response = api_client.get(url, params)
+        seen.extend(item['id'] for item in response.data['results'])
+        url, params = response.data['next'], None
+
+    assert sorted(seen) == sorted(slot.id for slot in college.time_slots)
+    assert len(seen) == len(set(seen))
+
+
+def test_loads_are_filtered_by_lists_and_search(college, api_client):
+    teachers = college.teachers
+    response = api_client.get('/api/teaching-loads/', {'teacher_id': f'{teachers[1].id},{teachers[2].id}'})
+    assert [item['id'] for item in response.data] == [college.loads[1].id, college.loads[3].id]
+
+    response = api_client.get('/api/teaching-loads/', {'search': 'Програм'})
+    assert [item['id'] for item in response.data] == [college.loads[3].id]
+
+    assert api_client.get('/api/teaching-loads/', {'teacher_id': 'abc'}).status_code == 400
+
+
+def test_expand_and_fields(college, api_client, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        response = api_client.get('/api/groups/', {'expand': 'specialty', 'fields': 'id,name,specialty'})
+
+    assert response.data[0] == {
+        'id': college.groups[0].id,
+        'name': 'ИС-11',
+        'specialty': {'id': college.specialty.id, 'name': college.specialty.name, 'code': college.specialty.code},
+    }
+
+    response = api_client.get('/api/teachers/', {'fields': 'id,short_name'})
+    assert response.data[0] == {'id': college.teachers[0].id, 'short_name': college.teachers[0].short_name}
+
+
+def test_reference_data_is_loaded_once_per_version(college, django_assert_num_queries):
+    reference = get_reference_data()
+
+    with django_assert_num_queries(0):
+        assert get_reference_data() is reference
+    assert list(reference.time_slot_list) == college.time_slots
+    assert list(reference.classrooms_by_type['lecture']) == college.classrooms
+
+
+def test_reference_data_is_reloaded_after_change(college, django_capture_on_commit_callbacks):
+    reference = get_reference_data()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Classroom.objects.create(number='104', type='lab')
+
+    fresh = get_reference_data()
+    assert fresh is not reference
+    assert [classroom.number for classroom in fresh.classrooms_by_type['lab']] == ['104']
+
+
+def test_synthesize_college_builds_consistent_data(db):
+    size = COLLEGE_SIZES['small']
+
+    summary = synthesize_college(**size, seed=1)
+
+    assert summary['teaching_loads'] == size['groups'] * size['loads_per_group']
+    assert TeachingLoad.objects.count() == summary['teaching_loads']
+    assert Teacher.objects.count() == size['teachers']
+    # Дисциплины нагрузки берутся из специальности группы
+    assert not TeachingLoad.objects.exclude(discipline__specialty=F('group__specialty')).exists()
+
+    flush_college()
+    assert not StudentGroup.objects.exists()
+
+
+def _load_payload(load, **overrides):
+    return {'discipline': load.discipline_id, 'group': load.group_id, 'teacher': load.teacher_id, **overrides}
+
+
+def test_duplicate_teaching_load_is_rejected(college, api_client):
+    load = college.loads[0]
+    loads_before = TeachingLoad.objects.count()
+
+    response = api_client.post('/api/teaching-loads/', _load_payload(load), format='json')
+
+    assert response.status_code == 400
+    assert TeachingLoad.objects.count() == loads_before
+    # Изменение нагрузки со своим же ключом не считается повтором
+    assert api_client.patch(f'/api/teaching-loads/{load.id}/', _load_payload(load), format='json').status_code == 200
+
+
+def test_bulk_create_rejects_duplicates_in_batch(college, api_client):
+    loads_before = TeachingLoad.objects.count()
+    payload = _load_payload(college.loads[0], teacher=college.teachers[2].id)
+
+    response = api_client.post('/api/teaching-loads/bulk/', [payload, payload], format='json')
+
+    assert response.status_code == 400
+    assert response.data[0] == {}
+    assert 'non_field_errors' in response.data[1]
+    assert TeachingLoad.objects.count() == loads_before
+
+
+def test_bulk_update_rejects_existing_key(college, api_client):
+    load, other = college.loads[0], college.loads[1]
+
+    response = api_client.patch('/api/teaching-loads/bulk/', [_load_payload(load, id=other.id)], format='json')
+
+    assert response.status_code == 400
+    other.refresh_from_db()
+    assert other.teacher_id == college.teachers[1].id
+
+
+
+@pytest.fixture
+def bulk_signals():
+    sent = []
+
+    def receiver(sender, instances, created, **kwargs):
+        sent.append((sender, created, len(instances)))
+
+    post_bulk_save.connect(receiver)
+    yield sent
+    post_bulk_save.disconnect(receiver)
+
+
+def _run_importer(content, **options):
+    return TeachingLoadImporter(**options).run(io.BytesIO(content.encode()), FORMAT_CSV)
+
+
+def test_import_sends_bulk_save_once_per_model(college, bulk_signals, django_capture_on_commit_callbacks):
+    version = get_version()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report = _run_importer(IMPORT_CSV, batch_size=1)
+
+    assert report['created'] == 3
+    # Три пакета, но по одному сигналу на модель
+    assert sorted((sender.__name__, created, count) for sender, created, count in bulk_signals) == [
+        ('Course', True, 1), ('Discipline', True, 1), ('Specialty', True, 1),
+        ('StudentGroup', True, 2), ('Teacher', True, 1), ('TeachingLoad', True, 3),
+    ]
+    assert get_version() != version
+
+
+def test_import_dry_run_sends_nothing(college, bulk_signals):
+    report = _run_importer(IMPORT_CSV, dry_run=True)
+
+    assert report['created'] == 3
+    assert bulk_signals == []
+
+
+def test_import_update_touches_schedule_cache(college, bulk_signals, django_capture_on_commit_callbacks):
+    _run_importer(IMPORT_CSV)
+    group_id = college.groups[0].id
+    before = get_versions([group_scope(group_id)])
+
+    with django_capture_on_commit_callbacks(execute=True):
+        report = _run_importer(IMPORT_CSV.replace(';18', ';20'))
+
+    assert report['updated'] == 3
+    assert (TeachingLoad, False, 3) in bulk_signals
+    assert get_versions([group_scope(group_id)]) != before
@@ -1,35 +1,161 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.filters import OrderingFilter, SearchFilter
+from rest_framework.parsers import MultiPartParser
+from rest_framework.response import Response
+from .filters import FieldFilterBackend
+from .importers import ImportFileError, TeachingLoadImporter, detect_format
+from .mixins import BulkModelMixin
 from .models import *
+from .pagination import DataPagination
 from .serializers import *
 
-class SpecialtyViewSet(viewsets.ModelViewSet):
+class DataViewSet(BulkModelMixin, viewsets.ModelViewSet):
+    """
+    Базовый набор справочника.
+
+    Чтение поддерживает необязательную пагинацию, фильтры filter_fields,
+    поиск ?search= по search_fields, сортировку ?ordering= по ordering_fields,
+    раскрытие связей ?expand= (select_related и вложенные объекты) и
+    частичный ответ ?fields=, для которого из базы читаются только нужные
+    столбцы.
+    """
+    pagination_class = DataPagination
+    filter_backends = [FieldFilterBackend, SearchFilter, OrderingFilter]
+    filter_fields = {}
+    search_fields = ()
+    ordering_fields = ('id',)
+    ordering = ('id',)
+    # Поле сериализатора -> столбцы модели, если поле не хранится в таблице
+    projection_fields = {}
+
+    def _get_param_list(self, name):
+        value = self.request.query_params.get(name, '')
+        return [item.strip() for item in value.split(',') if item.strip()]
+
+    def get_requested_fields(self):
+        return self._get_param_list('fields') or None
+
+    def get_expand(self):
+        expandable = getattr(self.get_serializer_class().Meta, 'expandable', {})
+        return [name for name in self._get_param_list('expand') if name in expandable]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        # Параметры представления относятся только к чтению; массовые
+        # операции работают с полными объектами
+        if self.request.method != 'GET':
+            return queryset
+
+        expand = self.get_expand()
+        fields = self.get_requested_fields()
+        if expand and fields:
+            expand = [name for name in expand if name in fields]
+        if expand:
+            queryset = queryset.select_related(*expand)
+        if fields:
+            queryset = self._project(queryset, fields, expand)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.request.method == 'GET':
+            kwargs.setdefault('fields', self.get_requested_fields())
+            kwargs.setdefault('expand', self.get_expand())
+        return super().get_serializer(*args, **kwargs)
+
+    def _project(self, queryset, fields, expand):
+        """Читает из базы только столбцы запрошенных полей"""
+        concrete = {field.name for field in queryset.model._meta.concrete_fields}
+        columns = {'id'}
+        for name in fields:
+            if name in self.projection_fields:
+                columns.update(self.projection_fields[name])
+            elif name in concrete:
+                columns.add(name)
+
+        # Поля сортировки нужны курсору пагинации
+        ordering = OrderingFilter().get_ordering(self.request, queryset, self) or ()
+        columns.update(field.lstrip('-') for field in ordering)
+        # Раскрытые связи читаются целиком
+        columns.update(
+            f'{name}__{field.name}'
+            for name in expand
+            for field in queryset.model._meta.get_field(name).related_model._meta.concrete_fields
+        )
+        return queryset.only(*columns)
+
+class SpecialtyViewSet(DataViewSet):
     queryset = Specialty.objects.all()
     serializer_class = SpecialtySerializer
+    search_fields = ('name', 'code')
+    ordering_fields = ('id', 'name', 'code')
 
-class CourseViewSet(viewsets.ModelViewSet):
+class CourseViewSet(DataViewSet):
     queryset = Course.objects.all()
     serializer_class = CourseSerializer
+    ordering_fields = ('id', 'number')
 
-class StudentGroupViewSet(viewsets.ModelViewSet):
+class StudentGroupViewSet(DataViewSet):
     queryset = StudentGroup.objects.all()
     serializer_class = StudentGroupSerializer
+    filter_fields = {
+        'specialty_id': 'specialty_id',
+        'course_id': 'course_id',
+        'study_form': 'study_form',
+    }
+    search_fields = ('name',)
+    ordering_fields = ('id', 'name')
 
-class DisciplineViewSet(viewsets.ModelViewSet):
+class DisciplineViewSet(DataViewSet):
     queryset = Discipline.objects.all()
     serializer_class = DisciplineSerializer
+    filter_fields = {'specialty_id': 'specialty_id'}
+    search_fields = ('name',)
+    ordering_fields = ('id', 'name')
 
-class TeacherViewSet(viewsets.ModelViewSet):
+class TeacherViewSet(DataViewSet):
     queryset = Teacher.objects.all()
     serializer_class = TeacherSerializer
+    search_fields = ('last_name', 'first_name', 'middle_name')
+    ordering_fields = ('id', 'last_name', 'first_name')
+    projection_fields = {'short_name': ('last_name', 'first_name', 'middle_name')}
 
-class TeachingLoadViewSet(viewsets.ModelViewSet):
+class TeachingLoadViewSet(DataViewSet):
     queryset = TeachingLoad.objects.all()
     serializer_class = TeachingLoadSerializer
+    filter_fields = {
+        'teacher_id': 'teacher_id',
+        'group_id': 'group_id',
+        'discipline_id': 'discipline_id',
+        'specialty_id': 'group__specialty_id',
+        'course_id': 'group__course_id',
+    }
+    search_fields = ('discipline__name', 'group__name', 'teacher__last_name')
+    ordering_fields = ('id', 'semester1_hours', 'semester2_hours', 'total_hours')
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_file(self, request):
+        """Импорт нагрузки из XLSX/CSV с отчетом об ошибках по строкам"""
+        file = request.FILES.get('file')
+        if file is None:
+            return Response({'error': 'Не передан файл'}, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = request.query_params.get('dry_run') in ('1', 'true', 'True')
+        try:
+            report = TeachingLoadImporter(dry_run=dry_run).run(file, detect_format(file.name))
+        except ImportFileError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
 
-class ClassroomViewSet(viewsets.ModelViewSet):
+class ClassroomViewSet(DataViewSet):
     queryset = Classroom.objects.all()
     serializer_class = ClassroomSerializer
+    filter_fields = {'type': 'type'}
+    search_fields = ('number',)
+    ordering_fields = ('id', 'number', 'capacity')
 
-class TimeSlotViewSet(viewsets.ModelViewSet):
+class TimeSlotViewSet(DataViewSet):
     queryset = TimeSlot.objects.all()
-    serializer_class = TimeSlotSerializer
\ No newline at end of file
+    serializer_class = TimeSlotSerializer
+    filter_fields = {'day_of_week': 'day_of_week'}
+    ordering_fields = ('id', 'day_of_week', 'start_time')
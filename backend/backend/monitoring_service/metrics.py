@@ -0,0 +1,213 @@
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from django.conf import settings
+
+# Метрика -> (описание, границы корзин гистограммы)
+HISTOGRAMS = {
+    'http_request_duration_seconds': (
+        'Время обработки запроса',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'http_request_db_queries': (
+        'Число SQL-запросов на запрос',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'http_request_db_duration_seconds': (
+        'Время SQL-запросов на запрос',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+    ),
+    'http_request_render_duration_seconds': (
+        'Время сериализации и рендеринга ответа',
+        (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+    ),
+    'http_response_size_bytes': (
+        'Размер ответа',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216),
+    ),
+}
+
+COUNTERS = {
+    'http_requests_total': 'Обработанные запросы',
+}
+
+# Сумма метрик завершившихся воркеров
+ARCHIVE_NAME = 'archive.json'
+
+
+class Registry:
+    """
+    Метрики процесса: гистограммы и счетчики по меткам. Каждый воркер
+    периодически сохраняет свои значения в отдельный файл METRICS_DIR,
+    а /metrics складывает файлы всех воркеров. Файлы завершившихся воркеров
+    при сборе переносятся в общий архив, чтобы суммарные счетчики не
+    уменьшались, а каталог не рос при перезапуске воркеров.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (метрика, метки) -> [счетчики корзин..., сумма, количество]
+        self._histograms = {}
+        self._counters = {}
+        self._flushed_at = 0
+
+    def observe(self, name, labels, value):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, labels)
+        with self._lock:
+            values = self._histograms.get(key)
+            if values is None:
+                values = self._histograms[key] = [0] * (len(buckets) + 2)
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self._histograms.items()],
+                'counters': [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+            }
+
+    def flush(self, force=False):
+        """Сохраняет значения процесса не чаще раза в METRICS_FLUSH_INTERVAL секунд"""
+        now = time.monotonic()
+        if not force and now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, prefix='.')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(self.snapshot(), file)
+        os.replace(temp_path, worker_path())
+
+
+registry = Registry()
+
+
+def worker_path(pid=None):
+    return os.path.join(settings.METRICS_DIR, f'{pid or os.getpid()}.json')
+
+
+def _is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Процесс есть, но принадлежит другому пользователю
+        return True
+    return True
+
+
+def _sum_files(paths):
+    histograms = {}
+    counters = {}
+    for path in paths:
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, values in data['histograms']:
+            if name not in HISTOGRAMS:
+                continue
+            key = (name, tuple(map(tuple, labels)))
+            total = histograms.setdefault(key, [0] * len(values))
+            histograms[key] = [a + b for a, b in zip(total, values)]
+        for name, labels, value in data['counters']:
+            key = (name, tuple(map(tuple, labels)))
+            counters[key] = counters.get(key, 0) + value
+    return histograms, counters
+
+
+def _archive_dead_workers(paths):
+    """
+    Складывает файлы завершившихся воркеров в архив и удаляет их. Архив
+    записывается до удаления файлов: при сбое между шагами значения
+    посчитаются дважды, но не потеряются.
+    """
+    dead = []
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        if name.isdigit() and int(name) != os.getpid() and not _is_alive(int(name)):
+            dead.append(path)
+    if not dead:
+        return
+
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_NAME)
+    histograms, counters = _sum_files([archive_path, *dead])
+    descriptor, temp_path = tempfile.mkstemp(dir=settings.METRICS_DIR, prefix='.')
+    with os.fdopen(descriptor, 'w') as file:
+        json.dump({
+            'histograms': [[name, [list(pair) for pair in labels], values] for (name, labels), values in histograms.items()],
+            'counters': [[name, [list(pair) for pair in labels], value] for (name, labels), value in counters.items()],
+        }, file)
+    os.replace(temp_path, archive_path)
+    for path in dead:
+        os.unlink(path)
+
+
+def collect():
+    """Сумма метрик всех воркеров из файлов METRICS_DIR"""
+    registry.flush(force=True)
+    # Сбор и архивация под блокировкой каталога: параллельный сбор не
+    # увидит файл воркера одновременно в архиве и отдельно или ни там, ни там
+    with open(os.path.join(settings.METRICS_DIR, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        paths = glob.glob(os.path.join(settings.METRICS_DIR, '*.json'))
+        _archive_dead_workers(paths)
+        return _sum_files(glob.glob(os.path.join(settings.METRICS_DIR, '*.json')))
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def render_prometheus():
+    """Метрики в текстовом формате Prometheus"""
+    histograms, counters = collect()
+    lines = []
+
+    for name, description in COUNTERS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} counter')
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} histogram')
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets, values):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_bucket{_format_labels(labels, [("le", "+Inf")])} {values[-1]}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {values[-1]}')
+
+    return '\n'.join(lines) + '\n'
+
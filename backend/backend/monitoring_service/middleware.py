@@ -0,0 +1,126 @@
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.db import connection
+from .metrics import registry
+
+logger = logging.getLogger('monitoring_service.slow_requests')
+
+_current = ContextVar('request_metrics', default=None)
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def sql_fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными параметрами совпадают"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('IN (...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class RequestMetrics:
+    """Замеры одного запроса: SQL-запросы, их время и время рендеринга"""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0
+        self.render_time = 0
+        self.render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries.append(sql)
+
+
+@contextmanager
+def measure_render():
+    """
+    Учитывает время сериализации и рендеринга, выполненных внутри view
+    (например, при кэшировании готового ответа)
+    """
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.render_time += time.perf_counter() - started
+
+
+class RequestMetricsMiddleware:
+    """
+    Время запроса, число и время SQL-запросов, время рендеринга и размер
+    ответа по маршрутам. Замеряется доля запросов METRICS_SAMPLE_RATE;
+    при нуле middleware сразу передает запрос дальше.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.METRICS_SAMPLE_RATE
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return self.get_response(request)
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+        if metrics.render_started is not None:
+            metrics.render_time += time.perf_counter() - metrics.render_started
+
+        self._record(request, response, metrics, duration)
+        return response
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся после выхода из view
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.render_started = time.perf_counter()
+        return response
+
+    def _record(self, request, response, metrics, duration):
+        match = request.resolver_match
+        route = match.route if match else 'unmatched'
+        labels = (('method', request.method), ('route', route))
+
+        registry.inc('http_requests_total', labels + (('status', response.status_code),))
+        registry.observe('http_request_duration_seconds', labels, duration)
+        registry.observe('http_request_db_queries', labels, len(metrics.queries))
+        registry.observe('http_request_db_duration_seconds', labels, metrics.db_time)
+        registry.observe('http_request_render_duration_seconds', labels, metrics.render_time)
+        size = response.get('Content-Length')
+        if size is None and not response.streaming:
+            size = len(response.content)
+        if size is not None:
+            registry.observe('http_response_size_bytes', labels, int(size))
+        registry.flush()
+
+        if duration >= settings.METRICS_SLOW_REQUEST_SECONDS:
+            repeated = Counter(sql_fingerprint(sql) for sql in metrics.queries).most_common(
+                settings.METRICS_SLOW_REQUEST_TOP_SQL
+            )
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.3f с, SQL %d за %.3f с, рендеринг %.3f с; частые запросы:%s',
+                request.method, request.get_full_path(), route, duration,
+                len(metrics.queries), metrics.db_time, metrics.render_time,
+                ''.join(f'\n  {count} x {fingerprint}' for fingerprint, count in repeated),
+            )
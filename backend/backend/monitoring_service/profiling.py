@@ -0,0 +1,156 @@
+import cProfile
+import json
+import os
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_QUERY_PARAM = 'profile'
+
+PROFILE_NAME_RE = re.compile(r'^\d{8}T\d{6}-[0-9a-f]{8}$')
+
+
+def profiles_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'profiles')
+
+
+def profile_paths(name):
+    """Файл профиля cProfile и файл метаданных запроса"""
+    base = os.path.join(profiles_dir(), name)
+    return f'{base}.prof', f'{base}.json'
+
+
+def _get_admin(request):
+    """Администратор из сессии или JWT: DRF аутентифицирует запрос только внутри view"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        try:
+            result = JWTAuthentication().authenticate(request)
+        except AuthenticationFailed:
+            return None
+        user = result[0] if result else None
+    return user if user is not None and user.is_staff else None
+
+
+def _is_sampled(request):
+    rate = settings.PROFILING_SAMPLE_RATE
+    if rate <= 0 or not any(request.path.startswith(prefix) for prefix in settings.PROFILING_SAMPLE_PATHS):
+        return False
+    return random.random() < rate
+
+
+def top_functions(profiler, limit):
+    """Самые затратные функции по накопленному времени"""
+    stats = pstats.Stats(profiler)
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return [
+        {
+            'function': f'{filename}:{line}({function})',
+            'calls': calls,
+            'total_time': round(total_time, 6),
+            'cumulative_time': round(cumulative_time, 6),
+        }
+        for (filename, line, function), (_, calls, total_time, cumulative_time, _) in rows
+    ]
+
+
+def save_profile(profiler, request, response, duration, trigger, user=None):
+    """Сохраняет профиль и метаданные запроса, старые профили сверх лимита удаляются"""
+    os.makedirs(profiles_dir(), exist_ok=True)
+    name = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    profile_path, meta_path = profile_paths(name)
+    profiler.dump_stats(profile_path)
+
+    meta = {
+        'name': name,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'method': request.method,
+        'path': request.path,
+        'query': request.META.get('QUERY_STRING', ''),
+        'user': user.get_username() if user is not None else None,
+        'trigger': trigger,
+        'status': response.status_code,
+        'duration': round(duration, 4),
+        'pid': os.getpid(),
+        'top': top_functions(profiler, settings.PROFILING_TOP_FUNCTIONS),
+    }
+    with open(meta_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False, indent=2)
+
+    evict_profiles()
+    return name
+
+
+def list_profiles():
+    """Метаданные сохраненных профилей, новые первыми"""
+    try:
+        names = sorted(
+            (entry.name[:-len('.json')] for entry in os.scandir(profiles_dir()) if entry.name.endswith('.json')),
+            reverse=True,
+        )
+    except FileNotFoundError:
+        return []
+
+    profiles = []
+    for name in names:
+        try:
+            with open(profile_paths(name)[1], encoding='utf-8') as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            continue
+        meta.pop('top', None)
+        profiles.append(meta)
+    return profiles
+
+
+def evict_profiles(max_files=None):
+    max_files = settings.PROFILING_MAX_FILES if max_files is None else max_files
+    names = sorted(entry.name[:-len('.json')] for entry in os.scandir(profiles_dir()) if entry.name.endswith('.json'))
+    for name in names[:max(len(names) - max_files, 0)]:
+        for path in profile_paths(name):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+class ProfilingMiddleware:
+    """
+    Профилирование запроса cProfile по запросу администратора (заголовок
+    X-Profile: 1 или параметр ?profile=1) либо случайной доли
+    PROFILING_SAMPLE_RATE запросов к PROFILING_SAMPLE_PATHS. Профиль и
+    метаданные сохраняются в MEDIA_ROOT/profiles, имя возвращается в
+    заголовке X-Profile-Name.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = None
+        if request.META.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_QUERY_PARAM) == '1':
+            user = _get_admin(request)
+            trigger = 'request' if user is not None else None
+        else:
+            trigger = 'sample' if _is_sampled(request) else None
+        if trigger is None:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            response = self.get_response(request)
+        finally:
+            profiler.disable()
+        duration = time.perf_counter() - started
+
+        response['X-Profile-Name'] = save_profile(profiler, request, response, duration, trigger, user)
+        return response
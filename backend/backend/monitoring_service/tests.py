@@ -0,0 +1,172 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+from .metrics import ARCHIVE_NAME, collect, registry, worker_path
+from .middleware import logger, sql_fingerprint
+
+KEY = ('http_requests_total', (('method', 'GET'),))
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path):
+    settings.METRICS_DIR = str(tmp_path)
+    return tmp_path
+
+
+def _requests_total(route):
+    _, counters = collect()
+    return sum(
+        value for (name, labels), value in counters.items()
+        if name == 'http_requests_total' and ('route', route) in labels
+    )
+
+
+def test_requests_are_measured_and_exported(college, api_client, metrics_dir):
+    response = api_client.get('/api/teachers/')
+    route = response.wsgi_request.resolver_match.route
+    assert _requests_total(route) >= 1
+
+    metrics = api_client.get('/metrics')
+
+    assert metrics['Content-Type'].startswith('text/plain')
+    text = metrics.content.decode()
+    assert '# TYPE http_request_db_queries histogram' in text
+    assert f'http_request_duration_seconds_count{{method="GET",route="{route}"}}' in text
+
+
+def test_zero_sample_rate_skips_measurement(college, api_client, metrics_dir, settings):
+    settings.METRICS_SAMPLE_RATE = 0
+    route = api_client.get('/api/teachers/').wsgi_request.resolver_match.route
+    before = _requests_total(route)
+
+    api_client.get('/api/teachers/')
+
+    assert _requests_total(route) == before
+
+
+@pytest.fixture
+def slow_log(caplog):
+    # Журнал monitoring_service не передает записи корневому логгеру
+    logger.addHandler(caplog.handler)
+    yield caplog
+    logger.removeHandler(caplog.handler)
+
+
+def test_slow_requests_are_logged_with_repeated_sql(college, api_client, metrics_dir, settings, slow_log):
+    settings.METRICS_SLOW_REQUEST_SECONDS = 0
+
+    api_client.get('/api/teachers/')
+
+    record, = slow_log.records
+    assert 'Медленный запрос GET /api/teachers/' in record.getMessage()
+    assert '1 x SELECT "teachers"."id"' in record.getMessage()
+
+
+def test_sql_fingerprint_strips_literals():
+    assert sql_fingerprint("SELECT * FROM t WHERE id IN (1, 2, 3) AND name = 'Иванов'") == \
+        sql_fingerprint("SELECT  *\nFROM t WHERE id IN (7) AND name = 'Петров'")
+
+
+def test_registry_flush_is_throttled(metrics_dir, settings):
+    settings.METRICS_FLUSH_INTERVAL = 3600
+    registry.flush(force=True)
+    registry.inc('http_requests_total', (('method', 'TEST'),))
+
+    registry.flush()
+
+    flushed = json.loads(next(metrics_dir.glob('*.json')).read_text())
+    assert ['method', 'TEST'] not in [label for _, labels, _ in flushed['counters'] for label in labels]
+
+
+@pytest.fixture
+def profiles(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    return tmp_path / 'profiles'
+
+
+def _login(api_client, is_staff):
+    user = get_user_model().objects.create_user(username='admin' if is_staff else 'user', password='x', is_staff=is_staff)
+    api_client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+
+def test_admin_request_is_profiled(college, api_client, profiles):
+    _login(api_client, is_staff=True)
+
+    response = api_client.get('/api/teachers/', HTTP_X_PROFILE='1')
+
+    name = response['X-Profile-Name']
+    assert sorted(os.listdir(profiles)) == [f'{name}.json', f'{name}.prof']
+    assert [profile['name'] for profile in api_client.get('/api/monitoring/profiles/').data] == [name]
+    detail = api_client.get(f'/api/monitoring/profiles/{name}/').data
+    assert (detail['path'], detail['user'], detail['trigger']) == ('/api/teachers/', 'admin', 'request')
+    assert detail['top']
+    download = api_client.get(f'/api/monitoring/profiles/{name}/download/')
+    assert download['Content-Disposition'] == f'attachment; filename="{name}.prof"'
+    assert api_client.get('/api/monitoring/profiles/..%2Fsecret/').status_code == 404
+
+
+def test_profiling_is_not_available_to_other_users(college, api_client, profiles):
+    _login(api_client, is_staff=False)
+
+    response = api_client.get('/api/teachers/', {'profile': 1})
+
+    assert 'X-Profile-Name' not in response
+    assert not profiles.exists()
+    assert api_client.get('/api/monitoring/profiles/').status_code == 403
+
+
+def test_sampled_profiles_are_evicted(college, api_client, profiles, settings):
+    settings.PROFILING_SAMPLE_RATE = 1
+    settings.PROFILING_SAMPLE_PATHS = ['/api/teachers/']
+    settings.PROFILING_MAX_FILES = 2
+
+    for _ in range(3):
+        assert 'X-Profile-Name' in api_client.get('/api/teachers/')
+
+    assert len(os.listdir(profiles)) == 4
+    assert 'X-Profile-Name' not in api_client.get('/api/groups/')
+
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+def _write_worker(pid, requests):
+    with open(worker_path(pid), 'w') as file:
+        json.dump({'histograms': [], 'counters': [[KEY[0], [list(KEY[1][0])], requests]]}, file)
+
+
+def test_dead_worker_files_are_archived(metrics_dir):
+    first, second = _dead_pid(), _dead_pid()
+    _write_worker(first, 3)
+    _write_worker(second, 4)
+
+    _, counters = collect()
+    assert counters[KEY] == 7
+    assert not os.path.exists(worker_path(first))
+    assert os.path.exists(metrics_dir / ARCHIVE_NAME)
+
+    # Повторный сбор и новые завершившиеся воркеры не теряют и не дублируют значения
+    _write_worker(_dead_pid(), 1)
+    _, counters = collect()
+    assert counters[KEY] == 8
+    assert sorted(os.listdir(metrics_dir)) == sorted(['.lock', ARCHIVE_NAME, f'{os.getpid()}.json'])
+
+
+def test_live_worker_files_are_kept(metrics_dir):
+    process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        _write_worker(process.pid, 2)
+        _, counters = collect()
+        assert counters[KEY] == 2
+        assert os.path.exists(worker_path(process.pid))
+    finally:
+        process.kill()
+        process.wait()
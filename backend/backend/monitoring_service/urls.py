@@ -0,0 +1,8 @@
+from django.urls import path
+from .views import ProfileDetailAPIView, ProfileDownloadAPIView, ProfileListAPIView
+
+urlpatterns = [
+    path('profiles/', ProfileListAPIView.as_view(), name='profile_list'),
+    path('profiles/<str:name>/', ProfileDetailAPIView.as_view(), name='profile_detail'),
+    path('profiles/<str:name>/download/', ProfileDownloadAPIView.as_view(), name='profile_download'),
+]
@@ -0,0 +1,52 @@
+import json
+from django.http import FileResponse, HttpResponse
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+from .metrics import render_prometheus
+from .profiling import PROFILE_NAME_RE, list_profiles, profile_paths
+
+PROFILE_CONTENT_TYPE = 'application/octet-stream'
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def metrics_view(request):
+    """
+    Метрики всех воркеров в формате Prometheus. Nginx проксирует наружу
+    только /api/ и /admin/, поэтому /metrics доступен лишь внутри сети.
+    """
+    return HttpResponse(render_prometheus(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+class ProfileListAPIView(APIView):
+    """Сохраненные профили запросов, новые первыми"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(list_profiles())
+
+class ProfileDetailAPIView(APIView):
+    """Метаданные профиля и самые затратные функции"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        if not PROFILE_NAME_RE.match(name):
+            return Response({'error': 'Профиль не найден'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            with open(profile_paths(name)[1], encoding='utf-8') as file:
+                return Response(json.load(file))
+        except FileNotFoundError:
+            return Response({'error': 'Профиль не найден'}, status=status.HTTP_404_NOT_FOUND)
+
+class ProfileDownloadAPIView(APIView):
+    """Файл cProfile для pstats, snakeviz и подобных инструментов"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        if not PROFILE_NAME_RE.match(name):
+            return Response({'error': 'Профиль не найден'}, status=status.HTTP_404_NOT_FOUND)
+        try:
+            file = open(profile_paths(name)[0], 'rb')
+        except FileNotFoundError:
+            return Response({'error': 'Профиль не найден'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(file, as_attachment=True, filename=f'{name}.prof', content_type=PROFILE_CONTENT_TYPE)
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from schedule_service import cache as schedule_cache
+from schedule_service.changes import scope_version
+from .reports.data import ReportError
+from .reports.docx import DOCX_CONTENT_TYPE, render_schedule_docx
+from .reports.excel import XLSX_CONTENT_TYPE, render_schedule_xlsx
+from .reports.pdf import PDF_CONTENT_TYPE, render_schedule_pdf
+
+# Формат отчета -> (функция записи в файл, тип содержимого)
+REPORT_FORMATS = {
+    'xlsx': (render_schedule_xlsx, XLSX_CONTENT_TYPE),
+    'pdf': (render_schedule_pdf, PDF_CONTENT_TYPE),
+    'docx': (render_schedule_docx, DOCX_CONTENT_TYPE),
+}
+
+FILENAME_RE = re.compile(r'^(?P<key>[0-9a-f]{64})\.(?P<report_type>xlsx|pdf|docx)$')
+
+
+class ReportArtifact:
+    """
+    Готовый файл отчета в REPORT_CACHE_DIR.
+
+    Имя файла — хэш типа отчета, фильтров и версий данных отчета: версии
+    журнала изменений в области группы или преподавателя и версий областей
+    кэша расписания, которые сдвигаются при изменении справочников и
+    нагрузок. Обе хранятся вне процесса (в базе и общем кэше), поэтому файл
+    с тем же именем соответствует текущим данным на всех воркерах, а
+    устаревший отчет просто перестает запрашиваться и позже вытесняется.
+    """
+
+    def __init__(self, report_type, key, filters=None):
+        if report_type not in REPORT_FORMATS:
+            raise ReportError('Unsupported report type')
+        self.report_type = report_type
+        self.key = key
+        self.filters = filters
+
+    @classmethod
+    def for_filters(cls, report_type, filters):
+        signature = json.dumps({
+            'type': report_type,
+            'filters': filters.as_params(),
+            'changes': scope_version(filters.group_id, filters.teacher_id),
+            'scopes': schedule_cache.get_versions(
+                schedule_cache.get_request_scopes(filters.group_id, filters.teacher_id)
+            ),
+        }, sort_keys=True)
+        return cls(report_type, hashlib.sha256(signature.encode()).hexdigest(), filters)
+
+    @classmethod
+    def from_filename(cls, filename):
+        match = FILENAME_RE.match(filename)
+        if match is None:
+            return None
+        return cls(match.group('report_type'), match.group('key'))
+
+    @property
+    def filename(self):
+        return f'{self.key}.{self.report_type}'
+
+    @property
+    def download_name(self):
+        return f'schedule.{self.report_type}'
+
+    @property
+    def path(self):
+        return os.path.join(settings.REPORT_CACHE_DIR, self.filename)
+
+    def exists(self):
+        return os.path.exists(self.path)
+
+    def render(self):
+        """Строит отчет во временном файле и атомарно переносит его на место"""
+        render, _ = REPORT_FORMATS[self.report_type]
+        os.makedirs(settings.REPORT_CACHE_DIR, exist_ok=True)
+        # Незавершенный файл начинается с точки: его не отдают и не учитывают
+        # при вытеснении по размеру
+        fd, temp_path = tempfile.mkstemp(
+            dir=settings.REPORT_CACHE_DIR, prefix='.', suffix=f'.{self.report_type}'
+        )
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                render(self.filters, file)
+            # mkstemp создает файл с правами 0600, а отчет читает и nginx
+            # (X-Accel-Redirect), работающий под другим пользователем
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, self.path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        evict_reports()
+
+    def response(self):
+        _, content_type = REPORT_FORMATS[self.report_type]
+        # Время изменения служит отметкой последнего обращения для вытеснения
+        os.utime(self.path)
+
+        prefix = settings.REPORT_X_ACCEL_REDIRECT_PREFIX
+        if prefix:
+            # Файл отдает nginx из внутреннего location, Django только
+            # проверяет запрос
+            response = HttpResponse(content_type=content_type)
+            response['X-Accel-Redirect'] = f"{prefix.rstrip('/')}/{self.filename}"
+            response['Content-Disposition'] = f'attachment; filename={self.download_name}'
+            return response
+
+        return FileResponse(
+            open(self.path, 'rb'),
+            as_attachment=True,
+            filename=self.download_name,
+            content_type=content_type
+        )
+
+    def serve(self):
+        """Отдает готовый файл, а если его нет — сначала строит отчет"""
+        try:
+            return self.response()
+        except FileNotFoundError:
+            self.render()
+            return self.response()
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def evict_reports(max_age=None, max_size=None):
+    """
+    Удаляет отчеты, к которым не обращались дольше max_age секунд, затем
+    самые давние, пока общий размер не уложится в max_size байт.
+    Возвращает количество удаленных файлов.
+    """
+    max_age = settings.REPORT_CACHE_MAX_AGE if max_age is None else max_age
+    max_size = settings.REPORT_CACHE_MAX_SIZE if max_size is None else max_size
+
+    try:
+        entries = list(os.scandir(settings.REPORT_CACHE_DIR))
+    except FileNotFoundError:
+        return 0
+
+    now = time.time()
+    removed = 0
+    files = []
+    for entry in entries:
+        try:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+        except FileNotFoundError:
+            continue
+
+        # По возрасту удаляются и брошенные временные файлы упавших задач
+        if now - stat.st_mtime > max_age:
+            removed += _remove(entry.path)
+        elif not entry.name.startswith('.'):
+            files.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= max_size:
+            break
+        removed += _remove(path)
+        total -= size
+    return removed
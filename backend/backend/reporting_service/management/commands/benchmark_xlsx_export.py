@@ -0,0 +1,59 @@
+import multiprocessing
+import resource
+import tempfile
+import time
+from django.core.management.base import BaseCommand
+from reporting_service.reports.excel import write_xlsx
+
+DAYS = ['Понедельник', 'Вторник', 'Среда', 'Четверг', 'Пятница', 'Суббота']
+TIMES = ['08:00:00-09:30:00', '09:40:00-11:10:00', '11:30:00-13:00:00', '13:10:00-14:40:00']
+
+
+def synthetic_rows(count):
+    # Справочные значения повторяются, как в реальном расписании колледжа
+    for index in range(count):
+        yield [
+            DAYS[index % len(DAYS)],
+            TIMES[index % len(TIMES)],
+            f'Дисциплина {index % 150}',
+            f'Преподаватель {index % 120} И.И.',
+            str(100 + index % 60),
+        ]
+
+
+def measure(count, queue):
+    started = time.monotonic()
+    with tempfile.TemporaryFile() as file:
+        write_xlsx(synthetic_rows(count), file)
+        size = file.tell()
+    queue.put({
+        # ru_maxrss в Linux задается в килобайтах
+        'peak_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'size': size / 1024 / 1024,
+        'elapsed': time.monotonic() - started,
+    })
+
+
+class Command(BaseCommand):
+    help = 'Замеряет пиковую память потоковой выгрузки расписания в XLSX для разного числа строк'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', nargs='+', type=int, default=[1000, 10000, 100000, 500000])
+
+    def handle(self, *args, **options):
+        # Каждый замер выполняется в отдельном процессе, так как пик RSS
+        # процесса со временем только растет
+        context = multiprocessing.get_context('fork')
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        self.stdout.write(f'Исходный RSS процесса: {baseline:.1f} МБ')
+
+        for count in options['rows']:
+            queue = context.Queue()
+            process = context.Process(target=measure, args=(count, queue))
+            process.start()
+            result = queue.get()
+            process.join()
+            self.stdout.write(
+                f"{count:>8} строк: пик RSS {result['peak_rss']:.1f} МБ, "
+                f"файл {result['size']:.1f} МБ, {result['elapsed']:.1f} с"
+            )
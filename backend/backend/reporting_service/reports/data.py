@@ -0,0 +1,220 @@
+from collections import namedtuple
+from datetime import datetime
+from django.conf import settings
+from data_service.models import Teacher, TimeSlot
+from schedule_service.models import Schedule
+
+DAY_NAMES = dict(TimeSlot.DAYS_OF_WEEK)
+
+LAYOUT_LIST = 'list'
+LAYOUT_GRID = 'grid'
+LAYOUTS = (LAYOUT_LIST, LAYOUT_GRID)
+
+LIST_HEADERS = ["День", "Время", "Дисциплина", "Преподаватель", "Аудитория"]
+
+ScheduleRow = namedtuple('ScheduleRow', [
+    'group', 'date', 'week_type', 'day_of_week', 'start_time', 'end_time',
+    'discipline', 'teacher', 'classroom',
+])
+
+
+class ReportError(Exception):
+    """Ошибка в параметрах отчета"""
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise ReportError('Неверный формат даты. Используйте YYYY-MM-DD')
+
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except ValueError:
+        raise ReportError(f'Неверный идентификатор: {value}')
+
+
+def format_period(start_date, end_date):
+    if start_date and end_date:
+        return f'{start_date:%d.%m.%Y} — {end_date:%d.%m.%Y}'
+    if start_date:
+        return f'с {start_date:%d.%m.%Y}'
+    if end_date:
+        return f'по {end_date:%d.%m.%Y}'
+    return ''
+
+
+class ReportFilters:
+    """Фильтры отчета по расписанию: группа, преподаватель, аудитория и период"""
+
+    def __init__(self, group_id=None, teacher_id=None, classroom_id=None,
+                 start_date=None, end_date=None, layout=LAYOUT_LIST):
+        self.group_id = group_id
+        self.teacher_id = teacher_id
+        self.classroom_id = classroom_id
+        self.start_date = start_date
+        self.end_date = end_date
+        self.layout = layout
+
+    @classmethod
+    def from_query_params(cls, params):
+        # Фронтенд передает параметры в camelCase, API — в snake_case
+        def get(name, camel_name):
+            return params.get(name) or params.get(camel_name)
+
+        # Сетка включается явно (layout=grid), по умолчанию прежний список
+        layout = params.get('layout') or LAYOUT_LIST
+        if layout not in LAYOUTS:
+            raise ReportError(f'Неизвестный вид отчета: {layout}')
+
+        values = {
+            'group_id': get('group_id', 'groupId'),
+            'teacher_id': get('teacher_id', 'teacherId'),
+            'classroom_id': get('classroom_id', 'classroomId'),
+        }
+        dates = {
+            'start_date': get('start_date', 'startDate'),
+            'end_date': get('end_date', 'endDate'),
+        }
+        return cls(
+            layout=layout,
+            **{name: _parse_id(value) if value else None for name, value in values.items()},
+            **{name: _parse_date(value) if value else None for name, value in dates.items()},
+        )
+
+    def apply(self, queryset):
+        if self.group_id:
+            queryset = queryset.filter(group_id=self.group_id)
+        if self.teacher_id:
+            queryset = queryset.filter(teacher_id=self.teacher_id)
+        if self.classroom_id:
+            queryset = queryset.filter(classroom_id=self.classroom_id)
+        if self.start_date:
+            queryset = queryset.filter(date__gte=self.start_date)
+        if self.end_date:
+            queryset = queryset.filter(date__lte=self.end_date)
+        return queryset
+
+    def as_params(self):
+        """Параметры в виде словаря, пригодного для передачи в задачу Celery"""
+        params = {'layout': self.layout}
+        for name in ('group_id', 'teacher_id', 'classroom_id'):
+            if getattr(self, name):
+                params[name] = str(getattr(self, name))
+        for name in ('start_date', 'end_date'):
+            if getattr(self, name):
+                params[name] = getattr(self, name).isoformat()
+        return params
+
+    @property
+    def period(self):
+        return format_period(self.start_date, self.end_date)
+
+
+def iter_schedule_rows(filters=None):
+    """
+    Строки отчета одним запросом: из базы выбираются только нужные столбцы
+    занятия и связанных таблиц, объекты моделей не создаются.
+    """
+    queryset = Schedule.objects.all()
+    if filters is not None:
+        queryset = filters.apply(queryset)
+
+    rows = queryset.order_by(
+        'teaching_load__group__name', 'date', 'time_slot__start_time', 'id'
+    ).values_list(
+        'teaching_load__group__name',
+        'date',
+        'week_type',
+        'time_slot__day_of_week',
+        'time_slot__start_time',
+        'time_slot__end_time',
+        'teaching_load__discipline__name',
+        'teaching_load__teacher__last_name',
+        'teaching_load__teacher__first_name',
+        'teaching_load__teacher__middle_name',
+        'classroom__number',
+    ).iterator(chunk_size=settings.REPORT_ITERATOR_CHUNK_SIZE)
+
+    for (group, date, week_type, day_of_week, start_time, end_time, discipline,
+         last_name, first_name, middle_name, classroom) in rows:
+        yield ScheduleRow(
+            group, date, week_type, day_of_week, start_time, end_time, discipline,
+            Teacher.format_short_name(last_name, first_name, middle_name), classroom,
+        )
+
+
+def list_row(row):
+    return [
+        DAY_NAMES.get(row.day_of_week, ''),
+        f"{row.start_time}-{row.end_time}",
+        row.discipline,
+        row.teacher,
+        row.classroom,
+    ]
+
+
+class GroupGrid:
+    """
+    Сетка расписания группы: строки — пары, столбцы — дни недели.
+
+    Одинаковые занятия разных недель периода сворачиваются в одну запись
+    ячейки; если занятие идет только по четным или нечетным неделям, это
+    помечается в тексте.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lessons = {}
+
+    def add(self, row):
+        key = (row.day_of_week, row.start_time, row.end_time)
+        lesson = (row.discipline, row.teacher, row.classroom)
+        self._lessons.setdefault(key, {}).setdefault(lesson, set()).add(row.week_type)
+
+    @property
+    def days(self):
+        return sorted({day for day, _, _ in self._lessons})
+
+    @property
+    def slots(self):
+        return sorted({(start_time, end_time) for _, start_time, end_time in self._lessons})
+
+    def cell_lines(self, day, slot):
+        lessons = self._lessons.get((day,) + slot, {})
+        lines = []
+        for (discipline, teacher, classroom), week_types in lessons.items():
+            week_types = week_types - {None}
+            marker = f' ({next(iter(week_types))})' if len(week_types) == 1 else ''
+            lines.append(f'{discipline}{marker}\n{teacher}, ауд. {classroom}')
+        return lines
+
+    def cell_text(self, day, slot):
+        return '\n'.join(self.cell_lines(day, slot))
+
+    @staticmethod
+    def slot_title(slot):
+        start_time, end_time = slot
+        return f'{start_time:%H:%M}-{end_time:%H:%M}'
+
+    def header(self):
+        return ['Время'] + [DAY_NAMES.get(day, '') for day in self.days]
+
+    def rows(self):
+        """Строки сетки: время пары и текст ячеек по дням"""
+        days = self.days
+        for slot in self.slots:
+            yield [self.slot_title(slot)] + [self.cell_text(day, slot) for day in days]
+
+
+def build_grids(rows):
+    """Группирует строки отчета в сетки по группам за один проход"""
+    grids = {}
+    for row in rows:
+        grid = grids.get(row.group)
+        if grid is None:
+            grid = grids[row.group] = GroupGrid(row.group)
+        grid.add(row)
+    return list(grids.values())
@@ -1,42 +1,48 @@
-
-from io import BytesIO
-from django.http import HttpResponse
 from docx import Document
-from schedule_service.models import Schedule
+from .data import LAYOUT_GRID, LIST_HEADERS, build_grids, iter_schedule_rows, list_row
+from .teaching_load import load_table, teaching_load_rows
+
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+
+
+def _add_table(document, header, rows):
+    table = document.add_table(rows=1, cols=len(header))
+    table.style = 'Table Grid'
+    for cell, value in zip(table.rows[0].cells, header):
+        cell.text = value
+
+    for row in rows:
+        for cell, value in zip(table.add_row().cells, row):
+            cell.text = value
+    return table
+
 
-def generate_schedule_docx():
+def render_schedule_docx(filters, file):
     document = Document()
     document.add_heading('Расписание', level=1)
-    
-    table = document.add_table(rows=1, cols=5)
-    hdr_cells = table.rows[0].cells
-    hdr_cells[0].text = 'День'
-    hdr_cells[1].text = 'Время'
-    hdr_cells[2].text = 'Дисциплина'
-    hdr_cells[3].text = 'Преподаватель'
-    hdr_cells[4].text = 'Аудитория'
-    
-    schedules = Schedule.objects.select_related(
-        'teaching_load__discipline',
-        'teaching_load__teacher',
-        'classroom'
-    ).all()
-    
-    for schedule in schedules:
-        row_cells = table.add_row().cells
-        row_cells[0].text = schedule.time_slot.get_day_of_week_display()
-        row_cells[1].text = f"{schedule.time_slot.start_time}-{schedule.time_slot.end_time}"
-        row_cells[2].text = schedule.teaching_load.discipline.name
-        row_cells[3].text = schedule.teaching_load.teacher.short_name
-        row_cells[4].text = schedule.classroom.number
-    
-    buffer = BytesIO()
-    document.save(buffer)
-    buffer.seek(0)
-    
-    response = HttpResponse(
-        buffer,
-        content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-    )
-    response['Content-Disposition'] = 'attachment; filename=schedule.docx'
-    return response
+    if filters.period:
+        document.add_paragraph(filters.period)
+
+    rows = iter_schedule_rows(filters)
+    if filters.layout == LAYOUT_GRID:
+        # Сетка каждой группы начинается с новой страницы
+        for index, grid in enumerate(build_grids(rows)):
+            if index:
+                document.add_page_break()
+            document.add_heading(grid.name, level=2)
+            _add_table(document, grid.header(), grid.rows())
+    else:
+        _add_table(document, LIST_HEADERS, (list_row(row) for row in rows))
+
+    document.save(file)
+
+
+def render_teaching_load_docx(filters, file):
+    document = Document()
+    document.add_heading('Педагогическая нагрузка', level=1)
+    if filters.period:
+        document.add_paragraph(f'Расписание за период {filters.period}')
+
+    rows = load_table(teaching_load_rows(filters))
+    _add_table(document, filters.headers, ([str(value) for value in row] for row in rows))
+    document.save(file)
@@ -1,39 +1,82 @@
+import re
 import openpyxl
-from io import BytesIO
-from django.http import HttpResponse
-from schedule_service.models import Schedule
-
-def generate_schedule_xlsx():
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "Расписание"
-    
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font
+from .data import LAYOUT_GRID, LIST_HEADERS, build_grids, iter_schedule_rows, list_row
+from .teaching_load import load_table, teaching_load_rows
+
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def write_xlsx(rows, file, headers=LIST_HEADERS, title="Расписание"):
+    """
+    Записывает строки в файл потоково: лист в режиме write_only сразу сбрасывает
+    строки на диск и не хранит объекты ячеек, поэтому расход памяти не зависит
+    от количества строк.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+
     # Заголовки
-    ws.append(["День", "Время", "Дисциплина", "Преподаватель", "Аудитория"])
-    
+    ws.append(headers)
+
     # Данные
-    schedules = Schedule.objects.select_related(
-        'teaching_load__discipline',
-        'teaching_load__teacher',
-        'classroom'
-    ).all()
-    
-    for schedule in schedules:
-        ws.append([
-            schedule.time_slot.get_day_of_week_display(),
-            f"{schedule.time_slot.start_time}-{schedule.time_slot.end_time}",
-            schedule.teaching_load.discipline.name,
-            schedule.teaching_load.teacher.short_name,
-            schedule.classroom.number,
-        ])
-    
-    buffer = BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
-    
-    response = HttpResponse(
-        buffer,
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response['Content-Disposition'] = 'attachment; filename=schedule.xlsx'
-    return response
\ No newline at end of file
+    for row in rows:
+        ws.append(row)
+
+    wb.save(file)
+
+
+def _sheet_title(name, used):
+    # Имя листа Excel: до 31 символа, без []:*?/\ и без повторов
+    title = re.sub(r'[\[\]:*?/\\]', '_', name or 'Группа')[:31]
+    candidate, number = title, 1
+    while candidate in used:
+        number += 1
+        suffix = f' ({number})'
+        candidate = title[:31 - len(suffix)] + suffix
+    used.add(candidate)
+    return candidate
+
+
+def write_xlsx_grid(grids, file):
+    """Сетка расписания: отдельный лист на каждую группу"""
+    wb = openpyxl.Workbook(write_only=True)
+    used_titles = set()
+
+    for grid in grids:
+        ws = wb.create_sheet(_sheet_title(grid.name, used_titles))
+        ws.column_dimensions['A'].width = 14
+        for index in range(len(grid.days)):
+            ws.column_dimensions[openpyxl.utils.get_column_letter(index + 2)].width = 32
+
+        header = []
+        for value in grid.header():
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True)
+            header.append(cell)
+        ws.append(header)
+
+        for row in grid.rows():
+            cells = []
+            for value in row:
+                cell = WriteOnlyCell(ws, value=value)
+                cell.alignment = Alignment(wrap_text=True, vertical='top')
+                cells.append(cell)
+            ws.append(cells)
+
+    if not grids:
+        wb.create_sheet("Расписание")
+    wb.save(file)
+
+
+def render_schedule_xlsx(filters, file):
+    rows = iter_schedule_rows(filters)
+    if filters.layout == LAYOUT_GRID:
+        write_xlsx_grid(build_grids(rows), file)
+    else:
+        write_xlsx((list_row(row) for row in rows), file)
+
+
+def render_teaching_load_xlsx(filters, file):
+    write_xlsx(load_table(teaching_load_rows(filters)), file, headers=filters.headers, title="Нагрузка")
@@ -1,45 +1,179 @@
-from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from django.http import HttpResponse
-from schedule_service.models import Schedule
-
-def generate_schedule_pdf():
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename=schedule.pdf'
-    
-    buffer = BytesIO()
-    p = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    # Заголовки
-    p.drawString(100, height - 40, "Расписание")
-    p.drawString(50, height - 60, "День")
-    p.drawString(150, height - 60, "Время")
-    p.drawString(250, height - 60, "Дисциплина")
-    p.drawString(350, height - 60, "Преподаватель")
-    p.drawString(450, height - 60, "Аудитория")
-    
-    # Данные
-    y = height - 80
-    schedules = Schedule.objects.select_related(
-        'teaching_load__discipline',
-        'teaching_load__teacher',
-        'classroom'
-    ).all()
-    
-    for schedule in schedules:
-        p.drawString(50, y, schedule.time_slot.get_day_of_week_display())
-        p.drawString(150, y, f"{schedule.time_slot.start_time}-{schedule.time_slot.end_time}")
-        p.drawString(250, y, schedule.teaching_load.discipline.name)
-        p.drawString(350, y, schedule.teaching_load.teacher.short_name)
-        p.drawString(450, y, schedule.classroom.number)
-        y -= 20
-    
-    p.showPage()
-    p.save()
-    
-    buffer.seek(0)
-    response.write(buffer.getvalue())
-    buffer.close()
-    return response
\ No newline at end of file
+import logging
+import os
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from django.conf import settings
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+from .data import LAYOUT_GRID, LIST_HEADERS, build_grids, iter_schedule_rows, list_row
+from .teaching_load import LOAD_HEADERS, load_table, teaching_load_rows
+
+logger = logging.getLogger(__name__)
+
+PDF_CONTENT_TYPE = 'application/pdf'
+
+FONT_NAME = 'ReportFont'
+FONT_BOLD_NAME = 'ReportFont-Bold'
+
+# Строк в одной таблице плоского отчета: короткие таблицы разбиваются по
+# страницам за линейное время
+LIST_CHUNK_ROWS = 200
+
+GRID_FONT_SIZE = 7
+
+
+@lru_cache(maxsize=None)
+def get_fonts():
+    """
+    Регистрирует шрифт с кириллицей один раз на процесс и возвращает имена
+    обычного и жирного начертаний. Если шрифт не найден, используется
+    встроенный Helvetica (кириллица в нем не отображается).
+    """
+    regular = settings.REPORT_PDF_FONT_PATH
+    bold = settings.REPORT_PDF_FONT_BOLD_PATH
+    if not regular or not os.path.exists(regular):
+        logger.warning('Шрифт для PDF не найден: %s, используется Helvetica', regular)
+        return 'Helvetica', 'Helvetica-Bold'
+
+    pdfmetrics.registerFont(TTFont(FONT_NAME, regular))
+    if bold and os.path.exists(bold):
+        pdfmetrics.registerFont(TTFont(FONT_BOLD_NAME, bold))
+        return FONT_NAME, FONT_BOLD_NAME
+    return FONT_NAME, FONT_NAME
+
+
+def _styles():
+    font, bold_font = get_fonts()
+    return {
+        'title': ParagraphStyle('title', fontName=bold_font, fontSize=14, leading=18, spaceAfter=6),
+        'heading': ParagraphStyle('heading', fontName=bold_font, fontSize=12, leading=16, spaceAfter=6),
+        'font': font,
+        'table': TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), font),
+            ('FONTNAME', (0, 0), (-1, 0), bold_font),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]),
+        'grid': TableStyle([
+            ('FONTSIZE', (1, 1), (-1, -1), GRID_FONT_SIZE),
+            ('LEADING', (1, 1), (-1, -1), GRID_FONT_SIZE + 1.5),
+        ]),
+    }
+
+
+def _wrap(text, font, width, size=GRID_FONT_SIZE):
+    # Перенос строк вручную: простые строки в ячейках таблицы рисуются во много
+    # раз быстрее, чем Paragraph, что заметно на сборниках из сотен страниц
+    return '\n'.join(
+        wrapped
+        for line in text.split('\n')
+        for wrapped in simpleSplit(line, font, size, width) or ['']
+    )
+
+
+def _page_decorator(title):
+    def draw(canvas, doc):
+        font, _ = get_fonts()
+        canvas.saveState()
+        canvas.setFont(font, 8)
+        width, _ = doc.pagesize
+        canvas.drawString(doc.leftMargin, 0.75 * cm, title)
+        canvas.drawRightString(width - doc.rightMargin, 0.75 * cm, f'Стр. {doc.page}')
+        canvas.restoreState()
+    return draw
+
+
+def _grid_story(grids, styles, width):
+    story = []
+    for index, grid in enumerate(grids):
+        if index:
+            story.append(PageBreak())
+        story.append(Paragraph(escape(grid.name), styles['heading']))
+
+        header = grid.header()
+        time_width = 2.2 * cm
+        day_width = (width - time_width) / max(len(header) - 1, 1)
+        text_width = day_width - 6
+        data = [header] + [
+            [row[0]] + [_wrap(value, styles['font'], text_width) for value in row[1:]]
+            for row in grid.rows()
+        ]
+        # Шапка таблицы повторяется на каждой странице, если сетка не поместилась
+        table = Table(data, colWidths=[time_width] + [day_width] * (len(header) - 1), repeatRows=1)
+        table.setStyle(styles['table'])
+        table.setStyle(styles['grid'])
+        story.append(table)
+    return story
+
+
+def _list_story(rows, styles, width):
+    story = []
+    widths = [w * width for w in (0.14, 0.16, 0.34, 0.22, 0.14)]
+    chunk = []
+    for row in rows:
+        chunk.append(list_row(row))
+        if len(chunk) == LIST_CHUNK_ROWS:
+            story.append(Table([LIST_HEADERS] + chunk, colWidths=widths, repeatRows=1, style=styles['table']))
+            chunk = []
+    if chunk or not story:
+        story.append(Table([LIST_HEADERS] + chunk, colWidths=widths, repeatRows=1, style=styles['table']))
+    return story
+
+
+def render_schedule_pdf(filters, file):
+    title = 'Расписание'
+    if filters.period:
+        title = f'{title} {filters.period}'
+
+    # Сетка шире плоского списка, поэтому печатается на альбомном листе
+    pagesize = landscape(A4) if filters.layout == LAYOUT_GRID else A4
+    # Документ пишется прямо в файл, без промежуточного буфера
+    doc = SimpleDocTemplate(
+        file, pagesize=pagesize, title=title,
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm
+    )
+    styles = _styles()
+
+    story = [Paragraph(escape(title), styles['title']), Spacer(1, 0.2 * cm)]
+    rows = iter_schedule_rows(filters)
+    if filters.layout == LAYOUT_GRID:
+        story += _grid_story(build_grids(rows), styles, doc.width)
+    else:
+        story += _list_story(rows, styles, doc.width)
+
+    decorate = _page_decorator(title)
+    doc.build(story, onFirstPage=decorate, onLaterPages=decorate)
+
+
+def render_teaching_load_pdf(filters, file):
+    title = 'Педагогическая нагрузка'
+    if filters.period:
+        title = f'{title} {filters.period}'
+
+    doc = SimpleDocTemplate(
+        file, pagesize=A4, title=title,
+        leftMargin=1.5 * cm, rightMargin=1.5 * cm, topMargin=1.5 * cm, bottomMargin=1.5 * cm
+    )
+    styles = _styles()
+
+    widths = [0.35 * doc.width] + [0.13 * doc.width] * len(LOAD_HEADERS)
+    data = [filters.headers] + [
+        [_wrap(row[0], styles['font'], widths[0] - 6, size=8)] + [str(value) for value in row[1:]]
+        for row in load_table(teaching_load_rows(filters))
+    ]
+    table = Table(data, colWidths=widths, repeatRows=1, style=styles['table'])
+    table.setStyle(TableStyle([('ALIGN', (1, 1), (-1, -1), 'RIGHT')]))
+
+    decorate = _page_decorator(title)
+    doc.build(
+        [Paragraph(escape(title), styles['title']), Spacer(1, 0.2 * cm), table],
+        onFirstPage=decorate, onLaterPages=decorate
+    )
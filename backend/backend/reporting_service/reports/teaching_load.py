@@ -0,0 +1,169 @@
+from collections import namedtuple
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import DurationField, ExpressionWrapper, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from data_service.models import Teacher, TeachingLoad
+from schedule_service.models import Schedule
+from .data import ReportError, _parse_date, _parse_id, format_period
+
+GROUP_BY_TEACHER = 'teacher'
+GROUP_BY_GROUP = 'group'
+GROUP_BY_DISCIPLINE = 'discipline'
+
+# Разрез отчета -> (заголовок первого столбца, столбцы группировки); первым
+# идет идентификатор, чтобы не сливать однофамильцев и одноименные группы
+GROUPINGS = {
+    GROUP_BY_TEACHER: (
+        'Преподаватель',
+        ('teacher_id', 'teacher__last_name', 'teacher__first_name', 'teacher__middle_name'),
+    ),
+    GROUP_BY_GROUP: ('Группа', ('group_id', 'group__name')),
+    GROUP_BY_DISCIPLINE: ('Дисциплина', ('discipline_id', 'discipline__name')),
+}
+
+LOAD_HEADERS = ['План, 1 сем.', 'План, 2 сем.', 'План', 'В расписании', 'Разница']
+
+LoadRow = namedtuple('LoadRow', [
+    'name', 'planned_semester1', 'planned_semester2', 'planned', 'scheduled', 'difference',
+])
+
+
+class TeachingLoadFilters:
+    """Параметры отчета по нагрузке: разрез, семестр, фильтры и период расписания"""
+
+    def __init__(self, group_by=GROUP_BY_TEACHER, semester=None, group_id=None,
+                 teacher_id=None, discipline_id=None, start_date=None, end_date=None):
+        self.group_by = group_by
+        self.semester = semester
+        self.group_id = group_id
+        self.teacher_id = teacher_id
+        self.discipline_id = discipline_id
+        self.start_date = start_date
+        self.end_date = end_date
+
+    @classmethod
+    def from_query_params(cls, params):
+        def get(name, camel_name):
+            return params.get(name) or params.get(camel_name)
+
+        group_by = get('group_by', 'groupBy') or GROUP_BY_TEACHER
+        if group_by not in GROUPINGS:
+            raise ReportError(f'Неизвестный разрез отчета: {group_by}')
+
+        semester = params.get('semester')
+        if semester and semester not in ('1', '2'):
+            raise ReportError('Семестр должен быть 1 или 2')
+
+        values = {
+            'group_id': get('group_id', 'groupId'),
+            'teacher_id': get('teacher_id', 'teacherId'),
+            'discipline_id': get('discipline_id', 'disciplineId'),
+        }
+        dates = {
+            'start_date': get('start_date', 'startDate'),
+            'end_date': get('end_date', 'endDate'),
+        }
+        return cls(
+            group_by=group_by,
+            semester=int(semester) if semester else None,
+            **{name: _parse_id(value) if value else None for name, value in values.items()},
+            **{name: _parse_date(value) if value else None for name, value in dates.items()},
+        )
+
+    @property
+    def title(self):
+        return GROUPINGS[self.group_by][0]
+
+    @property
+    def headers(self):
+        return [self.title] + LOAD_HEADERS
+
+    @property
+    def period(self):
+        return format_period(self.start_date, self.end_date)
+
+    def apply(self, queryset):
+        if self.group_id:
+            queryset = queryset.filter(group_id=self.group_id)
+        if self.teacher_id:
+            queryset = queryset.filter(teacher_id=self.teacher_id)
+        if self.discipline_id:
+            queryset = queryset.filter(discipline_id=self.discipline_id)
+        return queryset
+
+    def apply_period(self, queryset):
+        if self.start_date:
+            queryset = queryset.filter(date__gte=self.start_date)
+        if self.end_date:
+            queryset = queryset.filter(date__lte=self.end_date)
+        return queryset
+
+
+def _scheduled_duration(filters):
+    """
+    Подзапрос: суммарная длительность пар нагрузки за период. Считается по
+    каждой нагрузке отдельно, чтобы соединение с расписанием не умножало
+    плановые часы при группировке.
+    """
+    duration = ExpressionWrapper(
+        F('time_slot__end_time') - F('time_slot__start_time'), output_field=DurationField()
+    )
+    schedules = filters.apply_period(
+        Schedule.objects.filter(teaching_load=OuterRef('pk'))
+    ).order_by().values('teaching_load').annotate(duration=Sum(duration)).values('duration')
+    return Coalesce(Subquery(schedules, output_field=DurationField()), timedelta(0))
+
+
+def _name(filters, values):
+    if filters.group_by == GROUP_BY_TEACHER:
+        return Teacher.format_short_name(*values)
+    return values[0]
+
+
+def teaching_load_rows(filters):
+    """
+    Плановые и фактические часы в выбранном разрезе одним запросом: план
+    суммируется по нагрузкам, факт — длительность пар из расписания в
+    академических часах (REPORT_ACADEMIC_HOUR_MINUTES).
+    """
+    _, columns = GROUPINGS[filters.group_by]
+    academic_hour = timedelta(minutes=settings.REPORT_ACADEMIC_HOUR_MINUTES)
+
+    loads = filters.apply(TeachingLoad.objects.all()).annotate(
+        scheduled_duration=_scheduled_duration(filters)
+    ).values(*columns).annotate(
+        planned_semester1=Coalesce(Sum('semester1_hours'), 0),
+        planned_semester2=Coalesce(Sum('semester2_hours'), 0),
+        scheduled=Sum('scheduled_duration'),
+    ).order_by(*columns[1:], columns[0])
+
+    for row in loads:
+        if filters.semester == 1:
+            planned = row['planned_semester1']
+        elif filters.semester == 2:
+            planned = row['planned_semester2']
+        else:
+            planned = row['planned_semester1'] + row['planned_semester2']
+        scheduled = round((row['scheduled'] or timedelta(0)) / academic_hour, 1)
+        yield LoadRow(
+            _name(filters, [row[column] for column in columns[1:]]),
+            row['planned_semester1'],
+            row['planned_semester2'],
+            planned,
+            scheduled,
+            round(planned - scheduled, 1),
+        )
+
+
+def load_table(rows):
+    """Строки таблицы с итогом; числа без лишнего нуля после запятой"""
+    def number(value):
+        return int(value) if float(value).is_integer() else value
+
+    totals = [0] * len(LOAD_HEADERS)
+    for row in rows:
+        values = row[1:]
+        totals = [total + value for total, value in zip(totals, values)]
+        yield [row.name] + [number(value) for value in values]
+    yield ['Итого'] + [number(round(total, 1)) for total in totals]
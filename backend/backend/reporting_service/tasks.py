@@ -0,0 +1,22 @@
+from celery import shared_task
+from .artifacts import ReportArtifact, evict_reports
+from .reports.data import ReportFilters
+
+
+@shared_task
+def render_report_task(report_type, params, key):
+    """
+    Фоновое построение отчета. Ключ файла вычисляется в запросе, чтобы
+    клиент получил отчет по тем данным, которые были при постановке.
+    """
+    filters = ReportFilters.from_query_params(params)
+    artifact = ReportArtifact(report_type, key, filters)
+    if not artifact.exists():
+        artifact.render()
+    return {'filename': artifact.filename}
+
+
+@shared_task
+def evict_reports_task():
+    """Периодическая очистка каталога отчетов (CELERY_BEAT_SCHEDULE)"""
+    return {'removed': evict_reports()}
@@ -1,3 +1,253 @@
-from django.test import TestCase
+import io
+import os
+import time as time_module
+from datetime import date, time, timedelta
+import openpyxl
+import pytest
+from schedule_service.changes import assign_versions
+from schedule_service.models import Schedule
+from .artifacts import REPORT_FORMATS, ReportArtifact, evict_reports
+from .reports import pdf
+from .reports.data import LIST_HEADERS, ReportFilters, ScheduleRow, build_grids, iter_schedule_rows
+from .reports.teaching_load import TeachingLoadFilters, teaching_load_rows
 
-# Create your tests here.
+START = date(2025, 9, 1)
+
+# Первые байты файлов: XLSX и DOCX — zip-архивы
+SIGNATURES = {'xlsx': b'PK', 'docx': b'PK', 'pdf': b'%PDF'}
+
+
+@pytest.fixture(autouse=True)
+def report_dir(settings, tmp_path):
+    settings.REPORT_CACHE_DIR = str(tmp_path)
+    settings.REPORT_X_ACCEL_REDIRECT_PREFIX = ''
+    return tmp_path
+
+
+@pytest.fixture
+def lessons(college):
+    return [
+        Schedule.objects.create(teaching_load=load, time_slot=slot, classroom=room, date=START)
+        for load, slot, room in zip(college.loads[1:3], college.time_slots, college.classrooms)
+    ]
+
+
+def _content(response):
+    return b''.join(response.streaming_content) if response.streaming else response.content
+
+
+def test_schedule_rows_are_read_in_one_query(lessons, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        rows = list(iter_schedule_rows())
+
+    assert sorted((row.group, row.discipline, row.teacher, row.classroom) for row in rows) == sorted(
+        (lesson.teaching_load.group.name, lesson.teaching_load.discipline.name,
+         lesson.teaching_load.teacher.short_name, lesson.classroom.number)
+        for lesson in lessons
+    )
+
+
+def test_report_rows_are_filtered(lessons):
+    group_id = lessons[0].group_id
+
+    rows = list(iter_schedule_rows(ReportFilters(group_id=group_id, start_date=START, end_date=START)))
+
+    assert [row.group for row in rows] == [lessons[0].teaching_load.group.name]
+    assert list(iter_schedule_rows(ReportFilters(start_date=START + timedelta(days=1)))) == []
+
+
+def test_grid_folds_lessons_of_different_weeks():
+    def row(week_type, discipline='Сети'):
+        return ScheduleRow('ИС-11', START, week_type, 1, time(8), time(9, 30), discipline, 'Петров И.П.', '101')
+
+    grid, = build_grids([row('ч'), row('з'), row('ч', 'Базы данных')])
+
+    assert grid.header() == ['Время', 'Понедельник']
+    assert list(grid.rows()) == [
+        ['08:00-09:30', 'Сети\nПетров И.П., ауд. 101\nБазы данных (ч)\nПетров И.П., ауд. 101'],
+    ]
+
+
+def test_xlsx_report_is_streamed(api_client, lessons):
+    response = api_client.get('/api/reports/schedule/', {'type': 'xlsx', 'layout': 'list'})
+
+    assert response.status_code == 200
+    assert response.streaming
+    sheet = openpyxl.load_workbook(io.BytesIO(_content(response))).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert list(rows[0]) == LIST_HEADERS
+    assert len(rows) == len(lessons) + 1
+
+
+def test_schedule_report_defaults_to_list_layout(api_client, lessons):
+    assert ReportFilters().layout == 'list'
+
+    response = api_client.get('/api/reports/schedule/', {'type': 'xlsx'})
+
+    sheet = openpyxl.load_workbook(io.BytesIO(_content(response))).active
+    assert list(next(sheet.iter_rows(values_only=True))) == LIST_HEADERS
+
+
+@pytest.mark.parametrize('layout', ['list', 'grid'])
+@pytest.mark.parametrize('report_type', sorted(REPORT_FORMATS))
+def test_schedule_report_renders(api_client, lessons, report_type, layout):
+    response = api_client.get('/api/reports/schedule/', {
+        'type': report_type, 'layout': layout, 'groupId': lessons[0].group_id,
+    })
+
+    assert response.status_code == 200
+    assert _content(response).startswith(SIGNATURES[report_type])
+
+
+@pytest.mark.parametrize('params', [{'type': 'xlsx', 'layout': 'poster'}, {'type': 'odt'}])
+def test_schedule_report_rejects_bad_params(api_client, db, params):
+    response = api_client.get('/api/reports/schedule/', params)
+
+    assert response.status_code == 400
+
+
+def test_schedule_report_is_reused_until_rows_change(
+    api_client, lessons, report_dir, django_capture_on_commit_callbacks
+):
+    params = {'type': 'xlsx', 'group_id': lessons[0].group_id}
+
+    _content(api_client.get('/api/reports/schedule/', params))
+    _content(api_client.get('/api/reports/schedule/', params))
+    assert len(os.listdir(report_dir)) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        lessons[0].classroom = lessons[1].classroom
+        lessons[0].time_slot = lessons[1].time_slot
+        lessons[0].date = START + timedelta(days=7)
+        lessons[0].save()
+    _content(api_client.get('/api/reports/schedule/', params))
+    assert len(os.listdir(report_dir)) == 2
+
+
+def test_artifact_key_follows_report_contents(lessons, django_capture_on_commit_callbacks):
+    filters = ReportFilters(group_id=lessons[0].group_id)
+    key = ReportArtifact.for_filters('pdf', filters).key
+
+    assert ReportArtifact.for_filters('pdf', filters).key == key
+    assert ReportArtifact.for_filters('xlsx', filters).key != key
+
+    teacher = lessons[0].teaching_load.teacher
+    teacher.last_name = 'Смирнов'
+    with django_capture_on_commit_callbacks(execute=True):
+        teacher.save()
+    assert ReportArtifact.for_filters('pdf', filters).key != key
+
+
+def test_artifact_key_does_not_read_schedule_rows(
+    lessons, django_assert_num_queries, django_capture_on_commit_callbacks
+):
+    # Занятия фикстуры созданы без фиксации транзакции, версии им выдаются явно
+    assign_versions()
+    filters = ReportFilters(group_id=lessons[0].group_id, start_date=START)
+    key = ReportArtifact.for_filters('pdf', filters).key
+
+    # Один запрос к журналу изменений, сколько бы занятий ни было в отчете
+    with django_assert_num_queries(1):
+        assert ReportArtifact.for_filters('pdf', filters).key == key
+
+    # Изменение занятия другой группы не меняет отчет группы
+    other = Schedule.objects.exclude(group_id=filters.group_id).first()
+    other.date = START + timedelta(days=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        other.save()
+    assert ReportArtifact.for_filters('pdf', filters).key == key
+
+    lessons[0].date = START + timedelta(days=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        lessons[0].save()
+    assert ReportArtifact.for_filters('pdf', filters).key != key
+
+
+def test_report_file_is_served_by_name(api_client, lessons, report_dir):
+    _content(api_client.get('/api/reports/schedule/', {'type': 'pdf'}))
+    filename, = os.listdir(report_dir)
+
+    response = api_client.get(f'/api/reports/files/{filename}/')
+
+    assert response.status_code == 200
+    assert _content(response).startswith(SIGNATURES['pdf'])
+    assert api_client.get('/api/reports/files/missing.pdf/').status_code == 404
+
+
+def test_report_file_is_sent_by_nginx_when_configured(api_client, lessons, settings):
+    settings.REPORT_X_ACCEL_REDIRECT_PREFIX = '/protected-reports/'
+
+    response = api_client.get('/api/reports/schedule/', {'type': 'docx'})
+
+    assert response['X-Accel-Redirect'].startswith('/protected-reports/')
+    assert response.content == b''
+    # Файл должен быть доступен nginx на чтение
+    filename = response['X-Accel-Redirect'].rsplit('/', 1)[1]
+    assert os.stat(os.path.join(settings.REPORT_CACHE_DIR, filename)).st_mode & 0o777 == 0o644
+
+
+def test_evict_reports_removes_old_and_oversized_files(report_dir):
+    now = time_module.time()
+    for name, age, size in (('old.pdf', 1000, 1), ('a.pdf', 30, 10), ('b.pdf', 20, 10), ('c.pdf', 10, 10)):
+        path = report_dir / name
+        path.write_bytes(b'x' * size)
+        os.utime(path, (now - age, now - age))
+
+    assert evict_reports(max_age=100, max_size=25) == 2
+    assert sorted(os.listdir(report_dir)) == ['b.pdf', 'c.pdf']
+
+
+@pytest.fixture
+def pdf_fonts():
+    # Шрифты регистрируются один раз на процесс; тест сбрасывает этот кэш
+    pdf.get_fonts.cache_clear()
+    yield
+    pdf.get_fonts.cache_clear()
+
+
+def test_pdf_falls_back_to_builtin_font(settings, pdf_fonts):
+    settings.REPORT_PDF_FONT_PATH = '/nonexistent/font.ttf'
+
+    assert pdf.get_fonts() == ('Helvetica', 'Helvetica-Bold')
+
+
+def test_pdf_list_is_split_into_tables(pdf_fonts):
+    row = ScheduleRow('ИС-11', START, None, 1, time(8), time(9, 30), 'Сети', 'Петров И.П.', '101')
+
+    story = pdf._list_story([row] * (pdf.LIST_CHUNK_ROWS * 2 + 1), pdf._styles(), 500)
+
+    assert [len(table._cellvalues) for table in story] == [pdf.LIST_CHUNK_ROWS + 1] * 2 + [2]
+
+
+def test_teaching_load_rows_sum_plan_and_schedule(college, django_assert_num_queries):
+    # Две пары по 90 минут первой нагрузки Иванова
+    for slot, room in zip(college.time_slots[:2], college.classrooms):
+        Schedule.objects.create(teaching_load=college.loads[0], time_slot=slot, classroom=room, date=START)
+
+    with django_assert_num_queries(1):
+        rows = list(teaching_load_rows(TeachingLoadFilters(semester=1)))
+
+    ivanov = college.teachers[0]
+    assert rows[0].name == ivanov.short_name
+    # План не умножается на число занятий: у Иванова две нагрузки по 32 часа
+    assert rows[0][1:] == (64, 64, 64, 4, 60)
+    assert [row.scheduled for row in rows[1:]] == [0, 0]
+
+
+def test_teaching_load_rows_by_group(college):
+    rows = list(teaching_load_rows(TeachingLoadFilters(group_by='group', group_id=college.groups[1].id)))
+
+    assert [(row.name, row.planned) for row in rows] == [(college.groups[1].name, 128)]
+
+
+@pytest.mark.parametrize('report_type', sorted(SIGNATURES))
+def test_teaching_load_report_renders(api_client, lessons, report_type):
+    response = api_client.get('/api/reports/teaching-load/', {'type': report_type, 'groupBy': 'discipline'})
+
+    assert response.status_code == 200
+    assert _content(response).startswith(SIGNATURES[report_type])
+
+
+@pytest.mark.parametrize('params', [{'group_by': 'room'}, {'semester': '3'}, {'type': 'odt'}])
+def test_teaching_load_report_rejects_bad_params(api_client, db, params):
+    assert api_client.get('/api/reports/teaching-load/', params).status_code == 400
@@ -1,10 +1,16 @@
 from django.urls import path
 from .views import (
+    ReportFileAPIView,
     ScheduleReportAPIView,
+    ScheduleReportJobAPIView,
+    ScheduleReportJobStatusAPIView,
     TeachingLoadReportAPIView,
 )
 
 urlpatterns = [
     path('schedule/', ScheduleReportAPIView.as_view(), name='schedule_report'),
+    path('schedule/jobs/', ScheduleReportJobAPIView.as_view(), name='schedule_report_job'),
+    path('schedule/jobs/<str:job_id>/', ScheduleReportJobStatusAPIView.as_view(), name='schedule_report_job_status'),
+    path('files/<str:filename>/', ReportFileAPIView.as_view(), name='report_file'),
     path('teaching-load/', TeachingLoadReportAPIView.as_view(), name='teaching_load_report'),
 ]
\ No newline at end of file
@@ -1,23 +1,101 @@
-
+import tempfile
+from django.http import FileResponse
+from django.urls import reverse
+from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .reports.excel import generate_schedule_xlsx
-from .reports.pdf import generate_schedule_pdf
-from .reports.docx import generate_schedule_docx
+from .artifacts import ReportArtifact
+from .reports.data import ReportError, ReportFilters
+from .reports.docx import DOCX_CONTENT_TYPE, render_teaching_load_docx
+from .reports.excel import XLSX_CONTENT_TYPE, render_teaching_load_xlsx
+from .reports.pdf import PDF_CONTENT_TYPE, render_teaching_load_pdf
+from .reports.teaching_load import TeachingLoadFilters
+from .tasks import render_report_task
+
+TEACHING_LOAD_FORMATS = {
+    'xlsx': (render_teaching_load_xlsx, XLSX_CONTENT_TYPE),
+    'pdf': (render_teaching_load_pdf, PDF_CONTENT_TYPE),
+    'docx': (render_teaching_load_docx, DOCX_CONTENT_TYPE),
+}
 
 class TeachingLoadReportAPIView(APIView):
     def get(self, request):
-        return Response({"error": "Unsupported report type"}, status=400)
+        report_type = request.query_params.get('type', 'xlsx')
+        if report_type not in TEACHING_LOAD_FORMATS:
+            return Response({"error": "Unsupported report type"}, status=400)
+
+        try:
+            filters = TeachingLoadFilters.from_query_params(request.query_params)
+        except ReportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Отчет сводный и небольшой, поэтому строится сразу, без очереди
+        render, content_type = TEACHING_LOAD_FORMATS[report_type]
+        file = tempfile.TemporaryFile()
+        render(filters, file)
+        file.seek(0)
+
+        return FileResponse(
+            file,
+            as_attachment=True,
+            filename=f'teaching_load.{report_type}',
+            content_type=content_type
+        )
 
 class ScheduleReportAPIView(APIView):
     def get(self, request):
         report_type = request.query_params.get('type', 'xlsx')
-        
-        if report_type == 'xlsx':
-            return generate_schedule_xlsx()
-        elif report_type == 'pdf':
-            return generate_schedule_pdf()
-        elif report_type == 'docx':
-            return generate_schedule_docx()
-        
-        return Response({"error": "Unsupported report type"}, status=400)
+
+        try:
+            filters = ReportFilters.from_query_params(request.query_params)
+            artifact = ReportArtifact.for_filters(report_type, filters)
+        except ReportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        # Неизменившийся отчет отдается с диска, иначе строится здесь же
+        return artifact.serve()
+
+def report_file_url(request, filename):
+    return request.build_absolute_uri(reverse('report_file', args=[filename]))
+
+class ScheduleReportJobAPIView(APIView):
+    def post(self, request):
+        report_type = request.data.get('type', 'xlsx')
+
+        try:
+            filters = ReportFilters.from_query_params(request.data)
+            artifact = ReportArtifact.for_filters(report_type, filters)
+        except ReportError as e:
+            return Response({"error": str(e)}, status=400)
+
+        if artifact.exists():
+            return Response({
+                'job_id': None,
+                'state': 'SUCCESS',
+                'url': report_file_url(request, artifact.filename),
+            })
+
+        task = render_report_task.delay(report_type, filters.as_params(), artifact.key)
+        return Response({'job_id': task.id, 'state': 'PENDING'}, status=status.HTTP_202_ACCEPTED)
+
+class ScheduleReportJobStatusAPIView(APIView):
+    def get(self, request, job_id):
+        result = render_report_task.AsyncResult(job_id)
+        data = {
+            'job_id': job_id,
+            'state': result.state,
+        }
+
+        if result.state == 'FAILURE':
+            data['error'] = str(result.info)
+        elif result.state == 'SUCCESS':
+            data['url'] = report_file_url(request, result.info['filename'])
+
+        return Response(data)
+
+class ReportFileAPIView(APIView):
+    def get(self, request, filename):
+        artifact = ReportArtifact.from_filename(filename)
+        if artifact is None or not artifact.exists():
+            return Response({'error': 'Отчет не найден, запросите его повторно'}, status=status.HTTP_404_NOT_FOUND)
+        return artifact.response()
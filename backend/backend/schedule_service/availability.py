@@ -0,0 +1,144 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from data_service.reference import get_reference_data
+from .generator import GenerationError, parse_date
+from .occupancy import OccupancyIndex
+
+
+def parse_ids(value, name):
+    """Список идентификаторов через запятую (?teacher_id=1,2,3)"""
+    if not value:
+        return []
+    try:
+        return sorted({int(item) for item in value.split(',') if item.strip()})
+    except ValueError:
+        raise GenerationError(f'Неверный список идентификаторов: {name}')
+
+
+class AvailabilityQuery:
+    """
+    Период поиска свободного времени: даты, дни недели (1-7) и пары.
+    Нерабочие даты (SCHEDULE_HOLIDAYS) и дни без пар пропускаются.
+    """
+
+    def __init__(self, start_date, end_date, days_of_week=(), time_slot_ids=()):
+        if start_date > end_date:
+            raise GenerationError('Дата начала позже даты окончания')
+        if (end_date - start_date).days >= settings.SCHEDULE_AVAILABILITY_MAX_DAYS:
+            raise GenerationError(
+                f'Период поиска не должен превышать {settings.SCHEDULE_AVAILABILITY_MAX_DAYS} дней'
+            )
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days_of_week = set(days_of_week)
+        self.time_slot_ids = set(time_slot_ids)
+        self.reference = get_reference_data()
+
+    @classmethod
+    def from_query_params(cls, params):
+        if not params.get('start_date') or not params.get('end_date'):
+            raise GenerationError('Укажите start_date и end_date')
+        return cls(
+            parse_date(params['start_date']),
+            parse_date(params['end_date']),
+            days_of_week=parse_ids(params.get('day_of_week'), 'day_of_week'),
+            time_slot_ids=parse_ids(params.get('time_slot_id'), 'time_slot_id'),
+        )
+
+    def day_slots(self, date):
+        """Пары даты, попадающие в запрос"""
+        return [
+            slot for slot in self.reference.slots_by_day.get(date.isoweekday(), ())
+            if not self.time_slot_ids or slot.id in self.time_slot_ids
+        ]
+
+    def days(self, index):
+        """Пары (дата, маска запрошенных слотов даты)"""
+        holidays = set(settings.SCHEDULE_HOLIDAYS)
+        date = self.start_date
+        while date <= self.end_date:
+            if date not in holidays and (not self.days_of_week or date.isoweekday() in self.days_of_week):
+                mask = index.slot_mask(slot.id for slot in self.day_slots(date))
+                if mask:
+                    yield date, mask
+            date += timedelta(days=1)
+
+    def build_index(self, condition=None):
+        return OccupancyIndex.from_database(
+            self.reference.time_slot_list, self.start_date, self.end_date, condition=condition
+        )
+
+    def time_slots(self, time_slot_ids):
+        slots = self.reference.time_slots
+        return {
+            slot_id: {
+                'day_of_week': slots[slot_id].day_of_week,
+                'start_time': slots[slot_id].start_time,
+                'end_time': slots[slot_id].end_time,
+            }
+            for slot_id in sorted(time_slot_ids)
+        }
+
+
+def free_rooms(query, classroom_ids=(), classroom_type=None, min_capacity=None):
+    """
+    Свободные аудитории по каждой дате и паре периода, а также аудитории,
+    свободные во всех найденных парах сразу (always_free).
+    """
+    classrooms = [
+        classroom for classroom in query.reference.classroom_list
+        if (not classroom_ids or classroom.id in classroom_ids)
+        and (not classroom_type or classroom.type == classroom_type)
+        and (min_capacity is None or (classroom.capacity or 0) >= min_capacity)
+    ]
+    index = query.build_index(Q(classroom_id__in=classroom_ids) if classroom_ids else None)
+
+    results = []
+    always_free = {classroom.id for classroom in classrooms}
+    used_slots = set()
+    for date, day_mask in query.days(index):
+        free = {}
+        for classroom in classrooms:
+            free_mask = day_mask & ~index.classroom_mask(classroom.id, date)
+            if free_mask != day_mask:
+                always_free.discard(classroom.id)
+            for slot_id in index.slot_ids(free_mask):
+                free.setdefault(slot_id, []).append(classroom.id)
+        for slot_id in index.slot_ids(day_mask):
+            used_slots.add(slot_id)
+            results.append({'date': date, 'time_slot': slot_id, 'classrooms': free.get(slot_id, [])})
+
+    return {
+        'results': results,
+        'always_free': sorted(always_free),
+        'classrooms': {classroom.id: classroom.number for classroom in classrooms},
+        'time_slots': query.time_slots(used_slots),
+    }
+
+
+def common_free_slots(query, teacher_ids=(), group_ids=(), classroom_ids=()):
+    """Пары периода, в которые свободны все перечисленные преподаватели, группы и аудитории"""
+    if not (teacher_ids or group_ids or classroom_ids):
+        raise GenerationError('Укажите teacher_id, group_id или classroom_id')
+
+    index = query.build_index(
+        Q(teacher_id__in=teacher_ids) | Q(group_id__in=group_ids) | Q(classroom_id__in=classroom_ids)
+    )
+
+    results = []
+    used_slots = set()
+    for date, day_mask in query.days(index):
+        busy = 0
+        for teacher_id in teacher_ids:
+            busy |= index.teacher_mask(teacher_id, date)
+        for group_id in group_ids:
+            busy |= index.group_mask(group_id, date)
+        for classroom_id in classroom_ids:
+            busy |= index.classroom_mask(classroom_id, date)
+        free = index.slot_ids(day_mask & ~busy)
+        if free:
+            used_slots.update(free)
+            results.append({'date': date, 'time_slots': free})
+
+    return {'results': results, 'time_slots': query.time_slots(used_slots)}
@@ -0,0 +1,116 @@
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.http import parse_http_date_safe
+
+# Области инвалидации. ALL меняется вместе со справочниками (пары, аудитории,
+# преподаватели...) и сбрасывает все ответы, LIST — при любом изменении
+# расписания и относится к выборкам без группы и преподавателя
+SCOPE_ALL = 'all'
+SCOPE_LIST = 'list'
+
+KEY_PREFIX = 'schedule'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def teacher_scope(teacher_id):
+    return f'teacher:{teacher_id}'
+
+
+def _version_key(scope):
+    return f'{KEY_PREFIX}:version:{scope}'
+
+
+def get_versions(scopes):
+    """
+    Версии областей. Версия — время последнего изменения области, поэтому
+    она же служит значением Last-Modified.
+    """
+    keys = {scope: _version_key(scope) for scope in scopes}
+    stored = cache.get_many(keys.values())
+    versions = {}
+    for scope, key in keys.items():
+        version = stored.get(key)
+        if version is None:
+            # Первое обращение: фиксируем текущий момент, если другой процесс
+            # не успел записать версию раньше
+            cache.add(key, time.time(), None)
+            version = cache.get(key)
+        versions[scope] = version
+    return versions
+
+
+def touch(*scopes):
+    """Сдвигает версии областей; ответы со старыми версиями больше не читаются"""
+    if scopes:
+        now = time.time()
+        cache.set_many({_version_key(scope): now for scope in set(scopes)}, None)
+
+
+def touch_on_commit(*scopes):
+    # Сбрасываем кэш после фиксации транзакции, иначе параллельный запрос
+    # успеет закэшировать старые данные под новой версией
+    transaction.on_commit(lambda: touch(*scopes))
+
+
+def touch_schedules(group_ids=(), teacher_ids=()):
+    touch_on_commit(
+        SCOPE_LIST,
+        *(group_scope(group_id) for group_id in group_ids if group_id is not None),
+        *(teacher_scope(teacher_id) for teacher_id in teacher_ids if teacher_id is not None)
+    )
+
+
+def get_request_scopes(group_id=None, teacher_id=None):
+    scopes = [SCOPE_ALL]
+    if group_id:
+        scopes.append(group_scope(group_id))
+    if teacher_id:
+        scopes.append(teacher_scope(teacher_id))
+    if not group_id and not teacher_id:
+        scopes.append(SCOPE_LIST)
+    return scopes
+
+
+class CachedResponse:
+    """
+    Ключ кэша и ETag ответа со списком занятий.
+
+    Ключ строится из версий затронутых областей и полного адреса запроса
+    (фильтры, диапазон дат, формат, пагинация), поэтому инвалидация сводится
+    к сдвигу версий, а ETag вычисляется без чтения тела ответа.
+    """
+
+    def __init__(self, request, scopes, renderer_format, extra=()):
+        self.versions = get_versions(scopes)
+        # extra — то, от чего ответ зависит помимо адреса (например, текущая дата)
+        signature = '|'.join(
+            [request.get_full_path(), renderer_format, *extra]
+            + [f'{scope}={self.versions[scope]}' for scope in sorted(self.versions)]
+        )
+        digest = hashlib.md5(signature.encode()).hexdigest()
+        self.key = f'{KEY_PREFIX}:response:{digest}'
+        self.etag = f'"{digest}"'
+
+    @property
+    def last_modified(self):
+        return max(self.versions.values())
+
+    def matches(self, request):
+        # If-None-Match важнее If-Modified-Since (RFC 7232)
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match is not None:
+            return self.etag in [tag.strip() for tag in if_none_match.split(',')]
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return if_modified_since is not None and int(self.last_modified) <= if_modified_since
+
+    def get(self):
+        return cache.get(self.key)
+
+    def set(self, content):
+        cache.set(self.key, content, settings.SCHEDULE_CACHE_TIMEOUT)
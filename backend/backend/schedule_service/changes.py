@@ -0,0 +1,166 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import EmptyResultSet
+from django.db import connection, transaction
+from django.db.models import F, Max, Min, Q
+from django.utils import timezone
+from .models import Schedule, ScheduleChange
+
+# Ключ advisory-блокировки PostgreSQL для журнала изменений
+CHANGES_LOCK_ID = 72150301
+
+
+class ChangesGone(Exception):
+    """Запрошенная версия старше сокращенного журнала"""
+
+
+def lock_changes():
+    """
+    Держит блокировку нумерации журнала до конца транзакции. SQLite и так
+    выполняет запись последовательно.
+    """
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [CHANGES_LOCK_ID])
+
+
+def assign_versions():
+    """
+    Выдает версии зафиксированным записям журнала без версии.
+
+    Нумерация идет отдельной короткой транзакцией под блокировкой, и новые
+    версии всегда больше выданных, поэтому клиент, видевший версию N, не
+    пропустит запись с меньшей версией. Пишущие транзакции блокировку не
+    берут и друг друга не ждут. Записи, оставшиеся без версии (процесс упал
+    после фиксации), нумеруются следующим вызовом.
+    """
+    pending = ScheduleChange.objects.filter(version__isnull=True)
+    if not pending.exists():
+        return 0
+    with transaction.atomic():
+        lock_changes()
+        first = pending.aggregate(first=Min('id'))['first']
+        if first is None:
+            return 0
+        # Версия — id записи со сдвигом: уникальна и больше последней выданной.
+        # Записи с меньшим id, зафиксированные позже, получат версии в
+        # следующий раз
+        offset = current_version() + 1 - first
+        return pending.filter(id__gte=first).update(version=F('id') + offset)
+
+
+def record_changes(schedules, action):
+    """Записывает изменения занятий (объекты с заполненным id)"""
+    changes = [
+        ScheduleChange(schedule_id=schedule.pk, action=action,
+                       group_id=schedule.group_id, teacher_id=schedule.teacher_id)
+        for schedule in schedules if schedule.pk is not None
+    ]
+    if not changes:
+        return
+    ScheduleChange.objects.bulk_create(changes, batch_size=settings.SCHEDULE_BULK_BATCH_SIZE)
+    transaction.on_commit(assign_versions)
+
+
+def record_queryset_changes(queryset, action):
+    """
+    Записывает изменения всех занятий выборки одним INSERT ... SELECT, без
+    загрузки занятий в память (массовые удаление и вставка генератора)
+    """
+    try:
+        select_sql, params = queryset.order_by().values_list('id', 'group_id', 'teacher_id').query.sql_with_params()
+    except EmptyResultSet:
+        # Выборка заведомо пуста, например filter(id__in=[])
+        return
+    table = connection.ops.quote_name(ScheduleChange._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} (schedule_id, group_id, teacher_id, action, created_at) '
+            f'SELECT changed.*, %s, %s FROM ({select_sql}) changed',
+            [action, timezone.now(), *params],
+        )
+    transaction.on_commit(assign_versions)
+
+
+def current_version():
+    return ScheduleChange.objects.aggregate(version=Max('version'))['version'] or 0
+
+
+def scope_version(group_id=None, teacher_id=None):
+    """
+    Последняя версия журнала в области группы или преподавателя: один запрос
+    MAX по индексам (group_id, version) и (teacher_id, version)
+    """
+    changes = ScheduleChange.objects.all()
+    if group_id:
+        changes = changes.filter(group_id=group_id)
+    if teacher_id:
+        changes = changes.filter(teacher_id=teacher_id)
+    return changes.aggregate(version=Max('version'))['version'] or 0
+
+
+def get_changes(since, group_id=None, teacher_id=None, limit=None):
+    """
+    Изменения после версии since в области группы или преподавателя,
+    свернутые до последнего состояния каждого занятия.
+
+    Возвращает (версия, id добавленных, id измененных, id удаленных, есть ли
+    еще записи). Состояние занятий берется из текущей таблицы, поэтому
+    занятие, ушедшее из области (сменился преподаватель нагрузки),
+    возвращается как удаленное. Клиент применяет добавленные и измененные
+    занятия как вставку с заменой.
+    """
+    limit = limit or settings.SCHEDULE_CHANGES_PAGE_SIZE
+    bounds = ScheduleChange.objects.aggregate(oldest=Min('version'), latest=Max('version'))
+    latest = bounds['latest'] or 0
+    # Записи после версии клиента удалены при сокращении журнала
+    if bounds['oldest'] is not None and since < bounds['oldest'] - 1:
+        raise ChangesGone()
+
+    scope = Q(version__gt=since, version__lte=latest)
+    if group_id:
+        scope &= Q(group_id=group_id)
+    if teacher_id:
+        scope &= Q(teacher_id=teacher_id)
+    entries = list(
+        ScheduleChange.objects.filter(scope).order_by('version')
+        .values_list('version', 'schedule_id', 'action')[:limit + 1]
+    )
+    has_more = len(entries) > limit
+    if has_more:
+        entries = entries[:limit]
+        latest = entries[-1][0]
+
+    first_actions = {}
+    for _, schedule_id, action in entries:
+        first_actions.setdefault(schedule_id, action)
+    present = Schedule.objects.filter(id__in=list(first_actions))
+    if group_id:
+        present = present.filter(group_id=group_id)
+    if teacher_id:
+        present = present.filter(teacher_id=teacher_id)
+    present = set(present.values_list('id', flat=True)) if first_actions else set()
+
+    inserted, updated, deleted = [], [], []
+    for schedule_id, first_action in first_actions.items():
+        if schedule_id in present:
+            (inserted if first_action == ScheduleChange.INSERT else updated).append(schedule_id)
+        elif first_action != ScheduleChange.INSERT:
+            deleted.append(schedule_id)
+        # Добавленное и удаленное в пределах окна занятие клиенту неизвестно
+    return latest, inserted, updated, deleted, has_more
+
+
+def compact_changes(max_age=None):
+    """
+    Удаляет записи старше SCHEDULE_CHANGES_RETENTION_DAYS дней. Последняя
+    запись сохраняется всегда, чтобы по журналу было видно текущую версию.
+    Заодно нумеруются записи, оставшиеся без версии.
+    """
+    max_age = timedelta(days=settings.SCHEDULE_CHANGES_RETENTION_DAYS) if max_age is None else max_age
+    assign_versions()
+    latest = current_version()
+    deleted, _ = ScheduleChange.objects.filter(
+        created_at__lt=timezone.now() - max_age, version__lt=latest
+    ).delete()
+    return deleted
@@ -0,0 +1,110 @@
+from itertools import groupby
+from django.db.models import Exists, OuterRef, Q
+from .models import Schedule
+
+CONFLICT_CLASSROOM = 'classroom'
+CONFLICT_TEACHER = 'teacher'
+CONFLICT_GROUP = 'group'
+
+
+class ConflictGroup:
+    """Занятия, пересекающиеся в один день и слот по аудитории, преподавателю или группе"""
+
+    def __init__(self, date, time_slot_id, members):
+        self.date = date
+        self.time_slot_id = time_slot_id
+        # members — строки (id, аудитория, преподаватель, группа, тип недели)
+        self.members = members
+        self.types = []
+        for conflict_type, column in ((CONFLICT_CLASSROOM, 1), (CONFLICT_TEACHER, 2), (CONFLICT_GROUP, 3)):
+            values = [member[column] for member in members if member[column] is not None]
+            if len(set(values)) < len(values):
+                self.types.append(conflict_type)
+
+    @property
+    def ids(self):
+        return [member[0] for member in self.members]
+
+    @property
+    def classroom_id(self):
+        classrooms = {member[1] for member in self.members}
+        return classrooms.pop() if len(classrooms) == 1 else None
+
+    @property
+    def week_type(self):
+        return self.members[0][4]
+
+    def involves(self, teacher_id=None, group_id=None, classroom_id=None):
+        return all(
+            value is None or any(str(member[column]) == str(value) for member in self.members)
+            for column, value in ((2, teacher_id), (3, group_id), (1, classroom_id))
+        )
+
+
+def _split_slot(rows):
+    """
+    Делит занятия одного дня и слота на связные группы: два занятия попадают
+    в одну группу, если у них общая аудитория, преподаватель или группа.
+    """
+    parent = list(range(len(rows)))
+
+    def find(index):
+        while parent[index] != index:
+            parent[index] = parent[parent[index]]
+            index = parent[index]
+        return index
+
+    for column in (1, 2, 3):
+        first_by_value = {}
+        for index, row in enumerate(rows):
+            if row[column] is None:
+                continue
+            first = first_by_value.setdefault(row[column], index)
+            if first != index:
+                parent[find(index)] = find(first)
+
+    components = {}
+    for index, row in enumerate(rows):
+        components.setdefault(find(index), []).append(row)
+    return [members for members in components.values() if len(members) > 1]
+
+
+def restrict_to_entity_slots(queryset, teacher_id=None, group_id=None, classroom_id=None):
+    """
+    Оставляет в выборке только дни и слоты, в которых есть занятия
+    указанных преподавателя, группы и аудитории. Конфликт с их участием
+    может быть только там, поэтому остальное расписание не читается.
+    Занятия без даты сравниваются между собой, как в find_conflicts.
+    """
+    for field, value in (('teacher_id', teacher_id), ('group_id', group_id), ('classroom_id', classroom_id)):
+        if value is None:
+            continue
+        involved = queryset.filter(**{field: value})
+        queryset = queryset.filter(
+            Q(date__isnull=False)
+            & Exists(involved.filter(date=OuterRef('date'), time_slot_id=OuterRef('time_slot_id')))
+            | Q(date__isnull=True)
+            & Exists(involved.filter(date__isnull=True, time_slot_id=OuterRef('time_slot_id')))
+        )
+    return queryset
+
+
+def find_conflicts(queryset=None):
+    """
+    Находит конфликты одним проходом по занятиям, отсортированным по дате и
+    слоту. Из базы читаются только нужные столбцы, связанные объекты не
+    загружаются.
+    """
+    if queryset is None:
+        queryset = Schedule.objects.all()
+    rows = queryset.order_by('date', 'time_slot_id', 'id').values_list(
+        'date', 'time_slot_id', 'id', 'classroom_id',
+        'teacher_id', 'group_id', 'week_type'
+    )
+
+    for (date, time_slot_id), slot_rows in groupby(rows.iterator(), key=lambda row: row[:2]):
+        slot_rows = [row[2:] for row in slot_rows]
+        if len(slot_rows) < 2:
+            continue
+        for members in _split_slot(slot_rows):
+            yield ConflictGroup(date, time_slot_id, members)
@@ -0,0 +1,24 @@
+import datetime
+import factory
+from factory.django import DjangoModelFactory
+from data_service.factories import ClassroomFactory, TeachingLoadFactory, TimeSlotFactory
+from .generator import get_week_type
+from .models import Schedule
+
+
+class ScheduleFactory(DjangoModelFactory):
+    """Занятие на дату, совпадающую по дню недели с парой"""
+
+    class Meta:
+        model = Schedule
+
+    class Params:
+        start_date = datetime.date(2025, 9, 1)
+
+    teaching_load = factory.SubFactory(TeachingLoadFactory)
+    time_slot = factory.SubFactory(TimeSlotFactory)
+    classroom = factory.SubFactory(ClassroomFactory)
+    date = factory.LazyAttribute(lambda schedule: schedule.start_date + datetime.timedelta(
+        days=schedule.time_slot.day_of_week - schedule.start_date.isoweekday()
+    ))
+    week_type = factory.LazyAttribute(lambda schedule: get_week_type(schedule.date))
@@ -0,0 +1,349 @@
+import math
+from datetime import datetime, timedelta
+from dateutil import rrule
+from django.conf import settings
+from django.db import transaction
+from . import cache as schedule_cache
+from .changes import record_queryset_changes
+from .models import Schedule, ScheduleChange
+from .occupancy import OccupancyIndex
+from .solver import SOLVERS, build_problem, get_solver
+from .writer import ScheduleWriter, delete_schedules
+from data_service.models import TeachingLoad
+from data_service.reference import get_reference_data
+
+
+class GenerationError(Exception):
+    """Ошибка во входных данных генерации расписания"""
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        raise GenerationError('Неверный формат даты. Используйте YYYY-MM-DD')
+
+
+def get_week_type(single_date):
+    # Определяем тип недели (четная/нечетная)
+    week_num = single_date.isocalendar()[1]
+    return 'ч' if week_num % 2 == 0 else 'з'
+
+
+def get_semester_hours(load, semester):
+    if semester == 1:
+        return load.semester1_hours or 0
+    return load.semester2_hours or 0
+
+
+def get_lessons_count(hours):
+    # Одно занятие (пара) покрывает SCHEDULE_HOURS_PER_LESSON академических часов
+    return math.ceil(hours / settings.SCHEDULE_HOURS_PER_LESSON)
+
+
+def get_suitable_classrooms(load, reference):
+    # Проверяем тип аудитории; специальность берется из снимка справочников
+    specialty = reference.specialties.get(load.discipline.specialty_id)
+    if specialty is not None and specialty.name.lower() in ['математика', 'физика']:
+        return list(reference.classrooms_by_type.get('lecture', ()))
+    return list(reference.classroom_list)
+
+
+class ScheduleGenerator:
+    """
+    Генерация расписания выбранных групп на период.
+
+    Используется как синхронным GenerateScheduleAPIView, так и фоновой
+    задачей Celery. О ходе работы сообщает через callback
+    progress(phase, placed, unplaced, percent).
+    """
+
+    PHASE_LOADING = 'loading'
+    PHASE_SOLVING = 'solving'
+    PHASE_SAVING = 'saving'
+    PHASE_DONE = 'done'
+
+    MODE_DAILY = 'daily'
+    MODE_WEEKLY = 'weekly'
+    MODES = (MODE_DAILY, MODE_WEEKLY)
+
+    def __init__(self, semester, start_date, end_date, group_ids, solver_name=None,
+                 mode=None, excluded_dates=()):
+        self.semester = semester
+        self.start_date = start_date
+        self.end_date = end_date
+        self.group_ids = group_ids
+        self.solver_name = solver_name or settings.SCHEDULE_SOLVER
+        self.mode = mode or settings.SCHEDULE_GENERATION_MODE
+        # Праздники и другие нерабочие даты, на которые занятия не ставятся
+        self.excluded_dates = list(excluded_dates) + list(settings.SCHEDULE_HOLIDAYS)
+        self.schedules = []
+        self.unplaced = 0
+        self.metrics = {}
+
+    @classmethod
+    def from_request_data(cls, data):
+        start_date_str = data.get('startDate')
+        end_date_str = data.get('endDate')
+
+        if not start_date_str or not end_date_str:
+            raise GenerationError('Необходимо указать начальную и конечную даты')
+
+        start_date = parse_date(start_date_str)
+        end_date = parse_date(end_date_str)
+        excluded_dates = [parse_date(date_str) for date_str in data.get('excludedDates') or []]
+
+        solver_name = data.get('solver') or settings.SCHEDULE_SOLVER
+        if solver_name not in SOLVERS:
+            raise GenerationError(f'Неизвестный алгоритм генерации: {solver_name}')
+
+        mode = data.get('mode') or settings.SCHEDULE_GENERATION_MODE
+        if mode not in cls.MODES:
+            raise GenerationError(f'Неизвестный режим генерации: {mode}')
+
+        return cls(
+            semester=data.get('semester', 1),
+            start_date=start_date,
+            end_date=end_date,
+            group_ids=data.get('groupIds', []),
+            solver_name=solver_name,
+            mode=mode,
+            excluded_dates=excluded_dates,
+        )
+
+    def run(self, progress=None):
+        report = progress or (lambda *args: None)
+        report(self.PHASE_LOADING, 0, 0, 0)
+
+        # Получаем учебные нагрузки для выбранных групп
+        teaching_loads = list(TeachingLoad.objects.filter(
+            group__id__in=self.group_ids,
+            **self._get_semester_filter()
+        ).select_related('group', 'teacher', 'discipline'))
+
+        if not teaching_loads:
+            raise GenerationError('Не найдено учебных нагрузок для выбранных групп')
+
+        # Временные слоты и аудитории берутся из снимка справочников процесса
+        reference = get_reference_data()
+        time_slots = list(reference.time_slot_list)
+        classrooms = list(reference.classroom_list)
+
+        # Подходящие аудитории зависят только от нагрузки, считаем их один раз
+        load_classrooms = {
+            load.id: get_suitable_classrooms(load, reference)
+            for load in teaching_loads
+        }
+
+        # Загружаем занятость преподавателей и аудиторий одним запросом,
+        # дальше все проверки выполняются в памяти. Старые занятия выбранных
+        # групп не учитываем: они будут удалены перед записью нового расписания
+        occupancy = OccupancyIndex.from_database(
+            time_slots, self.start_date, self.end_date, exclude_group_ids=self.group_ids
+        )
+
+        holidays = set(self.excluded_dates)
+        dates = [
+            single_date.date()
+            for single_date in rrule.rrule(rrule.DAILY, dtstart=self.start_date, until=self.end_date)
+            if single_date.date() not in holidays
+        ]
+
+        solver = get_solver(
+            self.solver_name,
+            time_limit=settings.SCHEDULE_SOLVER_TIME_LIMIT,
+            seed=settings.SCHEDULE_SOLVER_SEED,
+            iterations=settings.SCHEDULE_SOLVER_ITERATIONS,
+        )
+        solve_progress = lambda placed, unplaced, percent: report(  # noqa: E731
+            self.PHASE_SOLVING, placed, unplaced, percent
+        )
+
+        if self.mode == self.MODE_WEEKLY:
+            lessons = self._solve_weekly(
+                solver, solve_progress, dates, teaching_loads, time_slots, classrooms,
+                load_classrooms, occupancy
+            )
+        else:
+            lessons = self._solve_daily(
+                solver, solve_progress, dates, teaching_loads, time_slots, classrooms,
+                load_classrooms, occupancy
+            )
+
+        for load, single_date, slot, classroom in lessons:
+            self.schedules.append(Schedule(
+                teaching_load=load,
+                time_slot=slot,
+                classroom=classroom,
+                week_type=get_week_type(single_date),
+                date=single_date
+            ))
+        self.schedules.sort(key=lambda schedule: (schedule.date, schedule.time_slot.start_time))
+
+        report(self.PHASE_SAVING, len(self.schedules), self.unplaced, 100)
+        self._save()
+        report(self.PHASE_DONE, len(self.schedules), self.unplaced, 100)
+        return self.schedules
+
+    def _solve_daily(self, solver, progress, dates, teaching_loads, time_slots, classrooms,
+                     load_classrooms, occupancy):
+        """Решает задачу сразу для всех дат периода"""
+        # Модель задачи: нагрузки с бюджетом часов семестра, слоты по дням
+        # периода и аудитории; занятость других групп блокирует позиции
+        problem = build_problem(dates, time_slots, classrooms, [
+            (load, self._get_semester_hours(load), self._get_lessons(load), load_classrooms[load.id])
+            for load in teaching_loads
+        ])
+        problem.block_occupancy(occupancy)
+
+        result = solver.solve(problem, progress=progress)
+        self.metrics = result.metrics
+        self.unplaced = result.unplaced
+
+        return self._iter_assignments(problem, result, teaching_loads, time_slots, classrooms)
+
+    def _solve_weekly(self, solver, progress, dates, teaching_loads, time_slots, classrooms,
+                      load_classrooms, occupancy):
+        """
+        Решает задачу для шаблона из четной и нечетной недели и разворачивает
+        шаблон на все даты периода.
+
+        Шаблон задается двумя неделями-образцами с разной четностью. Позиция
+        шаблона (тип недели, день недели, слот) занята, если она занята хотя бы
+        в одну из соответствующих дат периода.
+        """
+        template_days = self._get_template_days()
+        template_day_by_key = {
+            (get_week_type(day), day.isoweekday()): day for day in template_days
+        }
+
+        # Даты периода для каждой позиции шаблона
+        dates_by_key = {}
+        for single_date in dates:
+            key = (get_week_type(single_date), single_date.isoweekday())
+            dates_by_key.setdefault(key, []).append(single_date)
+
+        # Количество двухнедельных циклов определяет, сколько занятий нагрузки
+        # должно попасть в шаблон. Берем меньшее из числа четных и нечетных
+        # недель, чтобы часов хватило при любом типе недели; лишние занятия
+        # отсекаются при развертывании
+        weeks = {
+            week_type: len({day.isocalendar()[:2] for day in dates if get_week_type(day) == week_type})
+            for week_type in ('ч', 'з')
+        }
+        cycles = max(min(weeks.values()), 1)
+
+        lessons_by_load = {load.id: self._get_lessons(load) for load in teaching_loads}
+        problem = build_problem(template_days, time_slots, classrooms, [
+            (
+                load,
+                self._get_semester_hours(load),
+                math.ceil(lessons_by_load[load.id] / cycles),
+                load_classrooms[load.id],
+            )
+            for load in teaching_loads
+        ])
+        problem.block_occupancy(
+            occupancy,
+            map_day=lambda day: template_day_by_key.get((get_week_type(day), day.isoweekday()))
+        )
+
+        result = solver.solve(problem, progress=progress)
+
+        # Разворачиваем шаблон: каждая позиция дает занятия во все свои даты,
+        # занятия нагрузки берутся по порядку дат до исчерпания часов
+        expanded = {}
+        for load, template_day, slot, classroom in self._iter_assignments(
+            problem, result, teaching_loads, time_slots, classrooms
+        ):
+            key = (get_week_type(template_day), template_day.isoweekday())
+            expanded.setdefault(load.id, []).extend(
+                (single_date, slot.start_time, slot, classroom)
+                for single_date in dates_by_key.get(key, ())
+            )
+
+        lessons = []
+        hours_scheduled = 0
+        self.unplaced = 0
+        for load in teaching_loads:
+            load_lessons = sorted(expanded.get(load.id, ()), key=lambda lesson: lesson[:2])
+            load_lessons = load_lessons[:lessons_by_load[load.id]]
+            lessons.extend(
+                (load, single_date, slot, classroom)
+                for single_date, _, slot, classroom in load_lessons
+            )
+            self.unplaced += lessons_by_load[load.id] - len(load_lessons)
+            hours_scheduled += min(
+                len(load_lessons) * settings.SCHEDULE_HOURS_PER_LESSON, self._get_semester_hours(load)
+            )
+
+        self.metrics = {
+            'lessons_total': sum(lessons_by_load.values()),
+            'placed': len(lessons),
+            'unplaced': self.unplaced,
+            'hours_planned': sum(self._get_semester_hours(load) for load in teaching_loads),
+            'hours_scheduled': hours_scheduled,
+            'solver': result.metrics['solver'],
+            'elapsed': result.metrics['elapsed'],
+            'template': result.metrics,
+        }
+        return lessons
+
+    @staticmethod
+    def _iter_assignments(problem, result, teaching_loads, time_slots, classrooms):
+        loads_by_id = {load.id: load for load in teaching_loads}
+        slots_by_id = {slot.id: slot for slot in time_slots}
+        for load_index, position, room in result.assignments:
+            yield (
+                loads_by_id[problem.loads[load_index].load_id],
+                problem.days[problem.position_day[position]],
+                slots_by_id[problem.position_slot[position]],
+                classrooms[room],
+            )
+
+    def _get_template_days(self):
+        """Две последовательные недели-образца разной четности"""
+        monday = self.start_date - timedelta(days=self.start_date.weekday())
+        # На стыке годов две соседние недели ISO могут быть нечетными
+        while get_week_type(monday) == get_week_type(monday + timedelta(days=7)):
+            monday += timedelta(days=7)
+        return [monday + timedelta(days=offset) for offset in range(14)]
+
+    def _save(self):
+        # Запись выполняется одной короткой транзакцией: удаление старого
+        # периода одним запросом и пакетная вставка новых занятий
+        with transaction.atomic():
+            previous = Schedule.objects.filter(
+                group_id__in=self.group_ids,
+                date__gte=self.start_date,
+                date__lte=self.end_date
+            )
+            teacher_ids = set(previous.values_list('teacher_id', flat=True).distinct())
+            delete_schedules(previous)
+
+            writer = ScheduleWriter()
+            for schedule in self.schedules:
+                writer.add(schedule)
+            writer.flush()
+            # COPY не возвращает id, поэтому новые занятия журналируются выборкой периода
+            record_queryset_changes(Schedule.objects.filter(
+                group_id__in=self.group_ids,
+                date__gte=self.start_date,
+                date__lte=self.end_date
+            ), ScheduleChange.INSERT)
+
+            # Массовая запись идет мимо сигналов, поэтому кэш расписаний
+            # затронутых групп и преподавателей сбрасываем явно
+            teacher_ids.update(schedule.teacher_id for schedule in self.schedules)
+            schedule_cache.touch_schedules(group_ids=self.group_ids, teacher_ids=teacher_ids)
+
+    def _get_semester_filter(self):
+        if self.semester == 1:
+            return {'semester1_hours__gt': 0}
+        return {'semester2_hours__gt': 0}
+
+    def _get_semester_hours(self, load):
+        return get_semester_hours(load, self.semester)
+
+    def _get_lessons(self, load):
+        return get_lessons_count(self._get_semester_hours(load))
@@ -0,0 +1,119 @@
+from datetime import datetime, timezone
+import pytz
+from django.conf import settings
+from data_service.models import Teacher
+from data_service.reference import get_reference_data
+
+ICS_CONTENT_TYPE = 'text/calendar; charset=utf-8'
+
+# Событий в одном фрагменте потокового ответа
+EVENTS_PER_CHUNK = 200
+
+FEED_COLUMNS = (
+    'date', 'time_slot_id', 'classroom_id', 'teaching_load_id', 'teaching_load__discipline__name',
+    'teacher__last_name', 'teacher__first_name', 'teacher__middle_name', 'group__name',
+)
+
+
+def escape_text(value):
+    """Экранирование значения TEXT по RFC 5545"""
+    return (
+        str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+    )
+
+
+def fold_line(line):
+    """Перенос строк длиннее 75 байт; многобайтовые символы не разрываются"""
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Байты продолжения UTF-8 имеют вид 10xxxxxx
+        while cut < len(encoded) and encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+        # Строка продолжения начинается с пробела, он входит в 75 байт
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _format_utc(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def lesson_uid(date, time_slot_id, teaching_load_id):
+    """
+    UID занятия из его естественного ключа: нагрузка, дата и пара. Не
+    зависит от id строки, поэтому повторная генерация с тем же размещением
+    не заставляет календари удалять и заново создавать события.
+    """
+    return f'{date:%Y%m%d}-{time_slot_id}-{teaching_load_id}@{settings.SCHEDULE_ICS_UID_DOMAIN}'
+
+
+class CalendarFeed:
+    """Календарь занятий группы, преподавателя или аудитории"""
+
+    def __init__(self, name, queryset, start_date, last_modified):
+        self.name = name
+        self.queryset = queryset.filter(date__gte=start_date)
+        self.start_date = start_date
+        self.stamp = _format_utc(datetime.fromtimestamp(last_modified, timezone.utc))
+        self.timezone = pytz.timezone(settings.SCHEDULE_TIMEZONE)
+
+    def _header(self):
+        lines = [
+            'BEGIN:VCALENDAR',
+            'VERSION:2.0',
+            'PRODID:-//College Schedule//Расписание//RU',
+            'CALSCALE:GREGORIAN',
+            'METHOD:PUBLISH',
+            f'X-WR-CALNAME:{escape_text(self.name)}',
+            f'X-WR-TIMEZONE:{settings.SCHEDULE_TIMEZONE}',
+            f'REFRESH-INTERVAL;VALUE=DURATION:PT{settings.SCHEDULE_ICS_REFRESH_HOURS}H',
+        ]
+        return ''.join(fold_line(line) for line in lines)
+
+    def _event(self, row, reference):
+        (date, time_slot_id, classroom_id, load_id, discipline,
+         last_name, first_name, middle_name, group) = row
+        time_slot = reference.time_slots.get(time_slot_id)
+        if time_slot is None:
+            return ''
+        classroom = reference.classrooms.get(classroom_id)
+        start = self.timezone.localize(datetime.combine(date, time_slot.start_time))
+        end = self.timezone.localize(datetime.combine(date, time_slot.end_time))
+        teacher = Teacher.format_short_name(last_name, first_name, middle_name) if last_name else ''
+
+        lines = [
+            'BEGIN:VEVENT',
+            f'UID:{lesson_uid(date, time_slot_id, load_id)}',
+            f'DTSTAMP:{self.stamp}',
+            f'DTSTART:{_format_utc(start)}',
+            f'DTEND:{_format_utc(end)}',
+            f'SUMMARY:{escape_text(discipline)}',
+            f"LOCATION:{escape_text(f'ауд. {classroom.number}' if classroom else '')}",
+            f"DESCRIPTION:{escape_text(', '.join(part for part in (teacher, group) if part))}",
+            'END:VEVENT',
+        ]
+        return ''.join(fold_line(line) for line in lines)
+
+    def __iter__(self):
+        """Календарь фрагментами по EVENTS_PER_CHUNK событий, строки читаются итератором"""
+        reference = get_reference_data()
+        yield self._header().encode()
+
+        rows = self.queryset.order_by('date', 'time_slot__start_time', 'id').values_list(*FEED_COLUMNS)
+        chunk = []
+        for row in rows.iterator(chunk_size=2000):
+            chunk.append(self._event(row, reference))
+            if len(chunk) >= EVENTS_PER_CHUNK:
+                yield ''.join(chunk).encode()
+                chunk = []
+        chunk.append('END:VCALENDAR\r\n')
+        yield ''.join(chunk).encode()
+
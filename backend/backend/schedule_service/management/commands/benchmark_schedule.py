@@ -0,0 +1,203 @@
+import gc
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from rest_framework.test import APIClient
+from data_service.models import StudentGroup
+from data_service.reference import bump_version
+from data_service.synthesis import COLLEGE_SIZES, flush_college, synthesize_college
+from reporting_service.artifacts import REPORT_FORMATS, evict_reports
+from schedule_service import cache as schedule_cache
+from schedule_service.models import Schedule
+
+CASES = ['generate', 'list', 'list_cached', 'timetable', 'conflicts'] + [
+    f'report_{report_type}' for report_type in REPORT_FORMATS
+]
+
+
+class QueryCounter:
+    """
+    Счетчик запросов через execute_wrapper: CaptureQueriesContext здесь не
+    подходит, так как журнал запросов сбрасывается в начале каждого запроса
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _consume(response):
+    # Файловые ответы читаются целиком, чтобы замер включал выдачу файла
+    if response.streaming:
+        size = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return size
+    return len(response.content)
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет генерацию, выдачу и конфликты расписания и отчеты на синтетических '
+        'колледжах разного размера: время, число запросов и пик памяти. '
+        'Замер идет на временной тестовой базе, которая удаляется после запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', nargs='+', choices=COLLEGE_SIZES, default=list(COLLEGE_SIZES))
+        parser.add_argument('--cases', nargs='+', choices=CASES, default=CASES)
+        parser.add_argument('--start-date', default='2025-09-01', help='Начало периода генерации')
+        parser.add_argument('--weeks', type=int, default=17, help='Длительность периода генерации')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', default='benchmark_results.json', help='Файл результатов JSON')
+        parser.add_argument(
+            '--current-database', action='store_true',
+            help='Замерять на базе из настроек вместо временной. Все данные справочников будут удалены'
+        )
+        parser.add_argument('--noinput', '--no-input', action='store_false', dest='interactive')
+
+    def handle(self, *args, **options):
+        try:
+            if options['current_database']:
+                if options['interactive']:
+                    answer = input(
+                        f'Все данные базы {connection.settings_dict["NAME"]} будут удалены. '
+                        'Введите "yes" для продолжения: '
+                    )
+                    if answer != 'yes':
+                        raise CommandError('Замер отменен')
+                self._run(options)
+                return
+
+            # Временная база создается и удаляется так же, как при запуске
+            # тестов; для PostgreSQL нужно право CREATEDB
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=not options['interactive'], serialize=False)
+            try:
+                self._run(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+        finally:
+            # Кэш общий с рабочими процессами: ответы и снимок справочников,
+            # построенные на синтетических данных, не должны быть им выданы
+            schedule_cache.touch(schedule_cache.SCOPE_ALL)
+            bump_version()
+
+    def _run(self, options):
+        start_date = datetime.strptime(options['start_date'], '%Y-%m-%d').date()
+        end_date = start_date + timedelta(weeks=options['weeks'], days=-1)
+        results = {
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'solver': settings.SCHEDULE_SOLVER,
+                'mode': settings.SCHEDULE_GENERATION_MODE,
+            },
+            'period': {'start_date': start_date.isoformat(), 'end_date': end_date.isoformat()},
+            'sizes': {},
+        }
+
+        # Отчеты строятся во временный каталог, рабочий кэш отчетов не трогаем
+        with tempfile.TemporaryDirectory() as report_dir, override_settings(REPORT_CACHE_DIR=report_dir):
+            for size in options['sizes']:
+                flush_college()
+                dataset = synthesize_college(seed=options['seed'], **COLLEGE_SIZES[size])
+                self.stdout.write(f'{size}: ' + ', '.join(f'{name} {count}' for name, count in dataset.items()))
+
+                payload = {
+                    'semester': 1,
+                    'startDate': start_date.isoformat(),
+                    'endDate': end_date.isoformat(),
+                    'groupIds': list(StudentGroup.objects.values_list('id', flat=True)),
+                }
+                cases = {}
+                for name in CASES:
+                    if name not in options['cases']:
+                        continue
+                    setup, request = self._get_case(name, payload)
+                    cases[name] = self._measure(setup, request)
+                    self.stdout.write(
+                        f"  {name:<12} {cases[name]['seconds']:>8.3f} с, запросов {cases[name]['queries']:>5}, "
+                        f"пик памяти {cases[name]['peak_memory_mb']:>8.1f} МБ"
+                    )
+                results['sizes'][size] = {
+                    'dataset': dataset,
+                    'schedules': Schedule.objects.count(),
+                    'cases': cases,
+                }
+
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Результаты записаны в {options['output']}"))
+
+    def _get_case(self, name, payload):
+        """Подготовка (не замеряется) и запрос замера"""
+        client = APIClient()
+        # Холодный кэш ответов: версии всех областей сдвигаются
+        cold = lambda: schedule_cache.touch(schedule_cache.SCOPE_ALL)  # noqa: E731
+        period = {'start_date': payload['startDate'], 'end_date': payload['endDate']}
+
+        if name == 'generate':
+            return None, lambda: client.post('/api/schedules/generate/', payload, format='json')
+        schedule_list = lambda: client.get('/api/schedules/', period, format='json')  # noqa: E731
+        if name == 'list':
+            return cold, schedule_list
+        if name == 'list_cached':
+            # Первый запрос заполняет кэш ответов
+            return lambda: _consume(schedule_list()), schedule_list
+        if name == 'timetable':
+            return cold, lambda: client.get('/api/schedules/', dict(period, view='timetable'), format='json')
+        if name == 'conflicts':
+            return None, lambda: client.get('/api/schedules/conflicts/', period)
+
+        report_type = name.split('_', 1)[1]
+        return (
+            lambda: evict_reports(max_age=0, max_size=0),
+            lambda: client.get('/api/reports/schedule/', dict(period, type=report_type)),
+        )
+
+    @staticmethod
+    def _measure(setup, request):
+        """
+        Два прогона: первый — время и запросы, второй под tracemalloc — пик
+        памяти Python (tracemalloc заметно замедляет выполнение).
+        """
+        if setup:
+            setup()
+        gc.collect()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            started = time.perf_counter()
+            response = request()
+            size = _consume(response)
+            seconds = time.perf_counter() - started
+
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            _consume(request())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'status': response.status_code,
+            'seconds': round(seconds, 4),
+            'queries': queries.count,
+            'peak_memory_mb': round(peak / 1024 / 1024, 2),
+            'response_bytes': size,
+        }
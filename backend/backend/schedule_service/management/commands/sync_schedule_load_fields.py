@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db.models import OuterRef, Q, Subquery
+from data_service.models import TeachingLoad
+from schedule_service.models import Schedule
+
+
+class Command(BaseCommand):
+    help = 'Заполняет преподавателя и группу занятий из учебных нагрузок одним UPDATE'
+
+    def handle(self, *args, **options):
+        loads = TeachingLoad.objects.filter(id=OuterRef('teaching_load_id'))
+        updated = Schedule.objects.filter(
+            Q(teacher__isnull=True) | Q(group__isnull=True)
+        ).update(
+            teacher_id=Subquery(loads.values('teacher_id')[:1]),
+            group_id=Subquery(loads.values('group_id')[:1]),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Обновлено занятий: {updated}'))
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('data_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Schedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('week_type', models.CharField(blank=True, choices=[('ч', 'Четная'), ('з', 'Нечетная')], max_length=1, null=True)),
+                ('date', models.DateField(blank=True, null=True)),
+                ('classroom', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_service_classrooms', to='data_service.classroom')),
+                ('teaching_load', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_service_teaching_loads', to='data_service.teachingload')),
+                ('time_slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_service_time_slots', to='data_service.timeslot')),
+            ],
+            options={
+                'db_table': 'schedule',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('classroom', 'teaching_load', 'time_slot'), name='unique_schedule_booking'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:05
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+import django.db.models.deletion
+
+# Сколько пересечений каждого вида показывать в ошибке миграции
+CONFLICTS_SHOWN = 20
+
+
+def backfill_load_fields(apps, schema_editor):
+    """Копирует преподавателя и группу нагрузки в занятия одним UPDATE"""
+    Schedule = apps.get_model('schedule_service', 'Schedule')
+    TeachingLoad = apps.get_model('data_service', 'TeachingLoad')
+    loads = TeachingLoad.objects.filter(id=OuterRef('teaching_load_id'))
+    Schedule.objects.update(
+        teacher_id=Subquery(loads.values('teacher_id')[:1]),
+        group_id=Subquery(loads.values('group_id')[:1]),
+    )
+
+
+def check_bookings(apps, schema_editor):
+    """
+    Старое ограничение не учитывало дату, поэтому в базе могут быть двойные
+    бронирования. Вместо ошибки IntegrityError при создании ограничений
+    миграция перечисляет пересечения: их нужно устранить и повторить migrate.
+    """
+    Schedule = apps.get_model('schedule_service', 'Schedule')
+    errors = []
+    for field in ('classroom', 'teacher', 'group'):
+        duplicates = list(
+            Schedule.objects.filter(date__isnull=False, **{f'{field}__isnull': False})
+            .values(field, 'date', 'time_slot').annotate(count=Count('id')).filter(count__gt=1)
+            .order_by('date', 'time_slot')[:CONFLICTS_SHOWN]
+        )
+        for row in duplicates:
+            ids = list(Schedule.objects.filter(
+                **{field: row[field], 'date': row['date'], 'time_slot': row['time_slot']}
+            ).values_list('id', flat=True))
+            errors.append(f"{field} {row[field]}, {row['date']}, пара {row['time_slot']}: занятия {ids}")
+    if errors:
+        raise RuntimeError(
+            'Двойные бронирования в расписании, ограничения уникальности не созданы:\n' + '\n'.join(errors)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('data_service', '0001_initial'),
+        ('schedule_service', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='schedule',
+            name='unique_schedule_booking',
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='group',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_service_groups', to='data_service.studentgroup'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='teacher',
+            field=models.ForeignKey(blank=True, db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_service_teachers', to='data_service.teacher'),
+        ),
+        # Сначала заполняем копии полей нагрузки, затем проверяем данные и
+        # только после этого создаем ограничения
+        migrations.RunPython(backfill_load_fields, migrations.RunPython.noop),
+        migrations.RunPython(check_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('classroom', 'date', 'time_slot'), name='unique_classroom_booking'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('teacher', 'date', 'time_slot'), name='unique_teacher_booking'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(fields=('group', 'date', 'time_slot'), name='unique_group_booking'),
+        ),
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['date', 'time_slot'], name='schedule_date_slot_idx'),
+        ),
+    ]
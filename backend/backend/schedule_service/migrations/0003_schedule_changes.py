@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 17:03
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule_service', '0002_schedule_teacher_group'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleChange',
+            fields=[
+                ('version', models.BigAutoField(primary_key=True, serialize=False)),
+                ('schedule_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('insert', 'Добавлено'), ('update', 'Изменено'), ('delete', 'Удалено')], max_length=6)),
+                ('group_id', models.BigIntegerField(blank=True, null=True)),
+                ('teacher_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'schedule_changes',
+                'indexes': [models.Index(fields=['group_id', 'version'], name='schedule_change_group_idx'), models.Index(fields=['teacher_id', 'version'], name='schedule_change_teacher_idx'), models.Index(fields=['created_at'], name='schedule_change_created_idx')],
+            },
+        ),
+    ]
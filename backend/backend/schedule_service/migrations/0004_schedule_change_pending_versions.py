@@ -0,0 +1,43 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('schedule_service', '0003_schedule_changes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='schedulechange',
+            name='schedule_change_group_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='schedulechange',
+            name='schedule_change_teacher_idx',
+        ),
+        # Прежний номер записи становится ключом, версии существующих
+        # записей сохраняются
+        migrations.RenameField(
+            model_name='schedulechange',
+            old_name='version',
+            new_name='id',
+        ),
+        migrations.AddField(
+            model_name='schedulechange',
+            name='version',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunSQL(
+            'UPDATE schedule_changes SET version = id',
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='schedulechange',
+            index=models.Index(fields=['group_id', 'version'], name='schedule_change_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='schedulechange',
+            index=models.Index(fields=['teacher_id', 'version'], name='schedule_change_teacher_idx'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
-from data_service.models import TeachingLoad, TimeSlot, Classroom
+from django.utils import timezone
+from data_service.models import TeachingLoad, TimeSlot, Classroom, Teacher, StudentGroup
 
 class Schedule(models.Model):
     WEEK_TYPES = [
@@ -22,17 +23,103 @@ class Schedule(models.Model):
         on_delete=models.CASCADE, 
         related_name='schedule_service_classrooms'  # Изменено
     )
+    # Копии преподавателя и группы нагрузки, чтобы фильтры и проверки
+    # занятости не делали JOIN с teaching_loads. Заполняются в save() и
+    # ScheduleWriter, при смене преподавателя или группы нагрузки
+    # обновляются сигналом
+    teacher = models.ForeignKey(
+        Teacher,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='schedule_service_teachers'
+    )
+    group = models.ForeignKey(
+        StudentGroup,
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        editable=False,
+        db_index=False,
+        related_name='schedule_service_groups'
+    )
     week_type = models.CharField(max_length=1, choices=WEEK_TYPES, blank=True, null=True)
     date = models.DateField(blank=True, null=True)
 
     class Meta:
         constraints = [
+            # В один слот дня аудитория, преподаватель и группа заняты не более
+            # одного раза. Индексы ограничений также обслуживают выборки
+            # расписания преподавателя и группы по диапазону дат
+            models.UniqueConstraint(
+                fields=['classroom', 'date', 'time_slot'],
+                name='unique_classroom_booking'
+            ),
+            models.UniqueConstraint(
+                fields=['teacher', 'date', 'time_slot'],
+                name='unique_teacher_booking'
+            ),
             models.UniqueConstraint(
-                fields=['classroom', 'teaching_load', 'time_slot'], 
-                name='unique_schedule_booking'
-            )
+                fields=['group', 'date', 'time_slot'],
+                name='unique_group_booking'
+            ),
+        ]
+        indexes = [
+            # Диапазон дат без фильтра по преподавателю или группе
+            # и проход поиска конфликтов в порядке (дата, слот)
+            models.Index(fields=['date', 'time_slot'], name='schedule_date_slot_idx'),
         ]
         db_table = 'schedule'
 
+    def sync_load_fields(self):
+        """Копирует преподавателя и группу из учебной нагрузки"""
+        load = self.teaching_load
+        self.teacher_id = load.teacher_id
+        self.group_id = load.group_id
+
+    def save(self, *args, **kwargs):
+        self.sync_load_fields()
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.teaching_load} - {self.time_slot} - {self.classroom}"
+
+class ScheduleChange(models.Model):
+    """
+    Журнал изменений расписания только на добавление. Версия записи служит
+    для синхронизации клиентов (?since=). Записи добавляются без версии в
+    транзакции изменения, а версии выдаются после ее фиксации в порядке
+    нумерации (см. changes.assign_versions).
+    """
+    INSERT = 'insert'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ACTIONS = [
+        (INSERT, 'Добавлено'),
+        (UPDATE, 'Изменено'),
+        (DELETE, 'Удалено'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Пустая версия: запись еще не пронумерована и клиентам не видна
+    version = models.BigIntegerField(blank=True, null=True, unique=True)
+    # Без внешних ключей: записи об удаленных занятиях остаются в журнале
+    schedule_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS)
+    # Группа и преподаватель занятия на момент изменения
+    group_id = models.BigIntegerField(blank=True, null=True)
+    teacher_id = models.BigIntegerField(blank=True, null=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['group_id', 'version'], name='schedule_change_group_idx'),
+            models.Index(fields=['teacher_id', 'version'], name='schedule_change_teacher_idx'),
+            models.Index(fields=['created_at'], name='schedule_change_created_idx'),
+        ]
+        db_table = 'schedule_changes'
+
     def __str__(self):
-        return f"{self.teaching_load} - {self.time_slot} - {self.classroom}"
\ No newline at end of file
+        return f"{self.version}: {self.get_action_display()} {self.schedule_id}"
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from .models import Schedule
+
+
+class OccupancyIndex:
+    """
+    Индекс занятости преподавателей, групп и аудиторий в памяти.
+
+    Для каждой пары (преподаватель, дата), (группа, дата) и (аудитория, дата)
+    хранится битовая маска занятых временных слотов, поэтому проверка
+    доступности не требует обращения к базе данных.
+    """
+
+    def __init__(self, time_slots):
+        self._slot_ids = [slot.id for slot in time_slots]
+        self._slot_bits = {slot_id: 1 << position for position, slot_id in enumerate(self._slot_ids)}
+        self._teachers = defaultdict(int)
+        self._groups = defaultdict(int)
+        self._classrooms = defaultdict(int)
+
+    @classmethod
+    def from_database(cls, time_slots, start_date, end_date, exclude_group_ids=(), exclude_ids=(),
+                      condition=None):
+        """
+        Строит индекс по уже существующим занятиям периода одним запросом.
+        Занятия групп из exclude_group_ids и занятия с id из exclude_ids
+        не учитываются (они будут пересозданы или перенесены). condition —
+        дополнительное условие (Q), если нужны только отдельные сущности.
+        """
+        index = cls(time_slots)
+        bookings = Schedule.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date
+        )
+        if condition is not None:
+            bookings = bookings.filter(condition)
+        bookings = bookings.exclude(
+            group_id__in=exclude_group_ids
+        ).exclude(
+            id__in=exclude_ids
+        ).values_list(
+            'teacher_id', 'group_id', 'classroom_id', 'time_slot_id', 'date'
+        )
+
+        for teacher_id, group_id, classroom_id, time_slot_id, date in bookings.iterator():
+            index.book(teacher_id, group_id, classroom_id, time_slot_id, date)
+        return index
+
+    def is_teacher_free(self, teacher_id, time_slot_id, date):
+        return not self._teachers.get((teacher_id, date), 0) & self._slot_bits[time_slot_id]
+
+    def is_group_free(self, group_id, time_slot_id, date):
+        return not self._groups.get((group_id, date), 0) & self._slot_bits[time_slot_id]
+
+    def is_classroom_free(self, classroom_id, time_slot_id, date):
+        return not self._classrooms.get((classroom_id, date), 0) & self._slot_bits[time_slot_id]
+
+    def slot_mask(self, time_slot_ids):
+        """Маска из битов перечисленных слотов"""
+        mask = 0
+        for time_slot_id in time_slot_ids:
+            mask |= self._slot_bits[time_slot_id]
+        return mask
+
+    def slot_ids(self, mask):
+        """Слоты, биты которых установлены в маске"""
+        return [slot_id for slot_id in self._slot_ids if mask & self._slot_bits[slot_id]]
+
+    def teacher_mask(self, teacher_id, date):
+        return self._teachers.get((teacher_id, date), 0)
+
+    def group_mask(self, group_id, date):
+        return self._groups.get((group_id, date), 0)
+
+    def classroom_mask(self, classroom_id, date):
+        return self._classrooms.get((classroom_id, date), 0)
+
+    def book(self, teacher_id, group_id, classroom_id, time_slot_id, date):
+        bit = self._slot_bits[time_slot_id]
+        self._teachers[(teacher_id, date)] |= bit
+        self._groups[(group_id, date)] |= bit
+        self._classrooms[(classroom_id, date)] |= bit
+
+    def teacher_bookings(self):
+        """Занятые (преподаватель, дата, слот)"""
+        return self._iter_bookings(self._teachers)
+
+    def group_bookings(self):
+        """Занятые (группа, дата, слот)"""
+        return self._iter_bookings(self._groups)
+
+    def classroom_bookings(self):
+        """Занятые (аудитория, дата, слот)"""
+        return self._iter_bookings(self._classrooms)
+
+    def _iter_bookings(self, masks):
+        for (entity_id, date), mask in masks.items():
+            position = 0
+            while mask:
+                if mask & 1:
+                    yield entity_id, date, self._slot_ids[position]
+                mask >>= 1
+                position += 1
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import date, time
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from data_service.reference import get_reference_data
+
+
+class ScheduleCursorPagination(BasePagination):
+    """
+    Keyset-пагинация занятий по (дата, начало пары, id).
+
+    Курсор хранит ключ последнего занятия страницы, следующая страница
+    выбирается условием «ключ больше курсора», поэтому стоимость запроса не
+    растет с номером страницы. Пагинация включается, только если клиент
+    передал cursor или page_size, иначе список отдается целиком, как раньше.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    ordering = ('date', 'time_slot__start_time', 'id')
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, settings.SCHEDULE_PAGE_SIZE))
+        except ValueError:
+            page_size = settings.SCHEDULE_PAGE_SIZE
+        return max(min(page_size, settings.SCHEDULE_MAX_PAGE_SIZE), 1)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            current_date, start_time, schedule_id = self.decode_cursor(encoded)
+            queryset = queryset.filter(
+                Q(date__gt=current_date)
+                | Q(date=current_date, time_slot__start_time__gt=start_time)
+                | Q(date=current_date, time_slot__start_time=start_time, id__gt=schedule_id)
+            )
+
+        # Лишняя строка показывает, есть ли следующая страница
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        page = page[:self.page_size]
+        self.last_position = self.get_position(page[-1]) if page else None
+        return page
+
+    @staticmethod
+    def get_position(item):
+        # Страница может состоять из моделей или словарей .values()
+        if isinstance(item, dict):
+            return item['date'], item['time_slot__start_time'], item['id']
+        time_slot = get_reference_data().time_slots.get(item.time_slot_id) or item.time_slot
+        return item.date, time_slot.start_time, item.id
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    @staticmethod
+    def encode_cursor(position):
+        current_date, start_time, schedule_id = position
+        payload = json.dumps([current_date.isoformat(), start_time.isoformat(), schedule_id])
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    @staticmethod
+    def decode_cursor(encoded):
+        try:
+            current_date, start_time, schedule_id = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return date.fromisoformat(current_date), time.fromisoformat(start_time), int(schedule_id)
+        except (TypeError, ValueError):
+            raise NotFound('Неверный курсор')
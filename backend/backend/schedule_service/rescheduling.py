@@ -0,0 +1,316 @@
+from dateutil import rrule
+from django.conf import settings
+from django.db import transaction
+from . import cache as schedule_cache
+from .changes import record_changes
+from .generator import get_lessons_count, get_semester_hours, get_suitable_classrooms, get_week_type
+from .models import Schedule, ScheduleChange
+from .occupancy import OccupancyIndex
+from .serializers import RescheduleSerializer
+from .solver import BaseSolver, build_problem
+from .writer import ScheduleWriter, delete_schedules
+from data_service.models import TeachingLoad
+from data_service.reference import get_reference_data
+
+
+class RepairSolver(BaseSolver):
+    """
+    Точечный ремонт расписания.
+
+    Переносимые занятия ставятся на прежнее место (если изменилась только
+    аудитория) или в ближайшую к исходной дате свободную позицию, новые
+    нагрузки распределяются равномерно по периоду.
+    """
+
+    name = 'repair'
+
+    def __init__(self, moves, existing_days, **options):
+        super().__init__(**options)
+        # moves — список (индекс нагрузки, исходная позиция или None, желаемый день)
+        self.moves = moves
+        self.existing_days = existing_days
+
+    def _solve(self, state):
+        problem = state.problem
+        for load_index, position, ideal_day in self.moves:
+            if position is not None and state.is_free(load_index, position):
+                room = state.free_room(load_index, position)
+                if room is not None:
+                    state.place(load_index, position, room)
+                    continue
+
+            feasible = state.feasible(load_index)
+            busy_days = state.used_days_mask(load_index) | self.existing_days.get(load_index, 0)
+            for candidates in (feasible & ~busy_days, feasible):
+                new_position = self.choose_position(state, candidates, ideal_day)
+                if new_position is not None:
+                    state.place(load_index, new_position, state.free_room(load_index, new_position))
+                    break
+
+        # Оставшиеся занятия — это новые нагрузки
+        for load_index in range(len(problem.loads)):
+            while state.remaining(load_index) > 0 and not self.time_is_up():
+                if not self.place_next(state, load_index):
+                    break
+
+
+class ScheduleRescheduler:
+    """
+    Инкрементальное перепланирование по набору изменений.
+
+    Затрагиваются только занятия, которым мешают изменения: уроки
+    недоступного преподавателя, уроки в закрытой аудитории, занятия удаленных
+    нагрузок и недостающие занятия добавленных нагрузок. Остальные строки
+    расписания не изменяются.
+    """
+
+    def __init__(self, start_date, end_date, semester=1, teacher_unavailable=None,
+                 classroom_closed=None, loads_added=(), loads_removed=(), drop_unplaced=False):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.semester = semester
+        # {id преподавателя: множество дат}, {id аудитории: множество дат}
+        self.teacher_unavailable = teacher_unavailable or {}
+        self.classroom_closed = classroom_closed or {}
+        self.loads_added = list(loads_added)
+        self.loads_removed = list(loads_removed)
+        # Неразмещенные переносимые занятия удаляются только по явному флагу
+        self.drop_unplaced = drop_unplaced
+        self.summary = {}
+
+    @classmethod
+    def from_request_data(cls, data):
+        """Проверяет набор изменений сериализатором, ошибки — ValidationError (400)"""
+        serializer = RescheduleSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        def group_dates(items, key):
+            changes = {}
+            for item in items:
+                changes.setdefault(item[key], set()).update(item['dates'])
+            return changes
+
+        return cls(
+            start_date=data['startDate'],
+            end_date=data['endDate'],
+            semester=data['semester'],
+            teacher_unavailable=group_dates(data['teacherUnavailable'], 'teacherId'),
+            classroom_closed=group_dates(data['classroomClosed'], 'classroomId'),
+            loads_added=data['loadsAdded'],
+            loads_removed=data['loadsRemoved'],
+            drop_unplaced=data['dropUnplaced'],
+        )
+
+    def run(self):
+        period = Schedule.objects.filter(date__gte=self.start_date, date__lte=self.end_date)
+
+        # Занятия, которые нужно перенести
+        affected = []
+        for teacher_id, dates in self.teacher_unavailable.items():
+            affected.extend(period.filter(teacher_id=teacher_id, date__in=dates)
+                            .exclude(teaching_load_id__in=self.loads_removed)
+                            .values_list('id', flat=True))
+        for classroom_id, dates in self.classroom_closed.items():
+            affected.extend(period.filter(classroom_id=classroom_id, date__in=dates)
+                            .exclude(teaching_load_id__in=self.loads_removed)
+                            .values_list('id', flat=True))
+        moved_schedules = list(
+            Schedule.objects.filter(id__in=set(affected)).order_by('date', 'time_slot__start_time')
+        )
+        moved_ids = [schedule.id for schedule in moved_schedules]
+
+        load_ids = {schedule.teaching_load_id for schedule in moved_schedules} | set(self.loads_added)
+        teaching_loads = list(
+            TeachingLoad.objects.filter(id__in=load_ids).select_related('discipline')
+        )
+        reference = get_reference_data()
+        time_slots = list(reference.time_slot_list)
+        classrooms = list(reference.classroom_list)
+
+        # Нерабочие даты исключаются, как и при генерации
+        holidays = set(settings.SCHEDULE_HOLIDAYS)
+        dates = [
+            single_date.date()
+            for single_date in rrule.rrule(rrule.DAILY, dtstart=self.start_date, until=self.end_date)
+            if single_date.date() not in holidays
+        ]
+
+        # Сколько занятий ставить: переносимые плюс недостающие у новых нагрузок
+        existing = {}
+        for load_id, single_date in period.filter(teaching_load_id__in=load_ids).exclude(
+            id__in=moved_ids
+        ).values_list('teaching_load_id', 'date'):
+            existing.setdefault(load_id, []).append(single_date)
+
+        lessons = {}
+        for schedule in moved_schedules:
+            lessons[schedule.teaching_load_id] = lessons.get(schedule.teaching_load_id, 0) + 1
+        for load in teaching_loads:
+            if load.id in self.loads_added:
+                required = get_lessons_count(get_semester_hours(load, self.semester))
+                lessons[load.id] = lessons.get(load.id, 0) + max(required - len(existing.get(load.id, ())), 0)
+
+        problem = build_problem(dates, time_slots, classrooms, [
+            (load, get_semester_hours(load, self.semester), lessons.get(load.id, 0),
+             get_suitable_classrooms(load, reference))
+            for load in teaching_loads
+        ])
+        problem.block_occupancy(OccupancyIndex.from_database(
+            time_slots, self.start_date, self.end_date, exclude_ids=moved_ids
+        ))
+        for teacher_id, unavailable in self.teacher_unavailable.items():
+            for single_date in unavailable:
+                problem.block_teacher_day(teacher_id, single_date)
+        for classroom_id, closed in self.classroom_closed.items():
+            for single_date in closed:
+                problem.block_classroom_day(classroom_id, single_date)
+
+        load_index = {spec.load_id: index for index, spec in enumerate(problem.loads)}
+        existing_days = {}
+        for load_id, load_dates in existing.items():
+            mask = 0
+            for single_date in load_dates:
+                day = problem.day_index(single_date)
+                if day is not None:
+                    mask |= problem.day_masks[day]
+            existing_days[load_index[load_id]] = mask
+
+        solver = RepairSolver(
+            moves=[
+                (
+                    load_index[schedule.teaching_load_id],
+                    problem.position(schedule.date, schedule.time_slot_id),
+                    problem.day_index(schedule.date) or 0,
+                )
+                for schedule in moved_schedules
+            ],
+            existing_days=existing_days,
+        )
+        result = solver.solve(problem)
+
+        # Переносимые занятия обновляются на месте, новые создаются
+        slots_by_id = {slot.id: slot for slot in time_slots}
+        placements = {}
+        for index, position, room in result.assignments:
+            placements.setdefault(index, []).append((position, room))
+
+        moves = {}
+        for schedule in moved_schedules:
+            load_placements = placements.get(load_index[schedule.teaching_load_id])
+            if load_placements:
+                moves[schedule.id] = load_placements.pop(0)
+        additions = [
+            (index, placement) for index, load_placements in placements.items() for placement in load_placements
+        ]
+
+        loads_by_id = {load.id: load for load in teaching_loads}
+        if not self.drop_unplaced:
+            additions = self._keep_unplaced(moved_schedules, moves, additions, problem, classrooms, loads_by_id)
+
+        updated = []
+        for schedule in moved_schedules:
+            if schedule.id in moves:
+                position, room = moves[schedule.id]
+                self._assign(schedule, problem, position, classrooms[room])
+                updated.append(schedule)
+        updated_ids = {schedule.id for schedule in updated}
+        unplaced_ids = [schedule.id for schedule in moved_schedules if schedule.id not in updated_ids]
+
+        created = []
+        for index, (position, room) in additions:
+            schedule = Schedule(
+                teaching_load=loads_by_id[problem.loads[index].load_id],
+                time_slot=slots_by_id[problem.position_slot[position]],
+            )
+            self._assign(schedule, problem, position, classrooms[room])
+            created.append(schedule)
+        unplaced = sum(lessons.values()) - len(updated) - len(created)
+
+        with transaction.atomic():
+            removed_schedules = period.filter(teaching_load_id__in=self.loads_removed)
+            scopes = set(removed_schedules.values_list('group_id', 'teacher_id').distinct())
+            removed = delete_schedules(removed_schedules)
+            # Занятия, для которых не нашлось места, снимаются из расписания
+            # только по флагу dropUnplaced, иначе остаются на прежнем месте
+            dropped = delete_schedules(Schedule.objects.filter(id__in=unplaced_ids)) if self.drop_unplaced else 0
+            # Переносимые занятия могут занимать места друг друга, поэтому
+            # сначала снимаем их с дат, чтобы не нарушить уникальность слотов
+            # посреди обновления
+            Schedule.objects.filter(id__in=updated_ids).update(date=None)
+            Schedule.objects.bulk_update(updated, ['date', 'time_slot', 'classroom', 'week_type'])
+            record_changes(updated, ScheduleChange.UPDATE)
+
+            # Без COPY, чтобы получить id новых занятий для журнала изменений
+            writer = ScheduleWriter(use_copy=False)
+            for schedule in created:
+                writer.add(schedule)
+            writer.flush()
+            record_changes(created, ScheduleChange.INSERT)
+
+            scopes.update((schedule.group_id, schedule.teacher_id) for schedule in moved_schedules + created)
+            schedule_cache.touch_schedules(
+                group_ids=[group_id for group_id, _ in scopes],
+                teacher_ids=[teacher_id for _, teacher_id in scopes]
+            )
+
+        self.summary = {
+            'moved': len(updated),
+            'added': len(created),
+            'removed': removed,
+            'unplaced': unplaced,
+            'unplaced_ids': unplaced_ids,
+            'dropped': dropped,
+            # Оставленные на месте занятия по-прежнему нарушают набор изменений
+            'conflict_ids': [] if self.drop_unplaced else unplaced_ids,
+            'metrics': result.metrics,
+        }
+        return self.summary
+
+    @staticmethod
+    def _keep_unplaced(moved_schedules, moves, additions, problem, classrooms, loads_by_id):
+        """
+        Неразмещенные занятия остаются на прежних позициях, а решатель считал
+        эти позиции свободными. Размещения, которые пересекаются с оставленными
+        занятиями по аудитории, преподавателю или группе, отменяются: перенос
+        заменяется оставлением на месте, новое занятие не создается. Повторяется,
+        пока оставленные занятия не перестанут добавляться. Исходные позиции
+        переносимых занятий между собой не пересекаются, поэтому итог
+        непротиворечив.
+        """
+        def keys(single_date, time_slot_id, classroom_id, teacher_id, group_id):
+            return {
+                (single_date, time_slot_id, 'classroom', classroom_id),
+                (single_date, time_slot_id, 'teacher', teacher_id),
+                (single_date, time_slot_id, 'group', group_id),
+            }
+
+        def placement_keys(load, position, room):
+            return keys(problem.days[problem.position_day[position]], problem.position_slot[position],
+                        classrooms[room].id, load.teacher_id, load.group_id)
+
+        occupied = set()
+        kept = [schedule for schedule in moved_schedules if schedule.id not in moves]
+        while kept:
+            for schedule in kept:
+                occupied |= keys(schedule.date, schedule.time_slot_id, schedule.classroom_id,
+                                 schedule.teacher_id, schedule.group_id)
+            kept = [
+                schedule for schedule in moved_schedules
+                if schedule.id in moves
+                and placement_keys(loads_by_id[schedule.teaching_load_id], *moves[schedule.id]) & occupied
+            ]
+            for schedule in kept:
+                del moves[schedule.id]
+        return [
+            (index, placement) for index, placement in additions
+            if not placement_keys(loads_by_id[problem.loads[index].load_id], *placement) & occupied
+        ]
+
+    @staticmethod
+    def _assign(schedule, problem, position, classroom):
+        single_date = problem.days[problem.position_day[position]]
+        schedule.date = single_date
+        schedule.time_slot_id = problem.position_slot[position]
+        schedule.classroom = classroom
+        schedule.week_type = get_week_type(single_date)
@@ -1,12 +1,136 @@
 from rest_framework import serializers
 from .models import Schedule
+from data_service.models import Classroom, Teacher, TeachingLoad, TimeSlot
+from data_service.reference import get_reference_data
 from data_service.serializers import TeachingLoadSerializer, TimeSlotSerializer, ClassroomSerializer
 
+class ReferenceField(serializers.Field):
+    """
+    Вложенный справочник (пара, аудитория), взятый из снимка справочников
+    процесса вместо JOIN. Каждый объект сериализуется один раз за ответ.
+    """
+
+    def __init__(self, collection, serializer_class, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+        self.collection = collection
+        self.serializer_class = serializer_class
+        self._reference = None
+        self._serialized = {}
+
+    def get_attribute(self, instance):
+        object_id = getattr(instance, f'{self.source}_id')
+        if object_id is None:
+            return None
+        if self._reference is None:
+            self._reference = get_reference_data()
+        value = getattr(self._reference, self.collection).get(object_id)
+        # Запись могла появиться после снятия снимка
+        return value if value is not None else getattr(instance, self.source)
+
+    def to_representation(self, value):
+        if value.id not in self._serialized:
+            self._serialized[value.id] = self.serializer_class(value).data
+        return self._serialized[value.id]
+
 class ScheduleSerializer(serializers.ModelSerializer):
     teaching_load = TeachingLoadSerializer(read_only=True)
-    time_slot = TimeSlotSerializer(read_only=True)
-    classroom = ClassroomSerializer(read_only=True)
+    time_slot = ReferenceField('time_slots', TimeSlotSerializer)
+    classroom = ReferenceField('classrooms', ClassroomSerializer)
+    # Связи задаются по id, в ответе выводятся вложенными объектами
+    teaching_load_id = serializers.PrimaryKeyRelatedField(
+        source='teaching_load', queryset=TeachingLoad.objects.all(), write_only=True
+    )
+    time_slot_id = serializers.PrimaryKeyRelatedField(
+        source='time_slot', queryset=TimeSlot.objects.all(), write_only=True
+    )
+    classroom_id = serializers.PrimaryKeyRelatedField(
+        source='classroom', queryset=Classroom.objects.all(), write_only=True
+    )
     
     class Meta:
         model = Schedule
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        # fields — список полей частичного ответа (параметр ?fields=)
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+    def validate(self, attrs):
+        # Преподаватель и группа не редактируются (копии полей нагрузки),
+        # поэтому уникальность слотов проверяется здесь, а не валидаторами
+        # модели: иначе двойное бронирование дошло бы до ограничения базы
+        def value_id(name):
+            if name in attrs:
+                return attrs[name].id if attrs[name] is not None else None
+            return getattr(self.instance, f'{name}_id', None)
+
+        date = attrs['date'] if 'date' in attrs else getattr(self.instance, 'date', None)
+        time_slot_id = value_id('time_slot')
+        if date is None or time_slot_id is None:
+            return attrs
+        load = attrs.get('teaching_load') or getattr(self.instance, 'teaching_load', None)
+
+        busy = Schedule.objects.filter(date=date, time_slot_id=time_slot_id)
+        if self.instance is not None:
+            busy = busy.exclude(pk=self.instance.pk)
+        errors = []
+        for field, object_id, message in (
+            ('classroom_id', value_id('classroom'), 'Аудитория уже занята в эту пару'),
+            ('teacher_id', load.teacher_id if load else None, 'Преподаватель уже занят в эту пару'),
+            ('group_id', load.group_id if load else None, 'Группа уже занята в эту пару'),
+        ):
+            if object_id is not None:
+                schedule_id = busy.filter(**{field: object_id}).values_list('id', flat=True).first()
+                if schedule_id is not None:
+                    errors.append(f'{message} (занятие {schedule_id})')
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+class TeacherUnavailableSerializer(serializers.Serializer):
+    teacherId = serializers.IntegerField(min_value=1)
+    dates = serializers.ListField(child=serializers.DateField(), allow_empty=False)
+
+class ClassroomClosedSerializer(serializers.Serializer):
+    classroomId = serializers.IntegerField(min_value=1)
+    dates = serializers.ListField(child=serializers.DateField(), allow_empty=False)
+
+class RescheduleSerializer(serializers.Serializer):
+    """Набор изменений для инкрементального перепланирования"""
+    startDate = serializers.DateField()
+    endDate = serializers.DateField()
+    semester = serializers.ChoiceField(choices=[1, 2], default=1)
+    teacherUnavailable = TeacherUnavailableSerializer(many=True, required=False, default=list)
+    classroomClosed = ClassroomClosedSerializer(many=True, required=False, default=list)
+    loadsAdded = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    loadsRemoved = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, default=list)
+    # Удалить занятия, которым не нашлось места; по умолчанию они остаются
+    # на прежнем месте и возвращаются как конфликты
+    dropUnplaced = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        if attrs['startDate'] > attrs['endDate']:
+            raise serializers.ValidationError({'endDate': ['Дата окончания раньше даты начала']})
+
+        # Существование объектов проверяется одним запросом на модель
+        errors = {}
+        for key, id_key, model in (
+            ('teacherUnavailable', 'teacherId', Teacher),
+            ('classroomClosed', 'classroomId', Classroom),
+            ('loadsAdded', None, TeachingLoad),
+            ('loadsRemoved', None, TeachingLoad),
+        ):
+            ids = {item[id_key] if id_key else item for item in attrs[key]}
+            missing = ids - set(model.objects.filter(id__in=ids).values_list('id', flat=True))
+            if missing:
+                errors[key] = [f"Объекты не найдены: {', '.join(map(str, sorted(missing)))}"]
+        if set(attrs['loadsAdded']) & set(attrs['loadsRemoved']):
+            errors.setdefault('loadsAdded', []).append('Нагрузка не может быть одновременно добавлена и удалена')
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
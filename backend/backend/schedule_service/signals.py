@@ -0,0 +1,157 @@
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from data_service.models import Classroom, Discipline, StudentGroup, Teacher, TeachingLoad, TimeSlot
+from data_service.signals import post_bulk_save
+from . import cache as schedule_cache
+from .changes import record_changes, record_queryset_changes
+from .models import Schedule, ScheduleChange
+
+
+def _record_moved_schedules(schedule_ids, update):
+    """
+    Журналирует перенос занятий к другим преподавателю или группе: запись с
+    прежней областью сообщает ее клиентам об уходе занятия, запись с новой —
+    о его появлении
+    """
+    moved = Schedule.objects.filter(id__in=schedule_ids)
+    with transaction.atomic():
+        record_queryset_changes(moved, ScheduleChange.UPDATE)
+        update()
+        record_queryset_changes(moved, ScheduleChange.UPDATE)
+
+
+@receiver(pre_save, sender=TeachingLoad)
+def remember_load_scopes(sender, instance, **kwargs):
+    # Прежние преподаватель и группа нужны, чтобы сбросить и их расписания
+    instance._previous_scopes = None
+    if instance.pk:
+        instance._previous_scopes = TeachingLoad.objects.filter(pk=instance.pk).values_list(
+            'teacher_id', 'group_id'
+        ).first()
+
+
+@receiver(post_save, sender=TeachingLoad)
+def sync_schedule_load_fields(sender, instance, created, **kwargs):
+    # Смена преподавателя или группы нагрузки переносится на ее занятия
+    if created:
+        return
+    schedules = Schedule.objects.filter(teaching_load=instance).exclude(
+        teacher_id=instance.teacher_id,
+        group_id=instance.group_id
+    )
+    schedule_ids = list(schedules.values_list('id', flat=True))
+    if schedule_ids:
+        _record_moved_schedules(schedule_ids, lambda: schedules.update(
+            teacher_id=instance.teacher_id, group_id=instance.group_id
+        ))
+
+    teacher_ids, group_ids = [instance.teacher_id], [instance.group_id]
+    previous = getattr(instance, '_previous_scopes', None)
+    if previous:
+        teacher_ids.append(previous[0])
+        group_ids.append(previous[1])
+    schedule_cache.touch_schedules(group_ids=group_ids, teacher_ids=teacher_ids)
+
+
+@receiver(post_bulk_save, sender=TeachingLoad)
+def sync_bulk_schedule_load_fields(sender, instances, created, **kwargs):
+    # Массовое изменение нагрузок: прежние преподаватели и группы берутся из
+    # еще не обновленных занятий, затем занятия синхронизируются одним UPDATE
+    if created:
+        return
+    load_ids = [load.pk for load in instances]
+    schedules = Schedule.objects.filter(teaching_load_id__in=load_ids).exclude(
+        teacher_id=F('teaching_load__teacher_id'),
+        group_id=F('teaching_load__group_id')
+    )
+    previous = list(schedules.values_list('teacher_id', 'group_id').distinct())
+    if previous:
+        loads = TeachingLoad.objects.filter(id=OuterRef('teaching_load_id'))
+        schedule_ids = list(schedules.values_list('id', flat=True))
+        _record_moved_schedules(schedule_ids, lambda: Schedule.objects.filter(id__in=schedule_ids).update(
+            teacher_id=Subquery(loads.values('teacher_id')[:1]),
+            group_id=Subquery(loads.values('group_id')[:1]),
+        ))
+    # Нагрузка входит в ответы расписания, поэтому сбрасываем их и при
+    # изменении одних часов
+    schedule_cache.touch_schedules(
+        group_ids=[load.group_id for load in instances] + [group_id for _, group_id in previous],
+        teacher_ids=[load.teacher_id for load in instances] + [teacher_id for teacher_id, _ in previous],
+    )
+
+
+@receiver(post_delete, sender=TeachingLoad)
+def touch_load_schedules(sender, instance, **kwargs):
+    schedule_cache.touch_schedules(group_ids=[instance.group_id], teacher_ids=[instance.teacher_id])
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def touch_schedule(sender, instance, **kwargs):
+    schedule_cache.touch_schedules(group_ids=[instance.group_id], teacher_ids=[instance.teacher_id])
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_schedule_scope(sender, instance, **kwargs):
+    instance._previous_scope = None
+    if instance.pk:
+        instance._previous_scope = Schedule.objects.filter(pk=instance.pk).values_list(
+            'group_id', 'teacher_id'
+        ).first()
+
+
+@receiver(post_save, sender=Schedule)
+def record_schedule_save(sender, instance, created, **kwargs):
+    if created:
+        record_changes([instance], ScheduleChange.INSERT)
+        return
+    changes = [instance]
+    previous = getattr(instance, '_previous_scope', None)
+    # Занятие ушло из расписания прежних группы или преподавателя
+    if previous and previous != (instance.group_id, instance.teacher_id):
+        changes.insert(0, Schedule(id=instance.pk, group_id=previous[0], teacher_id=previous[1]))
+    record_changes(changes, ScheduleChange.UPDATE)
+
+
+@receiver(pre_delete, sender=Schedule)
+def collect_schedule_delete(sender, instance, origin=None, **kwargs):
+    # Массовое и каскадное удаление (нагрузки, группы и т.п.) отправляет
+    # сигналы по каждому занятию: удаленные занятия копятся на объекте, с
+    # которого началось удаление, и журналируются одним INSERT
+    if origin is not None:
+        if not hasattr(origin, '_deleted_schedules'):
+            origin._deleted_schedules = []
+        origin._deleted_schedules.append(instance)
+
+
+@receiver(post_delete, sender=Schedule)
+def record_schedule_delete(sender, instance, origin=None, **kwargs):
+    deleted = getattr(origin, '_deleted_schedules', None)
+    if deleted is None:
+        record_changes([instance], ScheduleChange.DELETE)
+    elif deleted:
+        # post_delete отправляется после удаления всех занятий
+        record_changes(deleted, ScheduleChange.DELETE)
+        deleted.clear()
+
+
+@receiver(post_bulk_save, sender=TimeSlot)
+@receiver(post_bulk_save, sender=Classroom)
+@receiver(post_bulk_save, sender=Teacher)
+@receiver(post_bulk_save, sender=StudentGroup)
+@receiver(post_bulk_save, sender=Discipline)
+@receiver(post_save, sender=TimeSlot)
+@receiver(post_delete, sender=TimeSlot)
+@receiver(post_save, sender=Classroom)
+@receiver(post_delete, sender=Classroom)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=Teacher)
+@receiver(post_save, sender=StudentGroup)
+@receiver(post_delete, sender=StudentGroup)
+@receiver(post_save, sender=Discipline)
+@receiver(post_delete, sender=Discipline)
+def touch_reference_data(sender, **kwargs):
+    # Справочники входят в ответы любых расписаний
+    schedule_cache.touch_on_commit(schedule_cache.SCOPE_ALL)
@@ -0,0 +1,18 @@
+from .base import BaseSolver, SolverResult, SolverState, SOLVERS, get_solver, register_solver
+from .model import LoadSpec, Problem, build_problem
+from .greedy import GreedySolver
+from .heuristic import HeuristicSolver
+
+__all__ = (
+    'BaseSolver',
+    'GreedySolver',
+    'HeuristicSolver',
+    'LoadSpec',
+    'Problem',
+    'SOLVERS',
+    'SolverResult',
+    'SolverState',
+    'build_problem',
+    'get_solver',
+    'register_solver',
+)
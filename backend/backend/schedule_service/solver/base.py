@@ -0,0 +1,270 @@
+import time
+from collections import defaultdict
+from .model import lowest_bit_index, slot_gaps
+
+# Веса штрафов целевой функции
+UNPLACED_PENALTY = 1000
+SAME_DAY_PENALTY = 20
+WEEK_OVERLOAD_PENALTY = 5
+GAP_PENALTY = 1
+
+SOLVERS = {}
+
+
+def register_solver(cls):
+    SOLVERS[cls.name] = cls
+    return cls
+
+
+def get_solver(name, **options):
+    try:
+        solver_class = SOLVERS[name]
+    except KeyError:
+        raise ValueError(f'Неизвестный алгоритм генерации: {name}')
+    return solver_class(**options)
+
+
+class SolverState:
+    """
+    Текущее решение: размещенные занятия и маски занятости над позициями.
+
+    Все операции размещения и снятия занятия выполняются за O(1) битовыми
+    операциями, поэтому алгоритмы могут свободно пробовать перестановки.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.teacher_busy = defaultdict(int, problem.teacher_busy)
+        self.group_busy = defaultdict(int, problem.group_busy)
+        self.room_busy = list(problem.room_busy)
+        # Размещения нагрузки: список пар (позиция, аудитория)
+        self.placements = [[] for _ in problem.loads]
+        self.load_day_counts = defaultdict(int)
+        self.load_week_counts = defaultdict(int)
+        self.group_day_slots = defaultdict(int)
+        self.week_targets = [
+            -(-load.lessons // problem.weeks_count) if problem.weeks_count else load.lessons
+            for load in problem.loads
+        ]
+        self._room_free = {}
+
+    @property
+    def placed_count(self):
+        return sum(len(placements) for placements in self.placements)
+
+    def remaining(self, load_index):
+        return self.problem.loads[load_index].lessons - len(self.placements[load_index])
+
+    def room_free_mask(self, room_class):
+        mask = self._room_free.get(room_class)
+        if mask is None:
+            mask = 0
+            for room in self.problem.room_classes[room_class]:
+                mask |= ~self.room_busy[room]
+            mask &= self.problem.all_positions
+            self._room_free[room_class] = mask
+        return mask
+
+    def feasible(self, load_index):
+        """Маска позиций, где нагрузку можно разместить без жестких конфликтов"""
+        load = self.problem.loads[load_index]
+        busy = self.teacher_busy[load.teacher_id] | self.group_busy[load.group_id]
+        return self.room_free_mask(load.room_class) & ~busy
+
+    def used_days_mask(self, load_index):
+        mask = 0
+        for position, _ in self.placements[load_index]:
+            mask |= self.problem.day_masks[self.problem.position_day[position]]
+        return mask
+
+    def is_free(self, load_index, position):
+        load = self.problem.loads[load_index]
+        bit = 1 << position
+        return not (self.teacher_busy[load.teacher_id] & bit or self.group_busy[load.group_id] & bit)
+
+    def free_room(self, load_index, position):
+        bit = 1 << position
+        for room in self.problem.loads[load_index].rooms:
+            if not self.room_busy[room] & bit:
+                return room
+        return None
+
+    def place(self, load_index, position, room):
+        problem = self.problem
+        load = problem.loads[load_index]
+        bit = 1 << position
+        day = problem.position_day[position]
+        self.teacher_busy[load.teacher_id] |= bit
+        self.group_busy[load.group_id] |= bit
+        self.room_busy[room] |= bit
+        self.placements[load_index].append((position, room))
+        self.load_day_counts[(load_index, day)] += 1
+        self.load_week_counts[(load_index, problem.day_weeks[day])] += 1
+        self.group_day_slots[(load.group_id, day)] |= 1 << problem.position_slot_index[position]
+        self._invalidate_room(room)
+
+    def remove(self, load_index, placement_index):
+        problem = self.problem
+        load = problem.loads[load_index]
+        position, room = self.placements[load_index].pop(placement_index)
+        bit = 1 << position
+        day = problem.position_day[position]
+        self.teacher_busy[load.teacher_id] &= ~bit
+        self.group_busy[load.group_id] &= ~bit
+        self.room_busy[room] &= ~bit
+        self.load_day_counts[(load_index, day)] -= 1
+        self.load_week_counts[(load_index, problem.day_weeks[day])] -= 1
+        self.group_day_slots[(load.group_id, day)] &= ~(1 << problem.position_slot_index[position])
+        self._invalidate_room(room)
+        return position, room
+
+    def _invalidate_room(self, room):
+        for room_class in self.problem.room_class_members.get(room, ()):
+            self._room_free.pop(room_class, None)
+
+    def local_penalty(self, load_index, day):
+        """Штраф, который зависит от размещения нагрузки в указанный день"""
+        problem = self.problem
+        load = problem.loads[load_index]
+        week = problem.day_weeks[day]
+        repeats = self.load_day_counts[(load_index, day)]
+        overload = self.load_week_counts[(load_index, week)] - self.week_targets[load_index]
+        return (
+            SAME_DAY_PENALTY * max(repeats - 1, 0)
+            + WEEK_OVERLOAD_PENALTY * max(overload, 0)
+            + GAP_PENALTY * slot_gaps(self.group_day_slots[(load.group_id, day)])
+        )
+
+    def metrics(self):
+        problem = self.problem
+        unplaced = sum(self.remaining(index) for index in range(len(problem.loads)))
+        same_day = sum(max(count - 1, 0) for count in self.load_day_counts.values())
+        overload = sum(
+            max(count - self.week_targets[load_index], 0)
+            for (load_index, _), count in self.load_week_counts.items()
+        )
+        gaps = sum(slot_gaps(mask) for mask in self.group_day_slots.values())
+        hours_scheduled = sum(
+            min(len(placements) * load.hours / load.lessons, load.hours) if load.lessons else 0
+            for load, placements in zip(problem.loads, self.placements)
+        )
+        return {
+            'lessons_total': problem.lessons_total,
+            'placed': self.placed_count,
+            'unplaced': unplaced,
+            'hours_planned': sum(load.hours for load in problem.loads),
+            'hours_scheduled': round(hours_scheduled),
+            'same_day_repeats': same_day,
+            'week_overload': overload,
+            'group_gaps': gaps,
+            'penalty': (
+                UNPLACED_PENALTY * unplaced
+                + SAME_DAY_PENALTY * same_day
+                + WEEK_OVERLOAD_PENALTY * overload
+                + GAP_PENALTY * gaps
+            ),
+        }
+
+
+class SolverResult:
+    """Результат решения: список (нагрузка, позиция, аудитория) и метрики качества"""
+
+    def __init__(self, problem, assignments, metrics):
+        self.problem = problem
+        self.assignments = assignments
+        self.metrics = metrics
+
+    @property
+    def unplaced(self):
+        return self.metrics['unplaced']
+
+
+class BaseSolver:
+    """
+    Интерфейс алгоритма составления расписания.
+
+    Наследники реализуют _solve(state), заполняя SolverState размещениями;
+    базовый класс отвечает за ограничение по времени, прогресс и метрики.
+    """
+
+    name = None
+
+    def __init__(self, time_limit=None, seed=None, iterations=None):
+        # iterations — бюджет шагов локального поиска, если алгоритм его использует
+        self.time_limit = time_limit
+        self.seed = seed
+        self.iterations = iterations
+        self._progress = None
+        self._deadline = None
+
+    def solve(self, problem, progress=None):
+        started = time.monotonic()
+        self._progress = progress
+        self._deadline = started + self.time_limit if self.time_limit else None
+
+        state = SolverState(problem)
+        self._solve(state)
+
+        assignments = [
+            (load_index, position, room)
+            for load_index, placements in enumerate(state.placements)
+            for position, room in placements
+        ]
+        metrics = state.metrics()
+        metrics['solver'] = self.name
+        metrics['elapsed'] = round(time.monotonic() - started, 3)
+        metrics.update(self.extra_metrics())
+        return SolverResult(problem, assignments, metrics)
+
+    def _solve(self, state):
+        raise NotImplementedError
+
+    def extra_metrics(self):
+        return {}
+
+    def time_is_up(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def report(self, state, percent):
+        if self._progress:
+            placed = state.placed_count
+            self._progress(placed, state.problem.lessons_total - placed, percent)
+
+    @staticmethod
+    def choose_position(state, candidates, ideal_day):
+        """
+        Выбирает позицию из маски candidates, ближайшую к желаемому дню,
+        а внутри дня — самый ранний слот.
+        """
+        problem = state.problem
+        days_count = len(problem.days)
+        for distance in range(days_count):
+            for day in (ideal_day + distance, ideal_day - distance) if distance else (ideal_day,):
+                if 0 <= day < days_count:
+                    mask = candidates & problem.day_masks[day]
+                    if mask:
+                        return lowest_bit_index(mask)
+        return None
+
+    @staticmethod
+    def ideal_day(state, load_index):
+        """Равномерное распределение занятий нагрузки по периоду"""
+        load = state.problem.loads[load_index]
+        placed = len(state.placements[load_index])
+        return int((placed + 0.5) * len(state.problem.days) / load.lessons)
+
+    def place_next(self, state, load_index):
+        """
+        Размещает очередное занятие нагрузки: сначала в дни, где этой
+        нагрузки еще нет, затем в любые свободные позиции.
+        """
+        feasible = state.feasible(load_index)
+        if not feasible:
+            return False
+        ideal = self.ideal_day(state, load_index)
+        for candidates in (feasible & ~state.used_days_mask(load_index), feasible):
+            position = self.choose_position(state, candidates, ideal)
+            if position is not None:
+                state.place(load_index, position, state.free_room(load_index, position))
+                return True
+        return False
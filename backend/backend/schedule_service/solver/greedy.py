@@ -0,0 +1,23 @@
+from .base import BaseSolver, register_solver
+
+
+@register_solver
+class GreedySolver(BaseSolver):
+    """
+    Жадный first-fit: нагрузки по порядку, каждое занятие — в самую раннюю
+    свободную позицию. Быстрый, но неравномерный; полезен для сравнения.
+    """
+
+    name = 'greedy'
+
+    def _solve(self, state):
+        loads_count = len(state.problem.loads)
+        for load_index in range(loads_count):
+            while state.remaining(load_index) > 0 and not self.time_is_up():
+                if not self.place_next(state, load_index):
+                    break
+            self.report(state, round((load_index + 1) * 100 / loads_count))
+
+    @staticmethod
+    def ideal_day(state, load_index):
+        return 0
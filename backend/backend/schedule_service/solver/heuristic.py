@@ -0,0 +1,148 @@
+import heapq
+import math
+import random
+from .base import BaseSolver, register_solver
+from .model import popcount
+
+
+@register_solver
+class HeuristicSolver(BaseSolver):
+    """
+    Построение начального решения в порядке DSATUR с последующим
+    улучшением методом имитации отжига.
+
+    DSATUR: на каждом шаге размещается занятие нагрузки с наименьшим числом
+    допустимых позиций на одно оставшееся занятие (самой «насыщенной»).
+    Отжиг переносит случайные занятия в другие свободные позиции, уменьшая
+    штраф за повторы в течение дня, перегрузку недель и окна у групп.
+    """
+
+    name = 'heuristic'
+
+    CONSTRUCTION_SHARE = 80
+    INITIAL_TEMPERATURE = 2.0
+    FINAL_TEMPERATURE = 0.01
+    RETRY_INTERVAL = 1000
+    DEFAULT_ITERATIONS = 100000
+
+    def __init__(self, time_limit=None, seed=None, iterations=None):
+        super().__init__(time_limit=time_limit, seed=seed, iterations=iterations)
+        if self.iterations is None:
+            self.iterations = self.DEFAULT_ITERATIONS
+        self._performed = 0
+
+    def extra_metrics(self):
+        return {'iterations': self._performed}
+
+    def _solve(self, state):
+        stuck = self._construct(state)
+        self._improve(state, stuck)
+
+    def _saturation(self, state, load_index):
+        return popcount(state.feasible(load_index)) / state.remaining(load_index)
+
+    def _construct(self, state):
+        problem = state.problem
+        total = problem.lessons_total or 1
+        stuck = []
+        heap = [
+            (self._saturation(state, index), -load.lessons, index)
+            for index, load in enumerate(problem.loads)
+            if load.lessons
+        ]
+        heapq.heapify(heap)
+        reported = 0
+
+        while heap:
+            key, order, load_index = heapq.heappop(heap)
+            # Ключи в куче устаревают по мере размещения, пересчитываем лениво
+            current = self._saturation(state, load_index)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, order, load_index))
+                continue
+
+            if not self.place_next(state, load_index):
+                stuck.append(load_index)
+                continue
+            if state.remaining(load_index) > 0:
+                heapq.heappush(heap, (self._saturation(state, load_index), order, load_index))
+
+            percent = state.placed_count * self.CONSTRUCTION_SHARE // total
+            if percent > reported:
+                reported = percent
+                self.report(state, percent)
+            if self.time_is_up():
+                break
+        return stuck
+
+    def _improve(self, state, stuck):
+        problem = state.problem
+        if not self.iterations or not problem.positions_count:
+            return
+
+        rng = random.Random(self.seed)
+        temperature = self.INITIAL_TEMPERATURE
+        cooling = (self.FINAL_TEMPERATURE / self.INITIAL_TEMPERATURE) ** (1 / self.iterations)
+        movable = [index for index, placements in enumerate(state.placements) if placements]
+        report_every = max(self.iterations // 10, 1)
+        penalty = state.metrics()['penalty']
+
+        for iteration in range(1, self.iterations + 1):
+            self._performed = iteration
+            temperature *= cooling
+
+            if iteration % self.RETRY_INTERVAL == 0:
+                if stuck:
+                    stuck = self._retry(state, stuck)
+                    movable = [index for index, placements in enumerate(state.placements) if placements]
+                    penalty = state.metrics()['penalty']
+                if self.time_is_up():
+                    break
+            if iteration % report_every == 0:
+                share = 100 - self.CONSTRUCTION_SHARE
+                self.report(state, self.CONSTRUCTION_SHARE + share * iteration // self.iterations)
+            if not movable or not penalty:
+                break
+
+            load_index = rng.choice(movable)
+            placement_index = rng.randrange(len(state.placements[load_index]))
+            old_position, old_room = state.placements[load_index][placement_index]
+            new_position = rng.randrange(problem.positions_count)
+            if new_position == old_position:
+                continue
+
+            old_day = problem.position_day[old_position]
+            new_day = problem.position_day[new_position]
+            before = self._penalty(state, load_index, old_day, new_day)
+
+            state.remove(load_index, placement_index)
+            new_room = state.free_room(load_index, new_position) if state.is_free(load_index, new_position) else None
+            if new_room is None:
+                state.place(load_index, old_position, old_room)
+                continue
+            state.place(load_index, new_position, new_room)
+
+            delta = self._penalty(state, load_index, old_day, new_day) - before
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                # Откатываем ухудшающий ход
+                state.remove(load_index, len(state.placements[load_index]) - 1)
+                state.place(load_index, old_position, old_room)
+            else:
+                penalty += delta
+
+    @staticmethod
+    def _penalty(state, load_index, old_day, new_day):
+        penalty = state.local_penalty(load_index, old_day)
+        if new_day != old_day:
+            penalty += state.local_penalty(load_index, new_day)
+        return penalty
+
+    def _retry(self, state, stuck):
+        """Перестановки могли освободить позиции для неразмещенных занятий"""
+        still_stuck = []
+        for load_index in stuck:
+            while state.remaining(load_index) > 0 and self.place_next(state, load_index):
+                pass
+            if state.remaining(load_index) > 0:
+                still_stuck.append(load_index)
+        return still_stuck
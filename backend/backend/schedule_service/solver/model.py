@@ -0,0 +1,180 @@
+from datetime import timedelta
+
+
+def popcount(mask):
+    return bin(mask).count('1')
+
+
+def lowest_bit_index(mask):
+    return (mask & -mask).bit_length() - 1
+
+
+def slot_gaps(mask):
+    """Количество «окон» между первым и последним занятым слотом дня"""
+    if not mask:
+        return 0
+    return mask.bit_length() - lowest_bit_index(mask) - popcount(mask)
+
+
+class LoadSpec:
+    """Учебная нагрузка в модели задачи: кто, для кого и сколько занятий"""
+
+    __slots__ = ('load_id', 'teacher_id', 'group_id', 'lessons', 'hours', 'rooms', 'room_class')
+
+    def __init__(self, load_id, teacher_id, group_id, lessons, hours, rooms, room_class):
+        self.load_id = load_id
+        self.teacher_id = teacher_id
+        self.group_id = group_id
+        self.lessons = lessons
+        self.hours = hours
+        self.rooms = rooms
+        self.room_class = room_class
+
+
+class Problem:
+    """
+    Компактная модель задачи составления расписания.
+
+    Позиция — пара (день, временной слот), все позиции пронумерованы подряд
+    по дням, а занятость преподавателей, групп и аудиторий хранится битовыми
+    масками над позициями. Каждая нагрузка должна получить lessons занятий,
+    вычисленных из часов семестра.
+    """
+
+    def __init__(self, days, day_slots, classroom_ids, loads):
+        # days — список дат, day_slots[i] — id слотов дня i по порядку начала
+        self.days = days
+        self.classroom_ids = classroom_ids
+        self.loads = loads
+
+        self.position_day = []
+        self.position_slot = []
+        self.position_slot_index = []
+        self.day_masks = []
+        self._positions = {}
+        for day_index, slot_ids in enumerate(day_slots):
+            mask = 0
+            for slot_index, slot_id in enumerate(slot_ids):
+                position = len(self.position_day)
+                self._positions[(day_index, slot_id)] = position
+                self.position_day.append(day_index)
+                self.position_slot.append(slot_id)
+                self.position_slot_index.append(slot_index)
+                mask |= 1 << position
+            self.day_masks.append(mask)
+
+        self.positions_count = len(self.position_day)
+        self.all_positions = (1 << self.positions_count) - 1
+        self.day_weeks = self._number_weeks(days)
+        self.weeks_count = (self.day_weeks[-1] + 1) if days else 0
+        self._day_index = {day: index for index, day in enumerate(days)}
+
+        # Занятость, известная до решения (другие группы, закрытые аудитории)
+        self.teacher_busy = {}
+        self.group_busy = {}
+        self.room_busy = [0] * len(classroom_ids)
+        self._room_index = {classroom_id: index for index, classroom_id in enumerate(classroom_ids)}
+
+        # Аудитории нагрузок группируются в классы с одинаковым набором аудиторий
+        self.room_classes = []
+        self.room_class_members = {}
+        classes = {}
+        for load in loads:
+            key = tuple(load.rooms)
+            if key not in classes:
+                classes[key] = len(self.room_classes)
+                self.room_classes.append(load.rooms)
+            load.room_class = classes[key]
+        for class_index, rooms in enumerate(self.room_classes):
+            for room in rooms:
+                self.room_class_members.setdefault(room, []).append(class_index)
+
+    @staticmethod
+    def _number_weeks(days):
+        if not days:
+            return []
+        first_monday = days[0] - timedelta(days=days[0].weekday())
+        return [(day - first_monday).days // 7 for day in days]
+
+    @property
+    def lessons_total(self):
+        return sum(load.lessons for load in self.loads)
+
+    def position(self, day, slot_id):
+        day_index = self._day_index.get(day)
+        if day_index is None:
+            return None
+        return self._positions.get((day_index, slot_id))
+
+    def day_index(self, day):
+        return self._day_index.get(day)
+
+    def block_teacher(self, teacher_id, day, slot_id):
+        position = self.position(day, slot_id)
+        if position is not None:
+            self.teacher_busy[teacher_id] = self.teacher_busy.get(teacher_id, 0) | 1 << position
+
+    def block_group(self, group_id, day, slot_id):
+        position = self.position(day, slot_id)
+        if position is not None:
+            self.group_busy[group_id] = self.group_busy.get(group_id, 0) | 1 << position
+
+    def block_teacher_day(self, teacher_id, day):
+        day_index = self._day_index.get(day)
+        if day_index is not None:
+            self.teacher_busy[teacher_id] = self.teacher_busy.get(teacher_id, 0) | self.day_masks[day_index]
+
+    def block_classroom_day(self, classroom_id, day):
+        day_index = self._day_index.get(day)
+        room = self._room_index.get(classroom_id)
+        if day_index is not None and room is not None:
+            self.room_busy[room] |= self.day_masks[day_index]
+
+    def block_classroom(self, classroom_id, day, slot_id):
+        position = self.position(day, slot_id)
+        room = self._room_index.get(classroom_id)
+        if position is not None and room is not None:
+            self.room_busy[room] |= 1 << position
+
+    def block_occupancy(self, occupancy, map_day=None):
+        """
+        Переносит в модель занятость из OccupancyIndex.
+        map_day переводит дату занятия в день модели (например, день шаблона).
+        """
+        map_day = map_day or (lambda day: day)
+        for teacher_id, day, slot_id in occupancy.teacher_bookings():
+            self.block_teacher(teacher_id, map_day(day), slot_id)
+        for group_id, day, slot_id in occupancy.group_bookings():
+            self.block_group(group_id, map_day(day), slot_id)
+        for classroom_id, day, slot_id in occupancy.classroom_bookings():
+            self.block_classroom(classroom_id, map_day(day), slot_id)
+
+
+def build_problem(days, time_slots, classrooms, loads):
+    """
+    Собирает модель задачи.
+
+    loads — список кортежей (нагрузка, часы семестра, количество занятий,
+    подходящие аудитории).
+    """
+    slots_by_weekday = {}
+    for slot in sorted(time_slots, key=lambda slot: (slot.day_of_week, slot.start_time)):
+        slots_by_weekday.setdefault(slot.day_of_week, []).append(slot.id)
+
+    day_slots = [slots_by_weekday.get(day.isoweekday(), []) for day in days]
+    classroom_ids = [classroom.id for classroom in classrooms]
+    room_index = {classroom_id: index for index, classroom_id in enumerate(classroom_ids)}
+
+    specs = []
+    for load, hours, lessons, suitable in loads:
+        specs.append(LoadSpec(
+            load_id=load.id,
+            teacher_id=load.teacher_id,
+            group_id=load.group_id,
+            lessons=lessons,
+            hours=hours,
+            rooms=[room_index[classroom.id] for classroom in suitable],
+            room_class=None,
+        ))
+
+    return Problem(days, day_slots, classroom_ids, specs)
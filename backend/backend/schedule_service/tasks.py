@@ -0,0 +1,32 @@
+from celery import shared_task
+from .changes import compact_changes
+from .generator import ScheduleGenerator
+
+
+@shared_task(bind=True)
+def generate_schedule_task(self, data):
+    """Фоновая генерация расписания с публикацией прогресса в result backend"""
+    def progress(phase, placed, unplaced, percent):
+        self.update_state(state='PROGRESS', meta={
+            'phase': phase,
+            'placed': placed,
+            'unplaced': unplaced,
+            'percent': percent,
+        })
+
+    generator = ScheduleGenerator.from_request_data(data)
+    schedules = generator.run(progress=progress)
+    return {
+        'phase': ScheduleGenerator.PHASE_DONE,
+        'placed': len(schedules),
+        'unplaced': generator.unplaced,
+        'percent': 100,
+        'message': f'Сгенерировано {len(schedules)} занятий',
+        'metrics': generator.metrics,
+    }
+
+
+@shared_task
+def compact_schedule_changes_task():
+    """Периодическое сокращение журнала изменений расписания (CELERY_BEAT_SCHEDULE)"""
+    return {'removed': compact_changes()}
@@ -1,3 +1,855 @@
-from django.test import TestCase
+import io
+import json
+from collections import Counter
+from datetime import date, timedelta
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from data_service.models import StudentGroup
+from .changes import assign_versions, compact_changes
+from .conflicts import find_conflicts, restrict_to_entity_slots
+from .factories import ScheduleFactory
+from .generator import ScheduleGenerator
+from .ics import escape_text, fold_line
+from .models import Schedule
+from .occupancy import OccupancyIndex
+from .rescheduling import ScheduleRescheduler
+from .solver import SOLVERS, build_problem, get_solver
+from .views import ScheduleViewSet
+from .writer import ScheduleWriter, _CopyStream
 
-# Create your tests here.
+TABLE = Schedule._meta.db_table
+# Понедельник
+START = date(2025, 9, 1)
+
+
+def _generate(api_client, groups, weeks=1, **data):
+    payload = {
+        'semester': 1,
+        'startDate': START.isoformat(),
+        'endDate': (START + timedelta(weeks=weeks, days=-1)).isoformat(),
+        'groupIds': [group.id for group in groups],
+        **data,
+    }
+    response = api_client.post('/api/schedules/generate/', payload, format='json')
+    assert response.status_code == 201, response.data
+    return response
+
+
+def _double_bookings(field):
+    """Повторы (field, дата, пара) среди всех занятий"""
+    keys = Counter(Schedule.objects.values_list(field, 'date', 'time_slot_id'))
+    return [key for key, count in keys.items() if count > 1]
+
+
+def test_occupancy_index_tracks_bookings(college):
+    slot, other_slot = college.time_slots[:2]
+    occupancy = OccupancyIndex(college.time_slots)
+    teacher, group, classroom = college.teachers[0], college.groups[0], college.classrooms[0]
+
+    occupancy.book(teacher.id, group.id, classroom.id, slot.id, START)
+
+    assert not occupancy.is_teacher_free(teacher.id, slot.id, START)
+    assert not occupancy.is_group_free(group.id, slot.id, START)
+    assert not occupancy.is_classroom_free(classroom.id, slot.id, START)
+    assert occupancy.is_teacher_free(teacher.id, other_slot.id, START)
+    assert occupancy.is_classroom_free(classroom.id, slot.id, START + timedelta(days=1))
+
+
+def test_generation_respects_bookings_of_other_groups(college, api_client):
+    # Иванов ведет в обеих группах: вторая генерация видит занятость первой
+    _generate(api_client, college.groups[:1])
+    _generate(api_client, college.groups[1:])
+
+    assert Schedule.objects.filter(teaching_load__group=college.groups[0]).exists()
+    assert Schedule.objects.filter(teaching_load__group=college.groups[1]).exists()
+    assert _double_bookings('teaching_load__teacher_id') == []
+    assert _double_bookings('classroom_id') == []
+
+
+def test_generation_does_not_query_per_slot(college, api_client, django_assert_max_num_queries):
+    # Занятость читается одним запросом, дальше запросы только на запись занятий
+    with django_assert_max_num_queries(50):
+        response = _generate(api_client, college.groups)
+    assert len(response.data['schedules']) > 20
+
+
+def _lessons(college, count):
+    load, classroom = college.loads[0], college.classrooms[0]
+    return [
+        Schedule(teaching_load=load, time_slot=slot, classroom=classroom, date=START + timedelta(days=slot.day_of_week - 1))
+        for slot in college.time_slots[:count]
+    ]
+
+
+def _write(schedules):
+    writer = ScheduleWriter(use_copy=False)
+    for schedule in schedules:
+        writer.add(schedule)
+    writer.flush()
+
+
+def test_writer_flushes_in_batches(college, django_assert_num_queries):
+    writer = ScheduleWriter(batch_size=2, use_copy=False)
+
+    with django_assert_num_queries(2):
+        for schedule in _lessons(college, 5):
+            writer.add(schedule)
+    assert writer.written == 4
+
+    writer.flush()
+    assert writer.written == 5
+    assert Schedule.objects.count() == 5
+
+
+def test_copy_values_are_escaped():
+    assert ScheduleWriter._format_copy_value(None) == '\\N'
+    assert ScheduleWriter._format_copy_value('a\tb\\c\n') == 'a\\tb\\\\c\\n'
+    assert ScheduleWriter._format_copy_value(START) == '2025-09-01'
+
+
+def test_copy_stream_reads_rows_lazily():
+    stream = _CopyStream(iter(['1\ta\n', '2\tb\n']))
+
+    assert stream.read(3) == '1\ta'
+    assert stream.read() == '\n2\tb\n'
+    assert stream.read(10) == ''
+
+
+def test_regeneration_replaces_the_period(college, api_client):
+    first = _generate(api_client, college.groups)
+    second = _generate(api_client, college.groups)
+
+    assert Schedule.objects.count() == len(second.data['schedules']) == len(first.data['schedules'])
+    assert _double_bookings('teaching_load__teacher_id') == []
+
+
+def test_generator_reports_progress(college):
+    generator = ScheduleGenerator(1, START, START + timedelta(days=6), [college.groups[0].id])
+    events = []
+
+    schedules = generator.run(progress=lambda *args: events.append(args))
+
+    phases = [phase for phase, placed, unplaced, percent in events]
+    assert phases[0] == ScheduleGenerator.PHASE_LOADING
+    assert phases[-2:] == [ScheduleGenerator.PHASE_SAVING, ScheduleGenerator.PHASE_DONE]
+    assert ScheduleGenerator.PHASE_SOLVING in phases
+    assert events[-1] == (ScheduleGenerator.PHASE_DONE, len(schedules), generator.unplaced, 100)
+    percents = [percent for phase, placed, unplaced, percent in events]
+    assert percents == sorted(percents)
+
+
+def test_generation_job_validates_before_enqueue(college, api_client):
+    response = api_client.post('/api/schedules/generate/jobs/', {'semester': 1}, format='json')
+
+    assert response.status_code == 400
+    assert 'error' in response.data
+
+
+def test_occupancy_index_enumerates_bookings(college):
+    slot = college.time_slots[0]
+    occupancy = OccupancyIndex(college.time_slots)
+    teacher, group, classroom = college.teachers[0], college.groups[0], college.classrooms[0]
+
+    occupancy.book(teacher.id, group.id, classroom.id, slot.id, START)
+
+    assert list(occupancy.teacher_bookings()) == [(teacher.id, START, slot.id)]
+    assert list(occupancy.group_bookings()) == [(group.id, START, slot.id)]
+    assert list(occupancy.classroom_bookings()) == [(classroom.id, START, slot.id)]
+
+
+@pytest.mark.parametrize('solver_name', sorted(SOLVERS))
+def test_solver_places_lessons_without_clashes(college, solver_name):
+    # Одна аудитория на всех; у первых двух нагрузок общая группа,
+    # у первой и третьей — общий преподаватель
+    classroom = college.classrooms[0]
+    days = [START + timedelta(days=offset) for offset in range(5)]
+    loads = [(load, 6, 3, [classroom]) for load in college.loads[:3]]
+    problem = build_problem(days, college.time_slots, [classroom], loads)
+
+    result = get_solver(solver_name, time_limit=2, seed=0, iterations=500).solve(problem)
+
+    assert result.unplaced == 0
+    assert len(result.assignments) == 9
+    positions = Counter(position for _, position, _ in result.assignments)
+    assert max(positions.values()) == 1
+
+
+@pytest.mark.parametrize('mode', ['daily', 'weekly'])
+@pytest.mark.parametrize('solver_name', sorted(SOLVERS))
+def test_generation_has_no_clashes(college, api_client, solver_name, mode):
+    response = _generate(api_client, college.groups, solver=solver_name, mode=mode)
+
+    assert Schedule.objects.count() == len(response.data['schedules']) > 0
+    for field in ('teaching_load__teacher_id', 'teaching_load__group_id', 'classroom_id'):
+        assert _double_bookings(field) == []
+
+
+def test_generation_rejects_unknown_solver(college, api_client):
+    response = api_client.post('/api/schedules/generate/', {
+        'startDate': START.isoformat(), 'endDate': START.isoformat(),
+        'groupIds': [college.groups[0].id], 'solver': 'unknown',
+    }, format='json')
+
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('mode', ['daily', 'weekly'])
+def test_generation_skips_holidays(college, api_client, settings, mode):
+    settings.SCHEDULE_HOLIDAYS = [START + timedelta(days=1)]
+    excluded = START + timedelta(days=2)
+
+    _generate(api_client, college.groups, mode=mode, excludedDates=[excluded.isoformat()])
+
+    dates = set(Schedule.objects.values_list('date', flat=True))
+    assert dates
+    assert not dates & {START + timedelta(days=1), excluded}
+
+
+
+def _reschedule(api_client, **changes):
+    return api_client.post('/api/schedules/reschedule/', {
+        'startDate': START.isoformat(),
+        'endDate': (START + timedelta(days=6)).isoformat(),
+        **changes,
+    }, format='json')
+
+
+def test_reschedule_moves_only_lessons_of_unavailable_teacher(college, api_client):
+    # Три пары первой нагрузки в понедельник и одна пара другой группы во вторник
+    _write(_lessons(college, 3))
+    other = Schedule.objects.create(
+        teaching_load=college.loads[3], time_slot=college.time_slots[3], classroom=college.classrooms[0],
+        date=START + timedelta(days=1),
+    )
+    teacher = college.loads[0].teacher
+
+    response = _reschedule(api_client, teacherUnavailable=[{'teacherId': teacher.id, 'dates': [START.isoformat()]}])
+
+    assert response.status_code == 200, response.data
+    assert response.data['moved'] == 3
+    assert response.data['unplaced_ids'] == []
+    assert Schedule.objects.count() == 4
+    assert not Schedule.objects.filter(teaching_load__teacher=teacher, date=START).exists()
+    other_after = Schedule.objects.get(id=other.id)
+    assert (other_after.date, other_after.time_slot_id) == (other.date, other.time_slot_id)
+    for field in ('teaching_load__teacher_id', 'teaching_load__group_id', 'classroom_id'):
+        assert _double_bookings(field) == []
+
+
+def test_reschedule_adds_and_removes_loads(college, api_client):
+    _write(_lessons(college, 3))
+    added = college.loads[3]
+
+    response = _reschedule(api_client, loadsAdded=[added.id], loadsRemoved=[college.loads[0].id])
+
+    assert response.status_code == 200, response.data
+    assert response.data['removed'] == 3
+    assert response.data['added'] == Schedule.objects.filter(teaching_load=added).count() > 0
+    assert not Schedule.objects.filter(teaching_load=college.loads[0]).exists()
+
+
+def test_reschedule_rejects_missing_period(college, api_client):
+    response = api_client.post('/api/schedules/reschedule/', {'loadsAdded': [college.loads[0].id]}, format='json')
+
+    assert response.status_code == 400
+
+
+
+
+
+def test_reschedule_skips_holidays(college, api_client, settings):
+    _write(_lessons(college, 3))
+    holiday = START + timedelta(days=1)
+    settings.SCHEDULE_HOLIDAYS = [holiday]
+
+    response = _reschedule(
+        api_client, teacherUnavailable=[{'teacherId': college.loads[0].teacher_id, 'dates': [START.isoformat()]}],
+    )
+
+    assert response.status_code == 200, response.data
+    assert response.data['moved'] == 3
+    assert not Schedule.objects.filter(date__in=[START, holiday]).exists()
+
+
+def test_reschedule_reports_concurrent_write_as_conflict(college, api_client, monkeypatch):
+    def run(self):
+        raise IntegrityError('unique_teacher_date_slot')
+    monkeypatch.setattr(ScheduleRescheduler, 'run', run)
+
+    response = _reschedule(api_client, loadsAdded=[college.loads[3].id])
+
+    assert response.status_code == 409
+    assert 'error' in response.data
+
+@pytest.mark.parametrize('drop', [False, True])
+def test_reschedule_keeps_lessons_without_free_position(college, api_client, drop):
+    # Преподаватель недоступен всю неделю: переносить занятия некуда
+    _write(_lessons(college, 2))
+    lessons = list(Schedule.objects.values_list('id', 'date', 'time_slot_id', 'classroom_id'))
+    week = [(START + timedelta(days=day)).isoformat() for day in range(7)]
+
+    response = _reschedule(
+        api_client, dropUnplaced=drop,
+        teacherUnavailable=[{'teacherId': college.loads[0].teacher_id, 'dates': week}],
+    )
+
+    assert response.status_code == 200, response.data
+    ids = [lesson[0] for lesson in lessons]
+    assert (response.data['moved'], response.data['unplaced'], response.data['unplaced_ids']) == (0, 2, ids)
+    if drop:
+        assert (response.data['dropped'], response.data['conflict_ids']) == (2, [])
+        assert not Schedule.objects.exists()
+    else:
+        assert (response.data['dropped'], response.data['conflict_ids']) == (0, ids)
+        assert 'оставлено на месте без переноса 2' in response.data['message']
+        assert list(Schedule.objects.values_list('id', 'date', 'time_slot_id', 'classroom_id')) == lessons
+
+@pytest.mark.parametrize('changes, field', [
+    ({'endDate': '2025-08-31'}, 'endDate'),
+    ({'semester': 3}, 'semester'),
+    ({'loadsAdded': ['ИС-11']}, 'loadsAdded'),
+    ({'loadsAdded': [100000]}, 'loadsAdded'),
+    ({'teacherUnavailable': [{'teacherId': 1, 'dates': []}]}, 'teacherUnavailable'),
+])
+def test_reschedule_validates_change_set(college, api_client, changes, field):
+    response = _reschedule(api_client, **changes)
+
+    assert response.status_code == 400
+    assert field in response.data
+
+
+def test_reschedule_rejects_load_added_and_removed(college, api_client):
+    load_id = college.loads[0].id
+
+    response = _reschedule(api_client, loadsAdded=[load_id], loadsRemoved=[load_id])
+
+    assert response.status_code == 400
+    assert list(response.data) == ['loadsAdded']
+
+@pytest.fixture
+def clashes(college):
+    """
+    Конфликт по аудитории на первой паре и по преподавателю на третьей.
+    Пересечения с датой запрещены ограничениями, поэтому занятия без даты
+    """
+    loads, slots, rooms = college.loads, college.time_slots, college.classrooms
+    rows = [
+        (loads[0], slots[0], rooms[0]), (loads[3], slots[0], rooms[0]),
+        (loads[1], slots[1], rooms[1]), (loads[2], slots[1], rooms[2]),
+        (loads[0], slots[2], rooms[1]), (loads[2], slots[2], rooms[2]),
+    ]
+    return [
+        Schedule.objects.create(teaching_load=load, time_slot=slot, classroom=room)
+        for load, slot, room in rows
+    ]
+
+
+def test_find_conflicts_groups_clashing_lessons(clashes):
+    conflicts = list(find_conflicts())
+
+    assert [(conflict.ids, conflict.types) for conflict in conflicts] == [
+        ([clashes[0].id, clashes[1].id], ['classroom']),
+        ([clashes[4].id, clashes[5].id], ['teacher']),
+    ]
+
+
+def test_conflicts_endpoint_filters_and_paginates(clashes, api_client, college):
+    response = api_client.get('/api/schedules/conflicts/', {'limit': 1})
+
+    assert response.status_code == 200
+    assert response.data['count'] == 2
+    assert len(response.data['conflicts']) == 1
+    conflict = response.data['conflicts'][0]
+    assert conflict['count'] == 2
+    assert [schedule['id'] for schedule in conflict['schedules']] == conflict['ids']
+
+    by_teacher = api_client.get('/api/schedules/conflicts/', {'teacher_id': college.teachers[2].id})
+    assert [item['ids'] for item in by_teacher.data['conflicts']] == [[clashes[0].id, clashes[1].id]]
+
+    by_type = api_client.get('/api/schedules/conflicts/', {'type': 'teacher', 'offset': 0})
+    assert [item['conflict_types'] for item in by_type.data['conflicts']] == [['teacher']]
+
+
+
+def test_conflict_scan_is_restricted_to_entity_slots(clashes, college):
+    dated = Schedule.objects.create(
+        teaching_load=college.loads[3], time_slot=college.time_slots[0], classroom=college.classrooms[1], date=START,
+    )
+    other = Schedule.objects.create(
+        teaching_load=college.loads[0], time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+    )
+
+    rows = restrict_to_entity_slots(Schedule.objects.all(), teacher_id=college.teachers[2].id)
+
+    # Слот без даты с занятием Сидорова и тот же слот с датой, остальные пары не читаются
+    assert sorted(rows.values_list('id', flat=True)) == sorted([clashes[0].id, clashes[1].id, dated.id, other.id])
+    rows = restrict_to_entity_slots(
+        Schedule.objects.all(), teacher_id=college.teachers[2].id, classroom_id=college.classrooms[2].id
+    )
+    assert not rows.exists()
+
+
+def test_conflicts_endpoint_counts_past_the_page(clashes, api_client, college):
+    response = api_client.get('/api/schedules/conflicts/', {'limit': 1, 'offset': 1})
+
+    assert response.data['count'] == 2
+    assert [item['ids'] for item in response.data['conflicts']] == [[clashes[4].id, clashes[5].id]]
+    assert api_client.get('/api/schedules/conflicts/', {'group_id': 'ИС-11'}).status_code == 400
+
+def test_conflicts_endpoint_rejects_bad_paging(college, api_client):
+    response = api_client.get('/api/schedules/conflicts/', {'limit': 'many'})
+
+    assert response.status_code == 400
+
+
+def test_schedule_copies_teacher_and_group_of_load(college):
+    saved = Schedule.objects.create(
+        teaching_load=college.loads[0], time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+    )
+    writer = ScheduleWriter(use_copy=False)
+    writer.add(Schedule(
+        teaching_load=college.loads[3], time_slot=college.time_slots[0], classroom=college.classrooms[1], date=START,
+    ))
+    writer.flush()
+
+    rows = set(Schedule.objects.values_list('teaching_load_id', 'teacher_id', 'group_id'))
+    assert rows == {
+        (load.id, load.teacher_id, load.group_id) for load in (college.loads[0], college.loads[3])
+    }
+
+    load = college.loads[0]
+    load.teacher = college.teachers[1]
+    load.save()
+    saved.refresh_from_db()
+    assert saved.teacher_id == college.teachers[1].id
+
+
+
+def test_schedule_api_rejects_double_booking(college, api_client):
+    payload = {
+        'teaching_load_id': college.loads[0].id, 'time_slot_id': college.time_slots[0].id,
+        'classroom_id': college.classrooms[0].id, 'date': START.isoformat(),
+    }
+    created = api_client.post('/api/schedules/', payload, format='json')
+    assert created.status_code == 201, created.data
+    assert created.data['classroom']['number'] == '101'
+
+    # Та же аудитория и тот же преподаватель (Иванов ведет и в ИС-12)
+    response = api_client.post('/api/schedules/', {**payload, 'teaching_load_id': college.loads[2].id}, format='json')
+
+    assert response.status_code == 400
+    assert response.data['non_field_errors'] == [
+        f"Аудитория уже занята в эту пару (занятие {created.data['id']})",
+        f"Преподаватель уже занят в эту пару (занятие {created.data['id']})",
+    ]
+    # Изменение самого занятия с собой не конфликтует
+    url = f"/api/schedules/{created.data['id']}/"
+    assert api_client.patch(url, {'classroom_id': college.classrooms[1].id}, format='json').status_code == 200
+
+def test_generation_spans_several_weeks(college, api_client):
+    _generate(api_client, college.groups[:1], weeks=4, mode='weekly')
+
+    def lessons(**period):
+        return {
+            (load_id, date.isoweekday(), slot_id, week_type)
+            for load_id, date, slot_id, week_type in Schedule.objects.filter(**period).values_list(
+                'teaching_load_id', 'date', 'time_slot_id', 'week_type'
+            )
+        }
+
+    # Вторые две недели повторяют шаблон первых двух
+    repeated = lessons(date__gte=START + timedelta(weeks=2))
+    assert repeated and repeated <= lessons(date__lt=START + timedelta(weeks=2))
+
+
+def _viewset_queryset(params):
+    view = ScheduleViewSet(request=Request(APIRequestFactory().get('/', params)), kwargs={})
+    return view.get_queryset()
+
+
+def _period(**params):
+    return dict(params, start_date=START.isoformat(), end_date=(START + timedelta(days=30)).isoformat())
+
+
+# Запрос -> индекс (имя и первый столбец), которым должна читаться таблица schedule
+INDEXED_QUERIES = {
+    'teacher_schedule': (lambda: _viewset_queryset(_period(teacher_id=1)), 'unique_teacher_booking', 'teacher_id'),
+    'group_schedule': (lambda: _viewset_queryset(_period(group_id=1)), 'unique_group_booking', 'group_id'),
+    'period_schedule': (lambda: _viewset_queryset(_period()), 'schedule_date_slot_idx', 'date'),
+    'classroom_booking': (
+        lambda: Schedule.objects.filter(classroom_id=1, date=START, time_slot_id=1),
+        'unique_classroom_booking', 'classroom_id',
+    ),
+    'teacher_booking': (
+        lambda: Schedule.objects.filter(teacher_id=1, date=START, time_slot_id=1),
+        'unique_teacher_booking', 'teacher_id',
+    ),
+    'conflict_scan': (
+        lambda: Schedule.objects.filter(
+            date__gte=START, date__lte=START + timedelta(days=30)
+        ).order_by('date', 'time_slot_id', 'id'),
+        'schedule_date_slot_idx', 'date',
+    ),
+}
+
+
+def _uses_index(plan, index_name, first_column):
+    if connection.vendor == 'postgresql':
+        return f'{index_name} on {TABLE}' in plan
+    # SQLite называет индексы ограничений sqlite_autoindex_*, поэтому индекс
+    # узнается по первому столбцу условия поиска
+    return any(
+        line.split('SEARCH ', 1)[1].startswith(f'{TABLE} USING')
+        and ' INDEX ' in line and f'({first_column}' in line
+        for line in plan.splitlines() if 'SEARCH ' in line
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('name', INDEXED_QUERIES)
+def test_schedule_queries_use_indexes(name):
+    """
+    Регрессия планов: основные запросы расписания читают schedule через
+    свои индексы. На PostgreSQL seq scan отключен, поэтому полное
+    сканирование выбирается, только если подходящего индекса нет, и проверка
+    не зависит от объема данных.
+    """
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        pytest.skip(f'Проверка планов не поддерживается для {connection.vendor}')
+    build_queryset, index_name, first_column = INDEXED_QUERIES[name]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    plan = build_queryset().explain()
+    assert _uses_index(plan, index_name, first_column), plan
+
+
+def test_keyset_pagination_walks_all_schedules(college, api_client):
+    _generate(api_client, college.groups)
+    expected = list(Schedule.objects.order_by('date', 'time_slot__start_time', 'id').values_list('id', flat=True))
+
+    seen, url, params = [], '/api/schedules/', {'page_size': 5}
+    while url:
+        response = api_client.get(url, params)
+        assert response.status_code == 200
+        assert len(response.json()['results']) <= 5
+        seen.extend(item['id'] for item in response.json()['results'])
+        url, params = response.json()['next'], None
+
+    assert seen == expected
+
+
+def test_schedule_list_returns_plain_array_by_default(college, api_client):
+    _write(_lessons(college, 3))
+
+    response = api_client.get('/api/schedules/')
+
+    assert isinstance(response.json(), list)
+    assert len(response.json()) == 3
+
+
+def test_timetable_view_references_related_objects(college, api_client):
+    _write(_lessons(college, 2))
+
+    response = api_client.get('/api/schedules/', {'view': 'timetable', 'fields': 'id,date,teacher,time_slot'})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [set(row) for row in data['results']] == [{'id', 'date', 'teacher', 'time_slot'}] * 2
+    teacher = college.loads[0].teacher
+    assert data['teachers'] == {str(teacher.id): teacher.short_name}
+    assert set(data['time_slots']) == {str(slot.id) for slot in college.time_slots[:2]}
+    assert data['groups'] == {}
+
+
+def test_schedule_list_returns_requested_fields(college, api_client):
+    _write(_lessons(college, 2))
+
+    response = api_client.get('/api/schedules/', {'fields': 'id,date,classroom'})
+
+    assert [set(item) for item in response.json()] == [{'id', 'date', 'classroom'}] * 2
+
+
+def test_schedule_list_revalidates_by_etag(college, api_client, django_capture_on_commit_callbacks):
+    group = college.groups[0]
+    url = f'/api/schedules/?group_id={group.id}'
+
+    first = api_client.get(url)
+    assert first.status_code == 200
+    etag = first['ETag']
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    # Изменения другой группы ответ не сбрасывают
+    with django_capture_on_commit_callbacks(execute=True):
+        Schedule.objects.create(
+            teaching_load=college.loads[3], time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+        )
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Schedule.objects.create(
+            teaching_load=college.loads[0], time_slot=college.time_slots[0], classroom=college.classrooms[1], date=START,
+        )
+    changed = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert changed.status_code == 200
+    assert changed['ETag'] != etag
+    assert len(changed.json()) == 1
+
+
+def test_reference_data_change_resets_cached_listings(college, api_client, django_capture_on_commit_callbacks):
+    etag = api_client.get('/api/schedules/')['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        classroom = college.classrooms[0]
+        classroom.capacity = 40
+        classroom.save()
+
+    assert api_client.get('/api/schedules/', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+
+def test_generation_resets_cached_listings(college, api_client, django_capture_on_commit_callbacks):
+    url = f'/api/schedules/?group_id={college.groups[0].id}'
+    assert api_client.get(url).json() == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        _generate(api_client, college.groups[:1])
+
+    assert len(api_client.get(url).json()) == Schedule.objects.count() > 0
+
+
+def test_free_rooms_exclude_booked_classroom(college, api_client):
+    _write(_lessons(college, 1))
+    busy, *free = [classroom.id for classroom in college.classrooms]
+
+    response = api_client.get('/api/schedules/free-rooms/', {
+        'start_date': START.isoformat(), 'end_date': START.isoformat(), 'min_capacity': 10,
+    })
+
+    assert response.status_code == 200
+    rooms = {item['time_slot']: item['classrooms'] for item in response.data['results']}
+    assert rooms[college.time_slots[0].id] == free
+    assert rooms[college.time_slots[1].id] == [busy] + free
+    assert response.data['always_free'] == free
+
+
+def test_free_slots_are_common_to_all_entities(college, api_client, settings):
+    _write(_lessons(college, 1))
+    settings.SCHEDULE_HOLIDAYS = [START + timedelta(days=1)]
+
+    response = api_client.get('/api/schedules/free-slots/', {
+        'start_date': START.isoformat(), 'end_date': (START + timedelta(days=1)).isoformat(),
+        'teacher_id': college.teachers[0].id, 'group_id': college.groups[1].id,
+    })
+
+    assert response.status_code == 200
+    assert response.data['results'] == [
+        {'date': START, 'time_slots': [slot.id for slot in college.time_slots[1:3]]},
+    ]
+
+
+@pytest.mark.parametrize('params', [
+    {'start_date': '2025-09-01'},
+    {'start_date': '2025-09-02', 'end_date': '2025-09-01'},
+    {'start_date': '2025-09-01', 'end_date': '2026-12-31'},
+    {'start_date': '2025-09-01', 'end_date': '2025-09-01', 'min_capacity': 'много'},
+])
+def test_free_rooms_rejects_bad_params(db, api_client, params):
+    assert api_client.get('/api/schedules/free-rooms/', params).status_code == 400
+
+
+def _feed(response):
+    return b''.join(response.streaming_content if response.streaming else [response.content]).decode()
+
+
+def test_group_calendar_feed_lists_lessons(college, api_client, settings):
+    settings.SCHEDULE_ICS_PAST_DAYS = 100000
+    _write(_lessons(college, 2))
+    group, load, slot = college.groups[0], college.loads[0], college.time_slots[0]
+
+    response = api_client.get(f'/api/schedules/group/{group.id}/calendar.ics')
+
+    assert response.status_code == 200
+    assert response.streaming
+    feed = _feed(response)
+    assert feed.startswith('BEGIN:VCALENDAR\r\n') and feed.endswith('END:VCALENDAR\r\n')
+    assert feed.count('BEGIN:VEVENT') == 2
+    # UID строится из даты, пары и нагрузки; 08:00 по Москве — 05:00 UTC
+    assert f'UID:20250901-{slot.id}-{load.id}@' in feed
+    assert 'DTSTART:20250901T050000Z' in feed
+    assert 'SUMMARY:Базы данных' in feed
+    assert api_client.get(f'/api/schedules/teacher/{college.teachers[1].id}/calendar.ics').status_code == 200
+    assert api_client.get('/api/schedules/classroom/0/calendar.ics').status_code == 404
+
+
+def test_calendar_feed_is_cached_until_schedule_changes(
+    college, api_client, settings, django_capture_on_commit_callbacks
+):
+    settings.SCHEDULE_ICS_PAST_DAYS = 100000
+    url = f'/api/schedules/teacher/{college.teachers[0].id}/calendar.ics'
+
+    first = api_client.get(url)
+    empty = _feed(first)
+    cached = api_client.get(url)
+    assert not cached.streaming
+    assert _feed(cached) == empty
+    assert api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code == 304
+    assert api_client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code == 304
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Schedule.objects.create(
+            teaching_load=college.loads[0], time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+        )
+    changed = api_client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+    assert changed.status_code == 200
+    assert _feed(changed).count('BEGIN:VEVENT') == 1
+
+
+def test_calendar_lines_are_escaped_and_folded():
+    assert escape_text('Сети; ЛВС, WAN\nпрактика') == 'Сети\\; ЛВС\\, WAN\\nпрактика'
+
+    folded = fold_line('SUMMARY:' + 'Ж' * 60)
+
+    lines = folded.split('\r\n')
+    assert all(len(line.encode()) <= 75 for line in lines)
+    assert ''.join(line[1:] if index else line for index, line in enumerate(lines)) == 'SUMMARY:' + 'Ж' * 60
+
+
+CHANGES_URL = '/api/schedules/changes/'
+
+
+def _changes(api_client, since, **params):
+    response = api_client.get(CHANGES_URL, {'since': since, **params})
+    assert response.status_code == 200, response.data
+    return response.data
+
+
+def test_changes_follow_lesson_lifecycle(college, api_client, django_capture_on_commit_callbacks):
+    version = api_client.get(CHANGES_URL).data['version']
+    with django_capture_on_commit_callbacks(execute=True):
+        kept, moved, removed = (
+            Schedule.objects.create(teaching_load=college.loads[0], time_slot=slot, classroom=college.classrooms[0], date=START)
+            for slot in college.time_slots[:3]
+        )
+    created = _changes(api_client, version, group_id=college.groups[0].id)
+    assert [item['id'] for item in created['inserted']] == [kept.id, moved.id, removed.id]
+
+    moved.classroom = college.classrooms[1]
+    removed_id = removed.id
+    with django_capture_on_commit_callbacks(execute=True):
+        moved.save()
+        removed.delete()
+    changes = _changes(api_client, created['version'], fields='classroom')
+
+    assert changes['inserted'] == []
+    assert [(item['id'], item['classroom']['number']) for item in changes['updated']] == [(moved.id, '102')]
+    assert sorted(changes['updated'][0]) == ['classroom', 'id']
+    assert changes['deleted'] == [removed_id]
+    assert _changes(api_client, changes['version']) == {
+        'version': changes['version'], 'has_more': False, 'inserted': [], 'updated': [], 'deleted': [],
+    }
+
+
+def test_changes_report_lessons_leaving_the_scope(college, api_client, django_capture_on_commit_callbacks):
+    load = college.loads[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        lesson = Schedule.objects.create(
+            teaching_load=load, time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+        )
+    version = api_client.get(CHANGES_URL).data['version']
+
+    load.teacher = college.teachers[1]
+    with django_capture_on_commit_callbacks(execute=True):
+        load.save()
+
+    assert _changes(api_client, version, teacher_id=college.teachers[0].id)['deleted'] == [lesson.id]
+    assert [item['id'] for item in _changes(api_client, version, teacher_id=college.teachers[1].id)['updated']] == [lesson.id]
+
+
+def test_generation_is_recorded_in_changes(college, api_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        response = _generate(api_client, college.groups[:1])
+
+    changes = _changes(api_client, 0, group_id=college.groups[0].id)
+
+    assert len(changes['inserted']) == len(response.data['schedules'])
+
+
+def test_changes_get_versions_after_commit(college, api_client, django_capture_on_commit_callbacks):
+    version = api_client.get(CHANGES_URL).data['version']
+    with django_capture_on_commit_callbacks() as callbacks:
+        lesson = Schedule.objects.create(
+            teaching_load=college.loads[0], time_slot=college.time_slots[0], classroom=college.classrooms[0], date=START,
+        )
+        # До фиксации запись журнала клиентам не видна
+        assert _changes(api_client, version)['inserted'] == []
+    for callback in callbacks:
+        callback()
+
+    assert [item['id'] for item in _changes(api_client, version)['inserted']] == [lesson.id]
+    # Повторная нумерация ничего не меняет
+    assert assign_versions() == 0
+
+
+def test_cascade_delete_is_recorded_in_one_insert(college, api_client, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        lessons = [
+            Schedule.objects.create(teaching_load=college.loads[0], time_slot=slot, classroom=college.classrooms[0], date=START)
+            for slot in college.time_slots[:3]
+        ]
+    version = _changes(api_client, 0)['version']
+    inserts = []
+
+    def count_inserts(execute, sql, params, many, context):
+        if sql.startswith('INSERT INTO "schedule_changes"'):
+            inserts.append(sql)
+        return execute(sql, params, many, context)
+
+    with django_capture_on_commit_callbacks(execute=True), connection.execute_wrapper(count_inserts):
+        college.loads[0].delete()
+
+    assert len(inserts) == 1
+    assert sorted(_changes(api_client, version)['deleted']) == sorted(lesson.id for lesson in lessons)
+
+
+def test_changes_before_compacted_log_are_gone(college, api_client):
+    for slot in college.time_slots[:2]:
+        Schedule.objects.create(teaching_load=college.loads[0], time_slot=slot, classroom=college.classrooms[0], date=START)
+    assert compact_changes(max_age=timedelta(0)) == 1
+
+    assert api_client.get(CHANGES_URL, {'since': 0}).status_code == 410
+    assert api_client.get(CHANGES_URL, {'since': 'вчера'}).status_code == 400
+
+
+
+@pytest.mark.django_db
+def test_schedule_factory_builds_consistent_lesson():
+    lesson = ScheduleFactory()
+
+    assert lesson.date.isoweekday() == lesson.time_slot.day_of_week
+    assert (lesson.teacher_id, lesson.group_id) == (lesson.teaching_load.teacher_id, lesson.teaching_load.group_id)
+
+
+def test_benchmark_on_current_database_needs_confirmation(college, monkeypatch, tmp_path):
+    monkeypatch.setattr('builtins.input', lambda prompt: 'no')
+
+    with pytest.raises(CommandError):
+        call_command('benchmark_schedule', current_database=True, output=str(tmp_path / 'results.json'))
+
+    assert StudentGroup.objects.count() == len(college.groups)
+
+
+def test_benchmark_writes_results(college, tmp_path):
+    output = tmp_path / 'results.json'
+
+    call_command(
+        'benchmark_schedule', current_database=True, interactive=False, sizes=['small'],
+        cases=['list', 'conflicts'], weeks=1, output=str(output), stdout=io.StringIO(),
+    )
+
+    results = json.loads(output.read_text())
+    cases = results['sizes']['small']['cases']
+    assert sorted(cases) == ['conflicts', 'list']
+    assert all(case['status'] == 200 for case in cases.values())
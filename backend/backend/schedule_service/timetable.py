@@ -0,0 +1,54 @@
+from data_service.models import Discipline, StudentGroup, Teacher
+from data_service.reference import get_reference_data
+
+# Поле компактного представления -> столбец .values()
+TIMETABLE_COLUMNS = {
+    'id': 'id',
+    'date': 'date',
+    'week_type': 'week_type',
+    'teaching_load': 'teaching_load_id',
+    'time_slot': 'time_slot_id',
+    'classroom': 'classroom_id',
+    'teacher': 'teacher_id',
+    'group': 'group_id',
+    'discipline': 'teaching_load__discipline_id',
+}
+
+
+def timetable_values(queryset):
+    """Проекция занятий в плоские словари без загрузки связанных моделей"""
+    # Начало пары нужно для курсора пагинации
+    return queryset.values(*TIMETABLE_COLUMNS.values(), 'time_slot__start_time')
+
+
+def build_timetable(rows, fields=None):
+    """
+    Компактное расписание: занятия со ссылками-идентификаторами и словари
+    упомянутых преподавателей, групп, дисциплин, аудиторий и пар.
+    """
+    fields = [field for field in TIMETABLE_COLUMNS if not fields or field in fields]
+    results = [{field: row[TIMETABLE_COLUMNS[field]] for field in fields} for row in rows]
+
+    def referenced(field):
+        if field not in fields:
+            return set()
+        return {row[TIMETABLE_COLUMNS[field]] for row in rows} - {None}
+
+    teachers = Teacher.objects.filter(id__in=referenced('teacher')).only(
+        'last_name', 'first_name', 'middle_name'
+    )
+    # Пары и аудитории берутся из снимка справочников без запросов
+    reference = get_reference_data()
+    time_slots = [reference.time_slots[pk] for pk in referenced('time_slot') if pk in reference.time_slots]
+    classrooms = [reference.classrooms[pk] for pk in referenced('classroom') if pk in reference.classrooms]
+    return {
+        'results': results,
+        'teachers': {teacher.id: teacher.short_name for teacher in teachers},
+        'groups': dict(StudentGroup.objects.filter(id__in=referenced('group')).values_list('id', 'name')),
+        'disciplines': dict(Discipline.objects.filter(id__in=referenced('discipline')).values_list('id', 'name')),
+        'classrooms': {classroom.id: classroom.number for classroom in classrooms},
+        'time_slots': {
+            slot.id: {'day_of_week': slot.day_of_week, 'start_time': slot.start_time, 'end_time': slot.end_time}
+            for slot in time_slots
+        },
+    }
@@ -3,7 +3,14 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     ScheduleViewSet,
     GenerateScheduleAPIView,
+    GenerateScheduleJobAPIView,
+    GenerateScheduleJobStatusAPIView,
+    RescheduleAPIView,
     ScheduleConflictsAPIView,
+    FreeRoomsAPIView,
+    FreeSlotsAPIView,
+    ScheduleCalendarAPIView,
+    ScheduleChangesAPIView,
 )
 
 router = DefaultRouter()
@@ -11,7 +18,17 @@ router.register(r'', ScheduleViewSet, basename='schedule')
 
 urlpatterns = [
     path('generate/', GenerateScheduleAPIView.as_view(), name='generate_schedule'),
+    path('generate/jobs/', GenerateScheduleJobAPIView.as_view(), name='generate_schedule_job'),
+    path('generate/jobs/<str:job_id>/', GenerateScheduleJobStatusAPIView.as_view(), name='generate_schedule_job_status'),
+    path('reschedule/', RescheduleAPIView.as_view(), name='reschedule'),
     path('conflicts/', ScheduleConflictsAPIView.as_view(), name='schedule_conflicts'),
+    path('free-rooms/', FreeRoomsAPIView.as_view(), name='free_rooms'),
+    path('free-slots/', FreeSlotsAPIView.as_view(), name='free_slots'),
+    path('changes/', ScheduleChangesAPIView.as_view(), name='schedule_changes'),
+    path('group/<int:object_id>/calendar.ics', ScheduleCalendarAPIView.as_view(kind='group'), name='group_calendar'),
+    path('teacher/<int:object_id>/calendar.ics', ScheduleCalendarAPIView.as_view(kind='teacher'), name='teacher_calendar'),
+    path('classroom/<int:object_id>/calendar.ics', ScheduleCalendarAPIView.as_view(kind='classroom'),
+         name='classroom_calendar'),
     path('group/<int:group_id>/', ScheduleViewSet.as_view({'get': 'list'}), name='group_schedule'),
     path('teacher/<int:teacher_id>/', ScheduleViewSet.as_view({'get': 'list'}), name='teacher_schedule'),
 ] + router.urls
\ No newline at end of file
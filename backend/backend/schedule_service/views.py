@@ -1,17 +1,34 @@
-from django.db.models import Q, OuterRef, Exists
-from django.db import transaction
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from datetime import timedelta
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.http import http_date
 from rest_framework import viewsets, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from datetime import datetime
-from dateutil import rrule
+from monitoring_service.middleware import measure_render
+from .availability import AvailabilityQuery, parse_ids, common_free_slots, free_rooms
+from data_service.models import StudentGroup, Teacher
+from data_service.reference import get_reference_data
+from .cache import CachedResponse, get_request_scopes
+from .changes import ChangesGone, current_version, get_changes
+from .conflicts import find_conflicts, restrict_to_entity_slots
+from .generator import ScheduleGenerator, GenerationError, parse_date
+from .ics import ICS_CONTENT_TYPE, CalendarFeed
 from .models import Schedule
+from .pagination import ScheduleCursorPagination
+from .rescheduling import ScheduleRescheduler
 from .serializers import ScheduleSerializer
-from data_service.models import TeachingLoad, Classroom, TimeSlot
+from .tasks import generate_schedule_task
+from .timetable import build_timetable, timetable_values
 
 class ScheduleViewSet(viewsets.ModelViewSet):
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
+    pagination_class = ScheduleCursorPagination
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -30,127 +47,116 @@ class ScheduleViewSet(viewsets.ModelViewSet):
 
         # Приоритет отдается URL параметрам
         if teacher_id:
-            queryset = queryset.filter(teaching_load__teacher__id=teacher_id)
+            queryset = queryset.filter(teacher_id=teacher_id)
         elif query_teacher_id:
-            queryset = queryset.filter(teaching_load__teacher__id=query_teacher_id)
+            queryset = queryset.filter(teacher_id=query_teacher_id)
 
         if group_id:
-            queryset = queryset.filter(teaching_load__group__id=group_id)
+            queryset = queryset.filter(group_id=group_id)
         elif query_group_id:
-            queryset = queryset.filter(teaching_load__group__id=query_group_id)
+            queryset = queryset.filter(group_id=query_group_id)
 
         if start_date:
             queryset = queryset.filter(date__gte=start_date)
         if end_date:
             queryset = queryset.filter(date__lte=end_date)
 
-        # Оптимизация запросов
-        queryset = queryset.select_related(
-            'teaching_load__teacher',
-            'teaching_load__group',
-            'teaching_load__discipline',
-            'time_slot',
-            'classroom'
-        ).order_by('date', 'time_slot__start_time')
+        # Оптимизация запросов: пара и аудитория берутся из снимка справочников
+        queryset = queryset.select_related('teaching_load').order_by('date', 'time_slot__start_time', 'id')
 
         return queryset
 
-class GenerateScheduleAPIView(APIView):
-    def post(self, request):
-        semester = request.data.get('semester', 1)
-        start_date_str = request.data.get('startDate')
-        end_date_str = request.data.get('endDate')
-        group_ids = request.data.get('groupIds', [])
-        
-        if not start_date_str or not end_date_str:
-            return Response(
-                {'error': 'Необходимо указать начальную и конечную даты'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    def perform_create(self, serializer):
+        self._save_booking(serializer)
 
+    def perform_update(self, serializer):
+        self._save_booking(serializer)
+
+    @staticmethod
+    def _save_booking(serializer):
+        # validate() проверяет занятость слота, но параллельный запрос мог
+        # занять его между проверкой и записью
         try:
-            start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-            end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        except ValueError:
-            return Response(
-                {'error': 'Неверный формат даты. Используйте YYYY-MM-DD'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Получаем учебные нагрузки для выбранных групп
-        teaching_loads = TeachingLoad.objects.filter(
-            group__id__in=group_ids,
-            **self._get_semester_filter(semester)
-        ).select_related('group', 'teacher', 'discipline')
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError(['Слот уже занят другим занятием'])
 
-        if not teaching_loads.exists():
-            return Response(
-                {'error': 'Не найдено учебных нагрузок для выбранных групп'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    def get_requested_fields(self):
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [field.strip() for field in fields.split(',') if field.strip()]
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action == 'list':
+            kwargs.setdefault('fields', self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # Кэшируются только JSON-ответы, браузерный интерфейс DRF строится заново
+        if request.accepted_renderer.format != 'json':
+            return self._list_response(request)
+
+        cached = CachedResponse(request, get_request_scopes(
+            group_id=self.kwargs.get('group_id') or request.query_params.get('group_id'),
+            teacher_id=self.kwargs.get('teacher_id') or request.query_params.get('teacher_id'),
+        ), request.accepted_renderer.format)
+
+        if cached.matches(request):
+            response = HttpResponseNotModified()
+        else:
+            content = cached.get()
+            if content is None:
+                data = self._list_response(request).data
+                with measure_render():
+                    content = JSONRenderer().render(data)
+                cached.set(content)
+            response = HttpResponse(content, content_type='application/json')
+
+        response['ETag'] = cached.etag
+        response['Last-Modified'] = http_date(cached.last_modified)
+        # Клиент хранит ответ, но каждый раз сверяет ETag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    def _list_response(self, request):
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.get_requested_fields()
+
+        # Компактное представление: плоские id и словари связанных объектов
+        if request.query_params.get('view') == 'timetable':
+            rows = timetable_values(queryset)
+            page = self.paginate_queryset(rows)
+            data = build_timetable(page if page is not None else list(rows), fields)
+            if page is not None:
+                data['next'] = self.paginator.get_next_link()
+            return Response(data)
 
-        # Получаем доступные временные слоты и аудитории
-        time_slots = TimeSlot.objects.all().order_by('day_of_week', 'start_time')
-        classrooms = Classroom.objects.all()
-
-        generated_schedules = []
-        existing_schedules = []
-
-        with transaction.atomic():
-            # Удаляем старые расписания для этих групп в указанном периоде
-            Schedule.objects.filter(
-                teaching_load__group__id__in=group_ids,
-                date__gte=start_date,
-                date__lte=end_date
-            ).delete()
-
-            # Генерируем расписание для каждой даты в диапазоне
-            for single_date in rrule.rrule(
-                rrule.DAILY,
-                dtstart=start_date,
-                until=end_date
-            ):
-                day_of_week = single_date.isoweekday()
-                
-                # Определяем тип недели (четная/нечетная)
-                week_num = single_date.isocalendar()[1]
-                week_type = 'ч' if week_num % 2 == 0 else 'з'
-
-                # Фильтруем слоты по дню недели
-                day_slots = [ts for ts in time_slots if ts.day_of_week == day_of_week]
-
-                for load in teaching_loads:
-                    # Пропускаем нагрузки, не относящиеся к текущему семестру
-                    if not self._is_load_in_semester(load, semester):
-                        continue
-
-                    # Находим подходящий временной слот и аудиторию
-                    for slot in day_slots:
-                        # Проверяем доступность преподавателя
-                        teacher_busy = Schedule.objects.filter(
-                            teaching_load__teacher=load.teacher,
-                            time_slot=slot,
-                            date=single_date
-                        ).exists()
-
-                        if teacher_busy:
-                            continue
-                        
-                        # Находим подходящую аудиторию
-                        suitable_classroom = self._find_suitable_classroom(
-                            load, slot, single_date, classrooms
-                        )
-
-                        if suitable_classroom:
-                            schedule = Schedule.objects.create(
-                                teaching_load=load,
-                                time_slot=slot,
-                                classroom=suitable_classroom,
-                                week_type=week_type,
-                                date=single_date
-                            )
-                            generated_schedules.append(schedule)
-                            break
+        if fields:
+            queryset = self._project(queryset, fields)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.get_serializer(page, many=True).data)
+        return Response(self.get_serializer(queryset, many=True).data)
+
+    @staticmethod
+    def _project(queryset, fields):
+        """Читает из базы только столбцы запрошенных полей"""
+        related = ['teaching_load'] if 'teaching_load' in fields else []
+        # Пара нужна всегда: по ее началу строится курсор пагинации
+        columns = ['id', 'date', 'time_slot'] + [
+            field for field in ('week_type', 'teacher', 'group', 'classroom') if field in fields
+        ] + related
+        return queryset.select_related(None).select_related(*related).only(*columns)
+
+class GenerateScheduleAPIView(APIView):
+    def post(self, request):
+        try:
+            generator = ScheduleGenerator.from_request_data(request.data)
+            generated_schedules = generator.run()
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         # Преобразуем даты в строки перед сериализацией
         for schedule in generated_schedules:
@@ -159,81 +165,278 @@ class GenerateScheduleAPIView(APIView):
         serializer = ScheduleSerializer(generated_schedules, many=True)
         return Response({
             'message': f'Сгенерировано {len(generated_schedules)} занятий',
+            'metrics': generator.metrics,
             'schedules': serializer.data
         }, status=status.HTTP_201_CREATED)
 
-    def _get_semester_filter(self, semester):
-        if semester == 1:
-            return {'semester1_hours__gt': 0}
-        return {'semester2_hours__gt': 0}
-
-    def _is_load_in_semester(self, load, semester):
-        if semester == 1:
-            return load.semester1_hours and load.semester1_hours > 0
-        return load.semester2_hours and load.semester2_hours > 0
-
-    def _find_suitable_classroom(self, load, time_slot, date, classrooms):
-        for classroom in classrooms:
-            # Проверяем тип аудитории
-            if (load.discipline.specialty.name.lower() in ['математика', 'физика'] and 
-                classroom.type != 'lecture'):
-                continue
+class GenerateScheduleJobAPIView(APIView):
+    def post(self, request):
+        # Проверяем параметры до постановки задачи в очередь
+        try:
+            ScheduleGenerator.from_request_data(request.data)
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        task = generate_schedule_task.delay({
+            'semester': request.data.get('semester', 1),
+            'startDate': request.data.get('startDate'),
+            'endDate': request.data.get('endDate'),
+            'groupIds': request.data.get('groupIds', []),
+            'solver': request.data.get('solver'),
+            'mode': request.data.get('mode'),
+            'excludedDates': request.data.get('excludedDates', []),
+        })
+        return Response({'job_id': task.id}, status=status.HTTP_202_ACCEPTED)
 
-            # Проверяем занятость аудитории
-            classroom_busy = Schedule.objects.filter(
-                classroom=classroom,
-                time_slot=time_slot,
-                date=date
-            ).exists()
+class GenerateScheduleJobStatusAPIView(APIView):
+    def get(self, request, job_id):
+        result = generate_schedule_task.AsyncResult(job_id)
+        data = {
+            'job_id': job_id,
+            'state': result.state,
+            'phase': 'queued',
+            'placed': 0,
+            'unplaced': 0,
+            'percent': 0,
+        }
 
-            if not classroom_busy:
-                return classroom
-        return None
+        if result.state == 'FAILURE':
+            data['phase'] = 'failed'
+            data['error'] = str(result.info)
+        elif isinstance(result.info, dict):
+            data.update(result.info)
+
+        return Response(data)
+
+class RescheduleAPIView(APIView):
+    def post(self, request):
+        # Ошибки набора изменений возвращаются сериализатором с кодом 400
+        rescheduler = ScheduleRescheduler.from_request_data(request.data)
+        try:
+            summary = rescheduler.run()
+        except IntegrityError:
+            # Параллельная запись заняла слот, выбранный для переноса; изменения
+            # откатились целиком, запрос можно повторить
+            return Response(
+                {'error': 'Расписание изменилось во время перепланирования, повторите запрос'},
+                status=status.HTTP_409_CONFLICT
+            )
+        message = f"Перенесено {summary['moved']} занятий, добавлено {summary['added']}, удалено {summary['removed']}"
+        if summary['conflict_ids']:
+            message += f", оставлено на месте без переноса {len(summary['conflict_ids'])}"
+        return Response({'message': message, **summary})
 
 class ScheduleConflictsAPIView(APIView):
+    """
+    Конфликты расписания: группы занятий, которые в один день и слот делят
+    аудиторию, преподавателя или учебную группу.
+
+    Параметры: start_date, end_date, teacher_id, group_id, classroom_id,
+    type (classroom/teacher/group), limit и offset.
+    """
+
     def get(self, request):
-        # Конфликты по аудиториям
-        classroom_conflicts = Schedule.objects.filter(
-            Exists(
-                Schedule.objects.filter(
-                    Q(classroom=OuterRef('classroom')),
-                    Q(time_slot=OuterRef('time_slot')),
-                    Q(date=OuterRef('date')),
-                    ~Q(id=OuterRef('id'))
-                )
+        params = request.query_params
+        queryset = Schedule.objects.all()
+
+        try:
+            if params.get('start_date'):
+                queryset = queryset.filter(date__gte=parse_date(params['start_date']))
+            if params.get('end_date'):
+                queryset = queryset.filter(date__lte=parse_date(params['end_date']))
+            entity = {
+                name: int(params[name]) if params.get(name) else None
+                for name in ('teacher_id', 'group_id', 'classroom_id')
+            }
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'Неверные параметры teacher_id, group_id или classroom_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(params.get('limit', settings.SCHEDULE_CONFLICTS_PAGE_SIZE))
+            offset = int(params.get('offset', 0))
+        except ValueError:
+            return Response({'error': 'Неверные параметры пагинации'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(min(limit, settings.SCHEDULE_CONFLICTS_MAX_PAGE_SIZE), 0)
+        offset = max(offset, 0)
+
+        # Фильтр по преподавателю, группе или аудитории сужает чтение в SQL,
+        # а страница набирается прямо при проходе: в памяти только она
+        conflict_type = params.get('type')
+        count = 0
+        page = []
+        for conflict in find_conflicts(restrict_to_entity_slots(queryset, **entity)):
+            if not conflict.involves(**entity) or (conflict_type and conflict_type not in conflict.types):
+                continue
+            if offset <= count < offset + limit:
+                page.append(conflict)
+            count += 1
+
+        # Занятия страницы загружаются одним запросом
+        members = Schedule.objects.filter(
+            id__in=[schedule_id for conflict in page for schedule_id in conflict.ids]
+        ).select_related('teaching_load')
+        serialized = {item['id']: item for item in ScheduleSerializer(members, many=True).data}
+
+        return Response({
+            'count': count,
+            'limit': limit,
+            'offset': offset,
+            'conflicts': [
+                {
+                    'date': conflict.date,
+                    'time_slot': conflict.time_slot_id,
+                    'classroom': conflict.classroom_id,
+                    'week_type': conflict.week_type,
+                    'conflict_types': conflict.types,
+                    'ids': conflict.ids,
+                    'count': len(conflict.members),
+                    'schedules': [serialized[schedule_id] for schedule_id in conflict.ids],
+                }
+                for conflict in page
+            ]
+        })
+
+class FreeRoomsAPIView(APIView):
+    """
+    Свободные аудитории за период. Параметры: start_date, end_date,
+    day_of_week и time_slot_id (списки через запятую), classroom_id, type,
+    min_capacity.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            query = AvailabilityQuery.from_query_params(params)
+            classroom_ids = parse_ids(params.get('classroom_id'), 'classroom_id')
+            min_capacity = int(params['min_capacity']) if params.get('min_capacity') else None
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'Неверное значение min_capacity'}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(free_rooms(query, classroom_ids, params.get('type'), min_capacity))
+
+class FreeSlotsAPIView(APIView):
+    """
+    Общие свободные пары преподавателей, групп и аудиторий за период.
+    Параметры: start_date, end_date, teacher_id, group_id, classroom_id,
+    day_of_week и time_slot_id (списки через запятую).
+    """
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            query = AvailabilityQuery.from_query_params(params)
+            data = common_free_slots(
+                query,
+                teacher_ids=parse_ids(params.get('teacher_id'), 'teacher_id'),
+                group_ids=parse_ids(params.get('group_id'), 'group_id'),
+                classroom_ids=parse_ids(params.get('classroom_id'), 'classroom_id'),
             )
-        )
-
-        # Конфликты по преподавателям
-        teacher_conflicts = Schedule.objects.filter(
-            Exists(
-                Schedule.objects.filter(
-                    Q(teaching_load__teacher=OuterRef('teaching_load__teacher')),
-                    Q(time_slot=OuterRef('time_slot')),
-                    Q(date=OuterRef('date')),
-                    ~Q(id=OuterRef('id'))
-                )
+        except GenerationError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+class ScheduleChangesAPIView(APIView):
+    """
+    Изменения расписания после версии клиента. Параметры: since (версия
+    из предыдущего ответа), group_id или teacher_id, fields. Без since
+    возвращается только текущая версия. Если записи после since уже удалены
+    из журнала, возвращается 410 и клиент загружает расписание заново.
+    """
+
+    def get(self, request):
+        params = request.query_params
+        if not params.get('since'):
+            return Response({'version': current_version()})
+        try:
+            since = int(params['since'])
+            group_id = int(params['group_id']) if params.get('group_id') else None
+            teacher_id = int(params['teacher_id']) if params.get('teacher_id') else None
+        except ValueError:
+            return Response({'error': 'Неверные параметры since, group_id или teacher_id'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            version, inserted, updated, deleted, has_more = get_changes(since, group_id, teacher_id)
+        except ChangesGone:
+            return Response(
+                {'error': 'Журнал изменений сокращен, загрузите расписание полностью', 'version': current_version()},
+                status=status.HTTP_410_GONE
             )
-        )
-
-        # Объединяем конфликты
-        conflicts = classroom_conflicts.union(teacher_conflicts).distinct()
-
-        # Добавляем информацию о типе конфликта
-        conflicts_data = []
-        for conflict in conflicts:
-            conflict_type = []
-            if classroom_conflicts.filter(id=conflict.id).exists():
-                conflict_type.append('classroom')
-            if teacher_conflicts.filter(id=conflict.id).exists():
-                conflict_type.append('teacher')
-            
-            conflict_data = ScheduleSerializer(conflict).data
-            conflict_data['conflict_types'] = conflict_type
-            conflicts_data.append(conflict_data)
+
+        # Добавленные и измененные занятия загружаются одним запросом
+        fields = [field.strip() for field in params.get('fields', '').split(',') if field.strip()] or None
+        if fields and 'id' not in fields:
+            fields.insert(0, 'id')
+        queryset = Schedule.objects.filter(id__in=inserted + updated).select_related('teaching_load')
+        if fields:
+            queryset = ScheduleViewSet._project(queryset, fields)
+        serialized = {item['id']: item for item in ScheduleSerializer(queryset, many=True, fields=fields).data}
 
         return Response({
-            'count': len(conflicts_data),
-            'conflicts': conflicts_data
+            'version': version,
+            'has_more': has_more,
+            'inserted': [serialized[schedule_id] for schedule_id in inserted if schedule_id in serialized],
+            'updated': [serialized[schedule_id] for schedule_id in updated if schedule_id in serialized],
+            'deleted': deleted,
         })
-        
+
+def _stream_and_cache(chunks, cached):
+    # Фрагменты уходят клиенту сразу, в кэш календарь попадает целиком
+    # после отправки последнего фрагмента
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    cached.set(b''.join(parts))
+
+class ScheduleCalendarAPIView(APIView):
+    """
+    Подписка на расписание в формате iCalendar для группы, преподавателя или
+    аудитории: занятия с SCHEDULE_ICS_PAST_DAYS дней назад. Клиенты
+    календарей получают 304 по ETag и Last-Modified, готовый календарь
+    хранится в кэше до изменения расписания.
+    """
+    kind = None
+
+    def get(self, request, object_id):
+        if self.kind == 'group':
+            name = StudentGroup.objects.filter(id=object_id).values_list('name', flat=True).first()
+            scopes = get_request_scopes(group_id=object_id)
+        elif self.kind == 'teacher':
+            teacher = Teacher.objects.filter(id=object_id).first()
+            name = teacher.short_name if teacher else None
+            scopes = get_request_scopes(teacher_id=object_id)
+        else:
+            classroom = get_reference_data().classrooms.get(object_id)
+            name = f'Аудитория {classroom.number}' if classroom else None
+            # Отдельной области у аудиторий нет, календарь зависит от всего расписания
+            scopes = get_request_scopes()
+        if name is None:
+            return Response({'error': 'Объект не найден'}, status=status.HTTP_404_NOT_FOUND)
+
+        start_date = timezone.localdate() - timedelta(days=settings.SCHEDULE_ICS_PAST_DAYS)
+        cached = CachedResponse(request, scopes, 'ics', extra=[start_date.isoformat()])
+        if cached.matches(request):
+            response = HttpResponseNotModified()
+        else:
+            content = cached.get()
+            if content is not None:
+                response = HttpResponse(content, content_type=ICS_CONTENT_TYPE)
+            else:
+                feed = CalendarFeed(
+                    name,
+                    Schedule.objects.filter(**{f'{self.kind}_id': object_id}),
+                    start_date,
+                    cached.last_modified,
+                )
+                response = StreamingHttpResponse(_stream_and_cache(feed, cached), content_type=ICS_CONTENT_TYPE)
+            response['Content-Disposition'] = f'inline; filename="{self.kind}-{object_id}.ics"'
+
+        response['ETag'] = cached.etag
+        response['Last-Modified'] = http_date(cached.last_modified)
+        response['Cache-Control'] = 'no-cache'
+        return response
@@ -0,0 +1,106 @@
+from django.conf import settings
+from django.db import connections
+from .changes import record_queryset_changes
+from .models import Schedule, ScheduleChange
+
+
+def delete_schedules(queryset):
+    """
+    Удаляет занятия одним DELETE-запросом, без выборки объектов в память.
+
+    У расписания нет зависимых таблиц, поэтому каскадный сборщик Django
+    не нужен, а массовое удаление не должно зависеть от подключенных сигналов.
+    Удаление записывается в журнал изменений тем же запросом INSERT ... SELECT.
+    """
+    record_queryset_changes(queryset, ScheduleChange.DELETE)
+    return queryset._raw_delete(queryset.db)
+
+
+class _CopyStream:
+    """Файлоподобный объект, который лениво отдает строки для COPY FROM STDIN"""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._rows)
+            except StopIteration:
+                break
+        if size < 0:
+            size = len(self._buffer)
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+class ScheduleWriter:
+    """
+    Буфер сгенерированных занятий с пакетной записью в базу.
+
+    Занятия накапливаются в памяти и записываются через bulk_create пакетами
+    по SCHEDULE_BULK_BATCH_SIZE строк. Если включен SCHEDULE_BULK_USE_COPY и
+    используется PostgreSQL, крупные сборки (от SCHEDULE_COPY_MIN_ROWS строк)
+    записываются одной командой COPY FROM STDIN. В этом режиме идентификаторы
+    созданных занятий не возвращаются.
+    """
+
+    def __init__(self, using='default', batch_size=None, use_copy=None):
+        self.using = using
+        self.batch_size = batch_size or settings.SCHEDULE_BULK_BATCH_SIZE
+        if use_copy is None:
+            use_copy = settings.SCHEDULE_BULK_USE_COPY
+        self.use_copy = use_copy and connections[using].vendor == 'postgresql'
+        self.written = 0
+        self._pending = []
+
+    def add(self, schedule):
+        # bulk_create и COPY не вызывают save(), поэтому копии полей нагрузки
+        # заполняются здесь
+        schedule.sync_load_fields()
+        self._pending.append(schedule)
+        # В режиме COPY копим всю сборку, чтобы записать ее одной командой
+        if not self.use_copy and len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self.use_copy and len(self._pending) >= settings.SCHEDULE_COPY_MIN_ROWS:
+            self._copy(self._pending)
+        else:
+            Schedule.objects.using(self.using).bulk_create(self._pending, batch_size=self.batch_size)
+        self.written += len(self._pending)
+        self._pending = []
+
+    def _copy(self, schedules):
+        connection = connections[self.using]
+        fields = [field for field in Schedule._meta.concrete_fields if not field.primary_key]
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+
+        def rows():
+            for schedule in schedules:
+                values = []
+                for field in fields:
+                    value = field.get_db_prep_save(getattr(schedule, field.attname), connection)
+                    values.append(self._format_copy_value(value))
+                yield '\t'.join(values) + '\n'
+
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {connection.ops.quote_name(Schedule._meta.db_table)} ({columns}) FROM STDIN',
+                _CopyStream(rows())
+            )
+
+    @staticmethod
+    def _format_copy_value(value):
+        if value is None:
+            return '\\N'
+        return (
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r')
+        )